@@ -0,0 +1,359 @@
+import datetime
+import hashlib
+import json
+import statistics
+import time
+from pathlib import Path
+
+import get_l1a_files as glf
+import lxi_decode_funcs as ldf
+import lxi_synthetic_l0 as lsl0
+import numpy as np
+
+# Sizes of the synthetic level 0 files to benchmark
+benchmark_sizes = {
+    "1MB": 1024**2,
+    "100MB": 100 * 1024**2,
+    "1GB": 1024**3,
+}
+
+# Folder where the synthetic files, the L1a outputs and the results are saved. The level 0 files
+# follow the layout of the real data, so the L1a files end up in "L1a/sci" and "L1a/hk".
+benchmark_folder = Path("../data/benchmark/")
+level_zero_folder = benchmark_folder / "level_0" / "2025-03-16"
+
+# Digests of the L1a files of the synthetic files made by the original packet by packet decoder,
+# saved with this script. See the "decoder" entry of the file for how they were made.
+reference_file_name = Path(__file__).with_name("benchmark_decode_reference.json")
+
+# Parameters of the synthetic telemetry
+synthetic_parameters = {
+    "event_rate": 1000.0,
+    "hk_cadence": 1.0,
+    "commanded_fraction": 0.01,
+    "misaligned_fraction": 0.001,
+    "seed": 42,
+}
+
+
+def time_function(func, repeat=3):
+    """
+    Times a function the way asv does: it's run "repeat" times and the fastest and the median wall
+    times are kept.
+
+    Parameters
+    ----------
+    func : callable
+        Function without arguments.
+    repeat : int
+        Number of runs. Default is 3.
+
+    Returns
+    -------
+    result : object
+        Return value of the last run.
+    timing : dict
+        Dictionary with the "min" and "median" wall time in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, {"min": min(times), "median": statistics.median(times)}
+
+
+def file_digest(file_name):
+    """
+    sha256 hash of a file, used to check that the decoded output doesn't change.
+    """
+    sha256 = hashlib.sha256()
+    with open(file_name, "rb") as file:
+        for block in iter(lambda: file.read(16 * 1024**2), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def make_synthetic_files(size_names=None):
+    """
+    Writes the synthetic payload and GSFC files of the selected sizes. The files are the same on
+    every run for the same parameters.
+
+    Parameters
+    ----------
+    size_names : list of str
+        Keys of "benchmark_sizes". If None, all the sizes are used. Default is None.
+
+    Returns
+    -------
+    file_info : dict
+        Dictionary keyed by the size name, with the "payload" and "gsfc" file information from
+        "lxi_synthetic_l0".
+    """
+    if size_names is None:
+        size_names = list(benchmark_sizes)
+
+    file_info = {}
+    for size_name in size_names:
+        payload_file_name = level_zero_folder / f"payload_lexi_synthetic_{size_name}.dat"
+        gsfc_file_name = level_zero_folder / f"gsfc_lexi_synthetic_{size_name}.dat"
+        file_info[size_name] = {
+            "payload": lsl0.write_synthetic_payload_file(
+                file_name=payload_file_name,
+                file_size=benchmark_sizes[size_name],
+                **synthetic_parameters,
+            ),
+            "gsfc": lsl0.write_synthetic_gsfc_file(
+                file_name=gsfc_file_name,
+                file_size=benchmark_sizes[size_name],
+                event_rate=synthetic_parameters["event_rate"],
+                hk_cadence=synthetic_parameters["hk_cadence"],
+                commanded_fraction=synthetic_parameters["commanded_fraction"],
+                seed=synthetic_parameters["seed"],
+            ),
+        }
+    return file_info
+
+
+def run_benchmarks(size_names=None, repeat=3):
+    """
+    Times "read_binary_data_sci", "read_binary_data_hk" and "read_binary_file" of "get_l1a_files"
+    on the synthetic payload files, and the GSFC decode on the synthetic GSFC files. The number of
+    decoded packets is checked against the generator, and the digests of the L1a files against
+    the reference digests.
+
+    Parameters
+    ----------
+    size_names : list of str
+        Keys of "benchmark_sizes". If None, all the sizes are used. Default is None.
+    repeat : int
+        Number of runs of each function. Default is 3.
+
+    Returns
+    -------
+    results : dict
+        Dictionary keyed by the size name and the function name, with the timings, the
+        throughput in MB/s and the digests of the output files.
+    """
+    file_info = make_synthetic_files(size_names)
+
+    results = {}
+    for size_name, info in file_info.items():
+        payload_file_name = info["payload"]["file_name"]
+        gsfc_file_name = info["gsfc"]["file_name"]
+        size_mb = Path(payload_file_name).stat().st_size / 1e6
+        results[size_name] = {}
+
+        benchmarks = {
+            "read_binary_data_sci": lambda: glf.read_binary_data_sci(
+                in_file_name=payload_file_name
+            ),
+            "read_binary_data_hk": lambda: glf.read_binary_data_hk(
+                in_file_name=payload_file_name
+            ),
+            "read_binary_file": lambda: glf.read_binary_file(file_val=payload_file_name),
+        }
+        for name, func in benchmarks.items():
+            result, timing = time_function(func, repeat=repeat)
+            if name == "read_binary_file":
+                df_sci, df_hk, output_files = result[1], result[2], list(result[3:5])
+            elif name == "read_binary_data_sci":
+                df_sci, df_hk, output_files = result[0], None, [result[1]]
+            else:
+                df_sci, df_hk, output_files = None, result[0], [result[1]]
+
+            # The decoder must find all the packets the generator wrote
+            if df_sci is not None and len(df_sci) != info["payload"]["sci"]:
+                raise ValueError(
+                    f"{name} decoded {len(df_sci)} science packets instead of "
+                    f"{info['payload']['sci']} for {payload_file_name}."
+                )
+            if df_hk is not None and len(df_hk) != info["payload"]["hk"]:
+                raise ValueError(
+                    f"{name} decoded {len(df_hk)} housekeeping packets instead of "
+                    f"{info['payload']['hk']} for {payload_file_name}."
+                )
+
+            results[size_name][name] = {
+                **timing,
+                "mb_per_s": size_mb / timing["min"],
+                "digests": {Path(file).name: file_digest(file) for file in output_files},
+            }
+
+        # The GSFC decode only, no L1a file is written for the GSFC files
+        raw = Path(gsfc_file_name).read_bytes()
+        (sci_data, hk_data), timing = time_function(
+            lambda: (ldf.decode_gsfc_sci_data(raw), ldf.decode_gsfc_hk_data(raw)), repeat=repeat
+        )
+        n_sci, n_hk = len(sci_data["TimeStamp"]), len(hk_data["hk_id"])
+        if n_sci != info["gsfc"]["sci"] or n_hk != info["gsfc"]["hk"]:
+            raise ValueError(f"The GSFC decode didn't find all the packets of {gsfc_file_name}.")
+        results[size_name]["decode_gsfc"] = {
+            **timing,
+            "mb_per_s": len(raw) / 1e6 / timing["min"],
+            "digests": {},
+        }
+
+    return results
+
+
+def check_displaced_frames(shifts=(-3, -2, -1, 1, 2, 3)):
+    """
+    Regression check of the repair of the displaced LEXI packets. A synthetic science packet is
+    moved by each of the shifts, and the decoded timestamp, commanded flag and channels of the
+    moved packets must be the ones which were written.
+
+    NOTE: The original decoder built 27 and 26 byte packets for the shifts of -2 and -1 bytes (it
+    skipped the byte at the end of the PIT header) and crashed in struct.unpack, so these frames
+    are decoded for the first time by "lxi_decode_funcs.find_pit_frames".
+
+    Parameters
+    ----------
+    shifts : tuple of int
+        Displacements of the moved packets, in bytes. Default is (-3, -2, -1, 1, 2, 3).
+
+    Returns
+    -------
+    wrong_shifts : list of int
+        Shifts whose packet wasn't decoded or was decoded wrongly.
+    """
+    # One moved packet every 3 frames, with aligned frames around them
+    n_frames = 3 * len(shifts) + 3
+    times = lsl0.default_start_time + 1e-3 * np.arange(1, n_frames + 1)
+    is_hk = np.zeros(n_frames, dtype=bool)
+    packets = lsl0.synthetic_lxi_packets(
+        times,
+        is_hk,
+        start_time=lsl0.default_start_time,
+        rng=np.random.default_rng(synthetic_parameters["seed"]),
+    )
+    displacements = np.zeros(n_frames, dtype=np.int64)
+    moved = 1 + 3 * np.arange(len(shifts))
+    displacements[moved] = shifts
+    raw, is_dropped = lsl0.synthetic_pit_frames(packets, times, displacements=displacements)
+
+    # The decoded packets are the frames which aren't dropped, in file order, without the last
+    # frame of the file
+    is_dropped[-1] = True
+    decoded_index = np.cumsum(~is_dropped) - 1
+    sci_data = ldf.decode_sci_data(raw)
+
+    timestamp_word = packets["timestamp_word"].astype(np.uint32)
+    channels = packets["channels"].astype(np.float64) * ldf.volts_per_count
+    wrong_shifts = []
+    for frame, shift in zip(moved, shifts):
+        index = decoded_index[frame]
+        if is_dropped[frame] or index >= len(sci_data["TimeStamp"]):
+            wrong_shifts.append(shift)
+            continue
+        expected = {
+            "TimeStamp": (timestamp_word[frame] & 0x3FFFFFFF) / 1e3,
+            "IsCommanded": bool(timestamp_word[frame] & 0x40000000),
+            **{f"Channel{i + 1}": channels[frame, i] for i in range(4)},
+        }
+        if any(sci_data[key][index] != value for key, value in expected.items()):
+            wrong_shifts.append(shift)
+    return wrong_shifts
+
+
+def load_reference():
+    """
+    Reads the reference digests of the original decoder. The reference is never made from the
+    results of this script: a missing reference is an error.
+
+    Returns
+    -------
+    reference : dict
+        Dictionary with the "synthetic_parameters" of the reference, and for each size name in
+        "sizes", the number of "frames", "sci" and "hk" packets and the "digests" of the L1a
+        files.
+    """
+    if not reference_file_name.exists():
+        raise FileNotFoundError(f"The reference digests {reference_file_name} don't exist.")
+
+    with open(reference_file_name, "r") as file:
+        reference = json.load(file)
+    if reference["synthetic_parameters"] != synthetic_parameters:
+        raise ValueError(
+            f"The synthetic parameters {synthetic_parameters} aren't the ones of the reference "
+            f"{reference['synthetic_parameters']}."
+        )
+    return reference
+
+
+def check_reference(results, reference):
+    """
+    Compares the digests of the L1a files with the reference digests of the original decoder.
+
+    Parameters
+    ----------
+    results : dict
+        Output of "run_benchmarks".
+    reference : dict
+        Output of "load_reference".
+
+    Returns
+    -------
+    changed : list of str
+        Names of the L1a files whose content isn't the one of the reference.
+    unchecked : list of str
+        Names of the L1a files without a reference digest, only their number of packets was
+        checked.
+    """
+    reference_digests = {
+        file_name: digest
+        for size_reference in reference["sizes"].values()
+        for file_name, digest in size_reference["digests"].items()
+    }
+    digests = {
+        file_name: digest
+        for size_results in results.values()
+        for result in size_results.values()
+        for file_name, digest in result["digests"].items()
+    }
+    changed = [
+        file_name
+        for file_name, digest in digests.items()
+        if file_name in reference_digests and reference_digests[file_name] != digest
+    ]
+    unchecked = [file_name for file_name in digests if file_name not in reference_digests]
+    return changed, unchecked
+
+
+if __name__ == "__main__":
+    # Sizes to run. The 1 GB files need a few GB of free disk space and memory.
+    size_names = ["1MB", "100MB", "1GB"]
+    repeat = 3
+
+    # The decoded output is checked against the reference at the end
+    reference = load_reference()
+
+    # The displaced packets, including the -1 and -2 byte shifts which crashed the original
+    # decoder, must be put back in place
+    wrong_shifts = check_displaced_frames()
+    if wrong_shifts:
+        raise ValueError(f"The displaced packets are decoded wrongly for the shifts {wrong_shifts}")
+
+    results = run_benchmarks(size_names=size_names, repeat=repeat)
+
+    print(f"{'size':>6} {'function':>22} {'min (s)':>9} {'median (s)':>11} {'MB/s':>8}")
+    for size_name, size_results in results.items():
+        for name, result in size_results.items():
+            print(
+                f"{size_name:>6} {name:>22} {result['min']:9.3f} {result['median']:11.3f} "
+                f"{result['mb_per_s']:8.1f}"
+            )
+
+    # Save the results of the run, to follow the decode performance over time
+    run_time = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    results_file_name = benchmark_folder / f"benchmark_decode_results_{run_time}.json"
+    with open(results_file_name, "w") as file:
+        json.dump(results, file, indent=1)
+    print(f"Saved the results to {results_file_name}")
+
+    changed, unchecked = check_reference(results, reference)
+    if changed:
+        raise ValueError(f"The decoded output isn't the one of the reference for: {changed}")
+    if unchecked:
+        print(f"No reference digest, only the packet counts were checked for: {unchecked}")
+    print("The decoded output is the same as the one of the reference decoder.")
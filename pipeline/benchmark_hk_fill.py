@@ -0,0 +1,103 @@
+import time
+
+import lxi_misc_codes as lmsc
+import numpy as np
+import pandas as pd
+
+volts_per_count = 4.5126 / 65536  # volts per increment of digitization
+
+
+def synthetic_hk_dataframe(n_rows=86400, seed=42):
+    """
+    Creates a housekeeping dataframe with the same columns as the L1a HK files. One HK packet per
+    second for a full day, with "hk_id" cycling from 0 to 15, so that each of the 16 HK columns
+    is NaN in 15 out of 16 rows before the fill.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of HK packets. Default is 86400 (one day at 1 Hz).
+    seed : int
+        Seed for the random number generator. Default is 42.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        Housekeeping dataframe with NaNs.
+    """
+    rng = np.random.default_rng(seed)
+    hk_id = np.arange(n_rows) % 16
+    hk_value = rng.integers(0, 4096, n_rows)
+    hk_value = np.where((hk_id == 10) | (hk_id == 11), hk_value, hk_value << 4)
+    hk_values = lmsc.hk_value_comp_array(
+        vpc=volts_per_count, hk_value=hk_value, hk_id=hk_id, lxi_unit=1
+    )
+
+    df_key_list = [
+        "PinPullerTemp",
+        "OpticsTemp",
+        "LEXIbaseTemp",
+        "HVsupplyTemp",
+        "+5.2V_Imon",
+        "+10V_Imon",
+        "+3.3V_Imon",
+        "AnodeVoltMon",
+        "+28V_Imon",
+        "ADC_Ground",
+        "Cmd_count",
+        "Pinpuller_Armed",
+        "Unused1",
+        "Unused2",
+        "HVmcpAuto",
+        "HVmcpMan",
+    ]
+    df = pd.DataFrame(
+        {
+            "Date": 1.74e9 + np.arange(n_rows, dtype=np.float64),
+            "TimeStamp": np.arange(n_rows) * 1.0,
+            "HK_id": hk_id.astype(np.float64),
+            **{key: hk_values[:, ii] for ii, key in enumerate(df_key_list)},
+            "DeltaEvntCount": rng.integers(0, 1000, n_rows).astype(np.float64),
+            "DeltaDroppedCount": rng.integers(0, 10, n_rows).astype(np.float64),
+            "DeltaLostEvntCount": rng.integers(0, 10, n_rows).astype(np.float64),
+        }
+    )
+
+    return df
+
+
+def fill_nan_loop(df):
+    """
+    The row by row fill previously used in "read_binary_data_hk", kept here as the reference.
+    """
+    for key in df.keys():
+        for ii in range(1, len(df[key])):
+            if np.isnan(df[key][ii]):
+                df.loc[ii, key] = df.loc[ii - 1, key]
+    return df
+
+
+def fill_nan_vectorized(df):
+    """
+    The columnar forward fill now used in "read_binary_data_hk".
+    """
+    return df.ffill()
+
+
+if __name__ == "__main__":
+    n_rows = 86400
+    df = synthetic_hk_dataframe(n_rows=n_rows)
+    print(f"Synthetic HK data: {n_rows} rows x {len(df.columns)} columns")
+
+    start = time.time()
+    df_vectorized = fill_nan_vectorized(df.copy())
+    time_vectorized = time.time() - start
+    print(f"Vectorized forward fill: {time_vectorized:.4f} seconds")
+
+    start = time.time()
+    df_loop = fill_nan_loop(df.copy())
+    time_loop = time.time() - start
+    print(f"Row by row fill: {time_loop:.2f} seconds")
+
+    pd.testing.assert_frame_equal(df_loop, df_vectorized)
+    print(f"Identical output, speed up of {time_loop / time_vectorized:.0f}x")
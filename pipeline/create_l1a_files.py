@@ -1,24 +1,62 @@
+import datetime
 import glob
 import importlib
+import itertools
+import json
 import multiprocessing
 import time
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 import get_l1a_files as glf
+import lxi_decode_funcs as ldf
+import lxi_l1a_manifest as lman
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
 importlib.reload(glf)
+importlib.reload(lman)
+importlib.reload(ldf)
 
 start = time.time()
+run_start = datetime.datetime.now(datetime.timezone.utc)
 file_data_folder = (
     "/home/cephadrius/Desktop/git/Lexi-BU/lexi_data_pipeline/data/level_0/2025-03-16/"
 )
 
+# Format of the L1a output files, "csv" or "npz"
+l1a_file_format = "csv"
+
+# If True, all the files are decoded again, even if the manifest lists them as already converted
+reprocess_all_files = False
+
+# If True, the sha256 hash of the files is recorded in the manifest, so that a file with a new
+# modification time but the same content isn't decoded again
+use_file_hash = False
+
 # Get the list of files in the folder and subfolders
 file_val_list = sorted(glob.glob(str(file_data_folder) + "/*.dat", recursive=True))
 
+# Only decode the files which are new or have changed since they were last converted
+manifest_path = str(file_data_folder) + "/" + lman.manifest_file_name
+manifest = {} if reprocess_all_files else lman.load_manifest(manifest_path)
+number_of_files = len(file_val_list)
+file_val_list = [
+    file_val
+    for file_val in file_val_list
+    if not lman.is_file_current(
+        manifest, file_val, file_format=l1a_file_format, use_hash=use_file_hash
+    )
+]
+print(
+    f"Decoding {len(file_val_list)} new or changed files, "
+    f"skipping {number_of_files - len(file_val_list)} already converted files."
+)
+# Signature of the files before they are decoded
+file_signatures = {
+    file_val: lman.file_signature(file_val, use_hash=use_file_hash) for file_val in file_val_list
+}
+
 # Randomly select 100 files for testing
 # define a random seed
 # np.random.seed(42)
@@ -28,30 +66,79 @@ file_val_list = sorted(glob.glob(str(file_data_folder) + "/*.dat", recursive=Tru
 total_cores = multiprocessing.cpu_count()
 num_workers = max(1, int(total_cores * 0.9))  # Ensure at least 1 worker
 
+# When there are fewer files than workers, the spare workers split the decode of each file
+workers_per_file = max(1, num_workers // max(1, len(file_val_list)))
+num_workers = min(num_workers, max(1, len(file_val_list)))
+
+# Maximum number of files in the pool at a time. The next files are submitted as the previous
+# ones finish, so the memory used doesn't grow with the number of files.
+max_pending_files = 2 * num_workers
 
-# Function to process each file
+
+# Function to process each file. The worker saves the L1a files itself and only sends back a
+# summary of them, not the data frames.
 def process_file(file_val):
-    return glf.read_binary_file(file_val=file_val)
-
-
-results = []
-# Parallel processing
-with ProcessPoolExecutor(max_workers=num_workers) as executor:
-    # Submit all tasks
-    future_to_file = {executor.submit(process_file, file): file for file in file_val_list}
-
-    # Wrap as_completed() with tqdm for progress tracking
-    for future in tqdm(
-        as_completed(future_to_file),
-        total=len(file_val_list),
-        desc="Processing Files",
-        unit="file",
-    ):
-        results.append(future.result())
-# Extract results if needed
-for file_name, df_sci, df_hk, sci_save_filename, hk_save_filename in results:
-    pass  # Process further if required
+    return glf.read_binary_file(
+        file_val=file_val,
+        file_format=l1a_file_format,
+        n_workers=workers_per_file,
+        return_summary=True,
+    )
+
+
+summaries = []
+# Parallel processing. The manifest is saved even if a file fails, so that the files converted
+# until then aren't decoded again on the next run.
+try:
+    with ProcessPoolExecutor(max_workers=num_workers) as executor, tqdm(
+        total=len(file_val_list), desc="Processing Files", unit="file"
+    ) as progress_bar:
+        file_iter = iter(file_val_list)
+        future_to_file = {}
+        while True:
+            # Top up the pool with the next files
+            for file_val in itertools.islice(file_iter, max_pending_files - len(future_to_file)):
+                future_to_file[executor.submit(process_file, file_val)] = file_val
+            if not future_to_file:
+                break
+
+            done, _ = wait(future_to_file, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_val = future_to_file.pop(future)
+                summary = future.result()
+                summaries.append(summary)
+                # Record the converted file in the manifest
+                lman.update_manifest(
+                    manifest,
+                    file_val,
+                    outputs=[summary["sci_file"], summary["hk_file"]],
+                    file_format=l1a_file_format,
+                    signature=file_signatures[file_val],
+                )
+                progress_bar.update(1)
+finally:
+    lman.save_manifest(manifest, manifest_path)
 
 # Print the time taken
 end = time.time()
 print(f"Time taken: {end - start:.2f} seconds")
+
+# Save a report with the summary of each file and the totals of the run
+summaries = sorted(summaries, key=lambda x: x["file_name"])
+report = {
+    "run_start": run_start.isoformat(),
+    "run_time_s": end - start,
+    "folder": str(file_data_folder),
+    "file_format": l1a_file_format,
+    "skipped_files": number_of_files - len(file_val_list),
+    "totals": {
+        **ldf.summarize_decode_stats([summary["decode_stats"] for summary in summaries]),
+        "sci_rows": sum(summary["sci_rows"] for summary in summaries),
+        "hk_rows": sum(summary["hk_rows"] for summary in summaries),
+    },
+    "files": summaries,
+}
+report_file_name = f"{file_data_folder}/l1a_decode_report_{run_start:%Y%m%dT%H%M%SZ}.json"
+with open(report_file_name, "w") as file:
+    json.dump(report, file, indent=1)
+print(f"Decode report saved to {report_file_name}")
@@ -1,20 +1,23 @@
-import csv
-import datetime
+import getpass
 import importlib
 import os
 import struct
 from pathlib import Path
 from typing import NamedTuple
 
+import lxi_decode_funcs as ldf
+import lxi_l1a_io as lio
 import lxi_misc_codes as lmsc
 import numpy as np
 import pandas as pd
-import pytz
 
 lmsc = importlib.reload(lmsc)
+ldf = importlib.reload(ldf)
+lio = importlib.reload(lio)
 
-# Get the user login name
-user_name = os.getlogin()
+# Get the user name. "os.getlogin" fails without a terminal (cron, nohup, containers), so it
+# would break the import of this module by the L1b scripts
+user_name = getpass.getuser()
 
 level_zero_folder = f"/home/{user_name}/Desktop/git/Lexi-BU/lexi_data_pipeline/data/level_0/"
 
@@ -151,10 +154,65 @@ class hk_packet_cls(NamedTuple):
             )
 
 
+def sci_data_to_l1a_dataframe(sci_data=None, number_of_decimals=6):
+    """
+    Creates the L1a science dataframe from the decoded science packets of a payload file.
+
+    Parameters
+    ----------
+    sci_data : dict
+        The science packets, decoded by "lxi_decode_funcs".
+    number_of_decimals : int
+        Number of decimals of the channels. Default is 6.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        DataFrame of the science packets, with the "Date" in UTC.
+    """
+    return pd.DataFrame(
+        {
+            "Date": pd.to_datetime(ldf.unix_time_to_datetime64(sci_data["Date"]), utc=True),
+            "TimeStamp": sci_data["TimeStamp"],
+            "IsCommanded": sci_data["IsCommanded"],
+            "Channel1": np.round(sci_data["Channel1"], decimals=number_of_decimals),
+            "Channel2": np.round(sci_data["Channel2"], decimals=number_of_decimals),
+            "Channel3": np.round(sci_data["Channel3"], decimals=number_of_decimals),
+            "Channel4": np.round(sci_data["Channel4"], decimals=number_of_decimals),
+        }
+    )
+
+
+def iter_level_0_sci(file_val=None, number_of_decimals=6, window_size=64 * 1024**2):
+    """
+    Decodes the science packets of a payload file one window at a time with
+    "lxi_decode_funcs.iter_pit_data", and yields them as L1a science dataframes without saving
+    any L1a file. Used to go from the level 0 files to the L1b files in memory.
+
+    Parameters
+    ----------
+    file_val : str
+        Name of the payload file.
+    number_of_decimals : int
+        Number of decimals of the channels. Default is 6.
+    window_size : int
+        Size of each window in bytes. Default is 64 MB.
+
+    Yields
+    ------
+    df : pandas.DataFrame
+        DataFrame of the science packets of the window, see "sci_data_to_l1a_dataframe".
+    """
+    for sci_data, _ in ldf.iter_pit_data(file_val, window_size=window_size):
+        yield sci_data_to_l1a_dataframe(sci_data, number_of_decimals=number_of_decimals)
+
+
 def read_binary_data_sci(
     in_file_name=None,
     save_file_name="../data/processed/sci/output_sci.csv",
     number_of_decimals=6,
+    sci_data=None,
+    file_format="csv",
 ):
     """
     Reads science packet of the binary data from a file and saves it to a csv file.
@@ -167,6 +225,11 @@ def read_binary_data_sci(
         Name of the output file. Default is "output_sci.csv".
     number_of_decimals : int
         Number of decimals to save. Default is 6.
+    sci_data : dict
+        The science packets of the file, already decoded by "lxi_decode_funcs". If None, the
+        file is read and decoded. Default is None.
+    file_format : str
+        Format of the output file, "csv" or "npz". Default is "csv".
 
     Raises
     ------
@@ -198,76 +261,12 @@ def read_binary_data_sci(
 
     input_file_name = in_file_name
 
-    with open(input_file_name, "rb") as file:
-        raw = file.read()
-
-    index = 0
-    packets = []
-
-    while index < len(raw) - 28:
-        if raw[index : index + 2] == sync_pit and raw[index + 12 : index + 16] == sync_lxi:
-            packets.append(sci_packet_cls.from_bytes(raw[index : index + 28]))
-            index += 28
-            continue
-        elif (raw[index : index + 2] == sync_pit) and (raw[index + 12 : index + 16] != sync_lxi):
-            # Ignore the last packet
-            if index >= len(raw) - 28 - 16:
-                # NOTE: This is a temporary fix. The last packet is ignored because the last
-                # packet often isn't complete. Need to find a better solution. Check the function
-                # read_binary_data_hk for the same.
-                index += 28
-                continue
-            # Check if sync_lxi is present in the next 16 bytes
-            if sync_lxi in raw[index + 12 : index + 28] and index + 28 < len(raw):
-                # Find the index of sync_lxi
-                index_sync = index + 12 + raw[index + 12 : index + 28].index(sync_lxi)
-                # Reorder the packet
-                new_packet = (
-                    raw[index + 28 : index + 12 + 28]
-                    + raw[index_sync : index + 28]
-                    + raw[index + 12 + 28 : index_sync + 28]
-                )
-                # Check if the packet length is 28
-                if len(new_packet) != 28:
-                    # If the index + 28 is greater than the length of the raw data, then break
-                    if index + 28 > len(raw):
-                        break
-                packets.append(sci_packet_cls.from_bytes(new_packet))
-                index += 28
-                continue
-            # Check if raw[index - 3:index] + raw[index+12:index+13] == sync_lxi
-            elif raw[index - 3 : index] + raw[index + 12 : index + 13] == sync_lxi:
-                # Reorder the packet
-                new_packet = (
-                    raw[index : index + 12] + raw[index - 3 : index] + raw[index + 12 : index + 25]
-                )
-                packets.append(sci_packet_cls.from_bytes(new_packet))
-                index += 28
-                continue
-            # Check if raw[index - 2:index] + raw[index+12:index+14] == sync_lxi
-            elif raw[index - 2 : index] + raw[index + 12 : index + 14] == sync_lxi:
-                # Reorder the packet
-                new_packet = (
-                    raw[index : index + 12] + raw[index - 2 : index] + raw[index + 13 : index + 26]
-                )
-                packets.append(sci_packet_cls.from_bytes(new_packet))
-                index += 28
-                continue
-            # Check if raw[index - 1:index] + raw[index+12:index+15] == sync_lxi
-            elif raw[index - 1 : index] + raw[index + 12 : index + 15] == sync_lxi:
-                # Reorder the packet
-                new_packet = (
-                    raw[index : index + 12] + raw[index - 1 : index] + raw[index + 14 : index + 27]
-                )
-                packets.append(sci_packet_cls.from_bytes(new_packet))
-                index += 28
-                continue
-            index += 28
-            continue
-        index += 28
-
-    # Drop the packets that are None
-    packets = [packet for packet in packets if packet is not None]
+    if sci_data is None:
+        with open(input_file_name, "rb") as file:
+            raw = file.read()
+
+        # Decode all the science packets in the file at once
+        sci_data = ldf.decode_sci_data(raw)
 
     # Split the file name in a folder and a file name
     output_file_name = (
@@ -283,64 +282,11 @@ def read_binary_data_sci(
     if not Path(output_folder_name).exists():
         Path(output_folder_name).mkdir(parents=True, exist_ok=True)
 
-    with open(save_file_name, "w", newline="") as file:
-        dict_writer = csv.DictWriter(
-            file,
-            fieldnames=(
-                "Date",
-                "TimeStamp",
-                "IsCommanded",
-                "Channel1",
-                "Channel2",
-                "Channel3",
-                "Channel4",
-            ),
-        )
-        dict_writer.writeheader()
-        try:
-            dict_writer.writerows(
-                {
-                    # "Date": datetime.datetime.utcfromtimestamp(sci_packet_cls.Date),
-                    "Date": datetime.datetime.fromtimestamp(
-                        sci_packet_cls.Date, tz=datetime.timezone.utc
-                    ),
-                    "TimeStamp": sci_packet_cls.timestamp / 1e3,
-                    "IsCommanded": sci_packet_cls.is_commanded,
-                    "Channel1": np.round(sci_packet_cls.channel1, decimals=number_of_decimals),
-                    "Channel2": np.round(sci_packet_cls.channel2, decimals=number_of_decimals),
-                    "Channel3": np.round(sci_packet_cls.channel3, decimals=number_of_decimals),
-                    "Channel4": np.round(sci_packet_cls.channel4, decimals=number_of_decimals),
-                }
-                for sci_packet_cls in packets
-            )
-        except Exception as e:
-            # Print the exception in red color
-            print(f"\n\033[91m{e}\033[00m\n")
-            print(
-                f"Number of science packets found in the file \033[96m {in_file_name}\033[0m "
-                f"is just \033[91m {len(packets)}\033[0m. \n \033[96m Check the datafile to "
-                "see if the datafile has proper data.\033[0m \n "
-            )
+    # Create the dataframe directly from the decoded arrays
+    df = sci_data_to_l1a_dataframe(sci_data, number_of_decimals=number_of_decimals)
 
-    # Read the saved file data in a dataframe
-    df = pd.read_csv(save_file_name)
-
-    # Convert the date column to datetime
-    try:
-        df["Date"] = pd.to_datetime(df["Date"])
-    except Exception:
-        df["Date"] = pd.to_datetime(df["Date"], format="mixed")
-    except Exception:
-        df["Date"] = pd.to_datetime(df["Date"], format="ISO8601")
-    except Exception:
-        # Use dateutil
-        df["Date"] = pd.to_datetime(df["Date"], format=None, errors="coerce")
-
-    # Set index to the date
-    df.set_index("Date", inplace=False)
-
-    # Save the dataframe to a csv file
-    df.to_csv(save_file_name, index=False)
+    # Save the dataframe in the selected file format
+    save_file_name = lio.save_l1a_file(df=df, save_file_name=save_file_name, file_format=file_format)
 
     return df, save_file_name
 
@@ -349,6 +295,8 @@ def read_binary_data_hk(
     in_file_name=None,
     save_file_name="../data/processed/hk/output_hk.csv",
     number_of_decimals=6,
+    hk_data=None,
+    file_format="csv",
 ):
     """
     Reads housekeeping packet of the binary data from a file and saves it to a csv file.
@@ -361,6 +309,11 @@ def read_binary_data_hk(
         Name of the output file. Default is "output_hk.csv".
     number_of_decimals : int
         Number of decimals to save. Default is 6.
+    hk_data : dict
+        The housekeeping packets of the file, already decoded by "lxi_decode_funcs". If None, the
+        file is read and decoded. Default is None.
+    file_format : str
+        Format of the output file, "csv" or "npz". Default is "csv".
 
     Raises
     ------
@@ -399,177 +352,34 @@ def read_binary_data_hk(
 
     # print(f"Reading the file \033[96m {in_file_name}\033[0m")
 
-    with open(input_file_name, "rb") as file:
-        raw = file.read()
-
-    index = 0
-    packets = []
-    # Get the packets from the raw data
-    # Loop through the raw data and get the packets
-    while index < len(raw) - 28:
-        if raw[index : index + 2] == sync_pit and raw[index + 12 : index + 16] == sync_lxi:
-            packets.append(hk_packet_cls.from_bytes(raw[index : index + 28]))
-            index += 28
-            continue
-        elif raw[index : index + 2] == sync_pit and raw[index + 12 : index + 16] != sync_lxi:
-            # Ignore the last packet
-            if index >= len(raw) - 28 - 16:
-                # NOTE: This is a temporary fix. The last packet is ignored because the last
-                # packet often isn't complete. Need to find a better solution. Check the function
-                # read_binary_data_sci for the same.
-                index += 28
-                continue
-            # Check if sync_lxi is present in the next 16 bytes
-            if sync_lxi in raw[index + 12 : index + 28] and index + 28 < len(raw):
-                # Find the index of sync_lxi
-                index_sync = index + 12 + raw[index + 12 : index + 28].index(sync_lxi)
-                # Reorder the packet
-                new_packet = (
-                    raw[index : index + 12]
-                    + raw[index_sync : index + 28]
-                    + raw[index + 12 + 28 : index_sync + 28]
-                )
-                # Check if the packet length is 28
-                if len(new_packet) != 28:
-                    # Print the packet length
-                    print(
-                        f"The packet length is {len(new_packet)}, index = {index} and length of raw is {len(raw)}"
-                    )
-                    print(f"{index} 1 ==> {new_packet.hex()}\n")
-                    # If the index + 28 is greater than the length of the raw data, then break
-                    if index + 28 > len(raw):
-                        break
-                packets.append(hk_packet_cls.from_bytes(new_packet))
-                index += 28
-                continue
-            # Check if raw[index - 3:index] + raw[index+12:index+13] == sync_lxi
-            elif raw[index - 3 : index] + raw[index + 12 : index + 13] == sync_lxi:
-                # Reorder the packet
-                new_packet = (
-                    raw[index : index + 12] + raw[index - 3 : index] + raw[index + 12 : index + 25]
-                )
-                packets.append(hk_packet_cls.from_bytes(new_packet))
-                index += 28
-                continue
-            # Check if raw[index - 2:index] + raw[index+12:index+14] == sync_lxi
-            elif raw[index - 2 : index] + raw[index + 12 : index + 14] == sync_lxi:
-                # Reorder the packet
-                new_packet = (
-                    raw[index : index + 12] + raw[index - 2 : index] + raw[index + 13 : index + 26]
-                )
-                packets.append(hk_packet_cls.from_bytes(new_packet))
-                index += 28
-                continue
-            # Check if raw[index - 1:index] + raw[index+12:index+15] == sync_lxi
-            elif raw[index - 1 : index] + raw[index + 12 : index + 15] == sync_lxi:
-                # Reorder the packet
-                new_packet = (
-                    raw[index : index + 12] + raw[index - 1 : index] + raw[index + 14 : index + 27]
-                )
-                packets.append(hk_packet_cls.from_bytes(new_packet))
-                index += 28
-                continue
-            index += 28
-            continue
-        index += 28
-
-    # Get only those packets that have the HK data
-    hk_idx = []
-    for idx, hk_packet in enumerate(packets):
-        if hk_packet is not None:
-            hk_idx.append(idx)
-
-    Date = np.full(len(hk_idx), np.nan)
-    TimeStamp = np.full(len(hk_idx), np.nan)
-    HK_id = np.full(len(hk_idx), np.nan)
-    PinPullerTemp = np.full(len(hk_idx), np.nan)
-    OpticsTemp = np.full(len(hk_idx), np.nan)
-    LEXIbaseTemp = np.full(len(hk_idx), np.nan)
-    HVsupplyTemp = np.full(len(hk_idx), np.nan)
-    V_Imon_5_2 = np.full(len(hk_idx), np.nan)
-    V_Imon_10 = np.full(len(hk_idx), np.nan)
-    V_Imon_3_3 = np.full(len(hk_idx), np.nan)
-    AnodeVoltMon = np.full(len(hk_idx), np.nan)
-    V_Imon_28 = np.full(len(hk_idx), np.nan)
-    ADC_Ground = np.full(len(hk_idx), np.nan)
-    Cmd_count = np.full(len(hk_idx), np.nan)
-    Pinpuller_Armed = np.full(len(hk_idx), np.nan)
-    Unused1 = np.full(len(hk_idx), np.nan)
-    Unused2 = np.full(len(hk_idx), np.nan)
-    HVmcpAuto = np.full(len(hk_idx), np.nan)
-    HVmcpMan = np.full(len(hk_idx), np.nan)
-    DeltaEvntCount = np.full(len(hk_idx), np.nan)
-    DeltaDroppedCount = np.full(len(hk_idx), np.nan)
-    DeltaLostEvntCount = np.full(len(hk_idx), np.nan)
+    if hk_data is None:
+        with open(input_file_name, "rb") as file:
+            raw = file.read()
 
-    all_data_dict = {
-        "Date": Date,
-        "TimeStamp": TimeStamp,
-        "HK_id": HK_id,
-        "0": PinPullerTemp,
-        "1": OpticsTemp,
-        "2": LEXIbaseTemp,
-        "3": HVsupplyTemp,
-        "4": V_Imon_5_2,
-        "5": V_Imon_10,
-        "6": V_Imon_3_3,
-        "7": AnodeVoltMon,
-        "8": V_Imon_28,
-        "9": ADC_Ground,
-        "10": Cmd_count,
-        "11": Pinpuller_Armed,
-        "12": Unused1,
-        "13": Unused2,
-        "14": HVmcpAuto,
-        "15": HVmcpMan,
-        "DeltaEvntCount": DeltaEvntCount,
-        "DeltaDroppedCount": DeltaDroppedCount,
-        "DeltaLostEvntCount": DeltaLostEvntCount,
-    }
+        # Decode all the housekeeping packets in the file at once
+        hk_data = ldf.decode_hk_data(raw)
 
-    selected_keys = [
-        "0",
-        "1",
-        "2",
-        "3",
-        "4",
-        "5",
-        "6",
-        "7",
-        "8",
-        "9",
-        "10",
-        "11",
-        "12",
-        "13",
-        "14",
-        "15",
-    ]
+    # Convert the hk_value of all the packets at once. Each "hk_id" gets its own column, which is
+    # NaN for the packets with a different "hk_id".
+    hk_values = lmsc.hk_value_comp_array(
+        vpc=volts_per_count, hk_value=hk_data["hk_value"], hk_id=hk_data["hk_id"], lxi_unit=1
+    )
 
-    for ii, idx in enumerate(hk_idx):
-        hk_packet = packets[idx]
-        # Convert to seconds from milliseconds for the timestamp
-        if "payload" in in_file_name:
-            all_data_dict["Date"][ii] = hk_packet.Date
-        else:
-            default_time = datetime.datetime(2024, 1, 1, 0, 0, 0, tzinfo=pytz.timezone("UTC"))
-            new_time = default_time + datetime.timedelta(milliseconds=hk_packet.timestamp)
-            all_data_dict["Date"][ii] = new_time.timestamp()
-        all_data_dict["TimeStamp"][ii] = hk_packet.timestamp / 1e3
-        all_data_dict["HK_id"][ii] = hk_packet.hk_id
-        key = str(hk_packet.hk_id)
-        if key in selected_keys:
-            all_data_dict[key][ii] = lmsc.hk_value_comp(
-                ii=ii,
-                vpc=volts_per_count,
-                hk_value=hk_packet.hk_value,
-                hk_id=hk_packet.hk_id,
-                lxi_unit=1,
-            )
+    # Convert the times of all the packets to UTC dates at once
+    if "payload" in in_file_name:
+        Date = ldf.unix_time_to_datetime64(hk_data["Date"])
+    else:
+        Date = ldf.gsfc_time_to_datetime64(hk_data["timestamp"])
 
-        all_data_dict["DeltaEvntCount"][ii] = hk_packet.delta_event_count
-        all_data_dict["DeltaDroppedCount"][ii] = hk_packet.delta_drop_event_count
-        all_data_dict["DeltaLostEvntCount"][ii] = hk_packet.delta_lost_event_count
+    all_data_dict = {
+        "Date": Date,
+        "TimeStamp": hk_data["timestamp"] / 1e3,
+        "HK_id": hk_data["hk_id"].astype(np.float64),
+        **{str(hk_id): hk_values[:, hk_id] for hk_id in range(16)},
+        "DeltaEvntCount": hk_data["delta_event_count"].astype(np.float64),
+        "DeltaDroppedCount": hk_data["delta_drop_event_count"].astype(np.float64),
+        "DeltaLostEvntCount": hk_data["delta_lost_event_count"].astype(np.float64),
+    }
 
     # Create a dataframe with the data
     df_key_list = [
@@ -597,22 +407,13 @@ def read_binary_data_hk(
         "DeltaLostEvntCount",
     ]
 
-    Date_datetime = [datetime.datetime.utcfromtimestamp(x) for x in all_data_dict["Date"]]
-
     df = pd.DataFrame(columns=df_key_list)
     for ii, key in enumerate(df_key_list):
         df[key] = all_data_dict[list(all_data_dict.keys())[ii]]
 
     # For the dataframe, replace the nans with the value from the previous index.
     # This is to make sure that the file isn't inundated with nans.
-    for key in df.keys():
-        for ii in range(1, len(df[key])):
-            if np.isnan(df[key][ii]):
-                # df[key][ii] = df[key][ii - 1]
-                df.loc[ii, key] = df.loc[ii - 1, key]
-
-    # Set the date column to the Date_datetime
-    df["Date"] = Date_datetime
+    df = df.ffill()
 
     # Set Date as the index without replacing the column
     df.set_index("Date", inplace=True, drop=False)
@@ -631,14 +432,71 @@ def read_binary_data_hk(
     if not Path(output_folder_name).exists():
         Path(output_folder_name).mkdir(parents=True, exist_ok=True)
 
-    # Save the dataframe to a csv file
-    df.to_csv(save_file_name, index=False)
+    # Save the dataframe in the selected file format
+    save_file_name = lio.save_l1a_file(df=df, save_file_name=save_file_name, file_format=file_format)
 
     return df, save_file_name
 
 
+def l1a_file_summary(
+    file_name=None,
+    df_sci=None,
+    df_hk=None,
+    sci_save_filename=None,
+    hk_save_filename=None,
+    decode_stats=None,
+):
+    """
+    Makes a compact summary of the L1a files produced from a level 0 file, small enough to be
+    passed between processes in place of the data frames.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the level 0 file.
+    df_sci : pandas.DataFrame
+        DataFrame of the science packet.
+    df_hk : pandas.DataFrame
+        DataFrame of the housekeeping packet.
+    sci_save_filename : str
+        Name of the file where the science packet is saved.
+    hk_save_filename : str
+        Name of the file where the housekeeping packet is saved.
+    decode_stats : dict
+        Statistics of the decode of the file. See "lxi_decode_funcs.file_decode_stats".
+
+    Returns
+    -------
+    summary : dict
+        Dictionary with the "file_name", the names of the L1a files ("sci_file" and "hk_file"),
+        the number of rows ("sci_rows" and "hk_rows"), the first and last date of the packets in
+        ISO format ("time_start" and "time_end", None if there are no packets) and the
+        "decode_stats".
+    """
+    dates = [pd.to_datetime(df["Date"], utc=True) for df in (df_sci, df_hk) if len(df) > 0]
+    if dates:
+        time_start = min(date.min() for date in dates).isoformat()
+        time_end = max(date.max() for date in dates).isoformat()
+    else:
+        time_start = time_end = None
+
+    return {
+        "file_name": file_name,
+        "sci_file": sci_save_filename,
+        "hk_file": hk_save_filename,
+        "sci_rows": len(df_sci),
+        "hk_rows": len(df_hk),
+        "time_start": time_start,
+        "time_end": time_end,
+        "decode_stats": decode_stats,
+    }
+
+
 def read_binary_file(
     file_val=None,
+    file_format="csv",
+    n_workers=1,
+    return_summary=False,
 ):
     """
     Reads binary files from the level 0 data folder and returns the data frames for science and
@@ -648,6 +506,14 @@ def read_binary_file(
     ----------
     file_val : str
         Name of the file to read.
+    file_format : str
+        Format of the L1a output files, "csv" or "npz". Default is "csv".
+    n_workers : int
+        Number of processes used to decode the file. With more than one, large files are split
+        into ranges of frames which are decoded in parallel. Default is 1.
+    return_summary : bool
+        If True, only the summary from "l1a_file_summary" is returned instead of the data frames,
+        for callers which only need the L1a files on the disk. Default is False.
 
     Returns
     -------
@@ -661,11 +527,33 @@ def read_binary_file(
         Name of the file where the science packet is saved.
     hk_save_filename : str
         Name of the file where the housekeeping packet is saved.
+    decode_stats : dict
+        Statistics of the decode of the file. See "lxi_decode_funcs.file_decode_stats".
+    summary : dict
+        Only if return_summary is True, in place of all the above. See "l1a_file_summary".
     """
     file_name = file_val
 
-    # Read the binary file and get the data frames
-    df_sci, sci_save_filename = read_binary_data_sci(file_val)
-    df_hk, hk_save_filename = read_binary_data_hk(file_val)
+    # Decode the science and the housekeeping packets together in a single pass through a memory
+    # map of the file
+    if n_workers == 1:
+        sci_data, hk_data, decode_stats = ldf.read_pit_data(file_val, return_stats=True)
+    else:
+        sci_data, hk_data, decode_stats = ldf.read_pit_data_parallel(
+            file_val, n_workers=n_workers, return_stats=True
+        )
+
+    # Get the data frames
+    df_sci, sci_save_filename = read_binary_data_sci(
+        file_val, sci_data=sci_data, file_format=file_format
+    )
+    df_hk, hk_save_filename = read_binary_data_hk(
+        file_val, hk_data=hk_data, file_format=file_format
+    )
+
+    if return_summary:
+        return l1a_file_summary(
+            file_name, df_sci, df_hk, sci_save_filename, hk_save_filename, decode_stats
+        )
 
-    return file_name, df_sci, df_hk, sci_save_filename, hk_save_filename
+    return file_name, df_sci, df_hk, sci_save_filename, hk_save_filename, decode_stats
@@ -1,27 +1,33 @@
 import datetime
-import glob
 import importlib
-import re
 import warnings
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import lxi_file_catalog as lfc
+import lxi_l1a_io as lio
 import numpy as np
 import pandas as pd
 import save_data_to_cdf_lib as sdtc
-from dateutil import parser
 
 importlib.reload(sdtc)
+importlib.reload(lfc)
+importlib.reload(lio)
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
 # Get the list of files in the folder and subfolders
 hk_folder = "/mnt/cephadrius/bu_research/lexi_data/L1a/hk/"
+catalog_path = "/mnt/cephadrius/bu_research/lexi_data/" + lfc.catalog_file_name
 
-# Get all files in the folder and subfolders
-file_val_list = sorted(glob.glob(str(hk_folder) + "/**/*.csv", recursive=True))
+# Bring the catalog of the files up to date, only the new and changed files are added, and get
+# the L1a housekeeping files in any of the L1a file formats from it
+lfc.update_catalog(catalog_path, folders=[hk_folder])
+catalog_files = lfc.query_files(catalog_path, level="L1a", kind="hk")
+file_times = {file["path"]: file["start_time"] for file in catalog_files}
+file_val_list = lio.select_l1a_files(list(file_times))
 
 # Randomly select 100 files for testing
 np.random.seed(42)
@@ -34,19 +40,16 @@ start_time = datetime.datetime(2025, 1, 16, 0, 0, 0, tzinfo=datetime.timezone.ut
 # Dictionary to store grouped files
 grouped_files = defaultdict(list)
 
-# Extract timestamps from filenames and group by 1-hour periods
+# Group the files by 1-hour periods, with the time of the file from the catalog
 for file in selected_file_val_list:
-    match = re.search(r"payload_lexi_(\d+)_", file)
-    if match:
-        timestamp = int(match.group(1))
-        file_time = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+    file_time = file_times[file]
 
-        # Compute the hour bin index
-        delta = file_time - start_time
-        hour_bin = delta.total_seconds() // 3600
+    # Compute the hour bin index
+    delta = file_time - start_time
+    hour_bin = delta.total_seconds() // 3600
 
-        # Assign to the corresponding group (fix incorrect append)
-        grouped_files[hour_bin].append((file, file_time))
+    # Assign to the corresponding group (fix incorrect append)
+    grouped_files[hour_bin].append((file, file_time))
 
 # Convert groups to a sorted list
 sorted_groups = {k: sorted(v, key=lambda x: x[1]) for k, v in sorted(grouped_files.items())}
@@ -63,7 +66,7 @@ def process_hour_bin(hour_bin, files):
 
     all_data = []
     for file, file_time in files:
-        df = pd.read_csv(file)
+        df = lio.read_l1a_file(file)
         all_data.append(df)
 
     # Concatenate all dataframes
@@ -115,11 +118,8 @@ def process_hour_bin(hour_bin, files):
     # Set the Date as index
     # combined_df["Date"] = pd.to_datetime(combined_df["Date"], utc=True)
     # combined_df.set_index("Date", inplace=True)
-    combined_df["Date"] = combined_df["Date"].apply(parser.parse)
-    try:
-        combined_df["Date"] = combined_df["Date"].dt.tz_localize("UTC")
-    except Exception:
-        combined_df["Date"] = combined_df["Date"].dt.tz_localize("UTC")
+    # The npz L1a files already have the Date as datetime, the csv files are parsed at once
+    combined_df["Date"] = lio.l1a_dates_to_utc(combined_df["Date"])
     combined_df.set_index("Date", inplace=True)
 
     # Save the data as cdf file
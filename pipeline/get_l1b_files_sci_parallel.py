@@ -1,12 +1,17 @@
+import argparse
 import datetime
-import glob
 import importlib
-import re
 import warnings
 from collections import defaultdict
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import get_l1a_files as glf
+import lxi_file_catalog as lfc
+import lxi_hour_bins as lhb
+import lxi_l1a_io as lio
+import lxi_l1b_funcs as lbf
+import lxi_run_journal as lrj
 import numpy as np
 import pandas as pd
 import save_data_to_cdf as sdtc
@@ -14,17 +19,28 @@ from dateutil import parser
 from tqdm import tqdm  # Import tqdm for the progress bar
 
 importlib.reload(sdtc)
+importlib.reload(glf)
+importlib.reload(lio)
+importlib.reload(lrj)
+importlib.reload(lfc)
+importlib.reload(lhb)
+importlib.reload(lbf)
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
 
+# Matrix and offsets of the linearity correction
+lin_correction_M_inv = np.array([[0.98678, 0.16204], [0.11385, 0.993497]])
+lin_correction_b = np.array([0.5529, 0.5596])
+
+
 def lin_correction(
     x,
     y,
-    M_inv=np.array([[0.98678, 0.16204], [0.11385, 0.993497]]),
-    b=np.array([0.5529, 0.5596]),
+    M_inv=lin_correction_M_inv,
+    b=lin_correction_b,
 ):
     """
     Function to apply linearity correction to MCP position x/y data
@@ -55,102 +71,112 @@ def level1b_data_processing(df=None, lower_threshold=None):
     # channel_3_lower_threshold = min(2, df["Channel3"].min())
     # channel_4_lower_threshold = min(2, df["Channel4"].min())
 
-    if lower_threshold is None:
-        channel_1_lower_threshold = 1
-        channel_2_lower_threshold = 1
-        channel_3_lower_threshold = 1
-        channel_4_lower_threshold = 1
-    else:
-        channel_1_lower_threshold = lower_threshold
-        channel_2_lower_threshold = lower_threshold
-        channel_3_lower_threshold = lower_threshold
-        channel_4_lower_threshold = lower_threshold
-
-    # Compute the shifted values for each channel (only if IsCommanded is False), otherwise set to
-    # NaN
-
-    df.loc[df["IsCommanded"] == False, "Channel1_shifted"] = (
-        df["Channel1"] - channel_1_lower_threshold
-    )
-    df.loc[df["IsCommanded"], "Channel1_shifted"] = np.nan
-    df.loc[df["Channel1_shifted"] < 0, "Channel1_shifted"] = np.nan
-
-    df.loc[df["IsCommanded"] == False, "Channel2_shifted"] = (
-        df["Channel2"] - channel_2_lower_threshold
-    )
-    df.loc[df["IsCommanded"], "Channel2_shifted"] = np.nan
-    df.loc[df["Channel2_shifted"] < 0, "Channel2_shifted"] = np.nan
-
-    df.loc[df["IsCommanded"] == False, "Channel3_shifted"] = (
-        df["Channel3"] - channel_3_lower_threshold
+    # Compute the shifted values for each channel (only if IsCommanded is False, otherwise NaN),
+    # the position in voltage coordinates, the linear correction and the voltage to MCP
+    # conversion in a single pass
+    df = lbf.add_level1b_positions(
+        df,
+        mcp_keys=("photon_x_mcp", "photon_y_mcp"),
+        lower_threshold=lower_threshold,
+        M_inv=lin_correction_M_inv,
+        b=lin_correction_b,
     )
-    df.loc[df["IsCommanded"], "Channel3_shifted"] = np.nan
-    df.loc[df["Channel3_shifted"] < 0, "Channel3_shifted"] = np.nan
-
-    df.loc[df["IsCommanded"] == False, "Channel4_shifted"] = (
-        df["Channel4"] - channel_4_lower_threshold
-    )
-    df.loc[df["IsCommanded"], "Channel4_shifted"] = np.nan
-    df.loc[df["Channel4_shifted"] < 0, "Channel4_shifted"] = np.nan
-
-    # Compute the position in voltage coordiantes
-    df["x_volt"] = df["Channel3_shifted"] / (df["Channel3_shifted"] + df["Channel1_shifted"])
-    df["y_volt"] = df["Channel2_shifted"] / (df["Channel2_shifted"] + df["Channel4_shifted"])
-
-    # Apply the linear correction
-    df["x_volt_lin"], df["y_volt_lin"] = lin_correction(df["x_volt"], df["y_volt"])
-
-    # Apply the voltage to MCP conversion
-    df["photon_x_mcp"], df["photon_y_mcp"] = volt_to_mcp(df["x_volt_lin"], df["y_volt_lin"])
 
     return df
 
 
-def process_file_group(hour_bin, files, start_time, output_sci_folder):
-    bin_start_time = start_time + datetime.timedelta(hours=hour_bin)
-    bin_end_time = bin_start_time + datetime.timedelta(hours=1)
+def process_files(files, from_level_0=False, l1a_format=None):
+    if from_level_0:
+        return process_level_0_files(files, l1a_format=l1a_format)
 
     all_data = []
     for file, file_time in files:
-        df = pd.read_csv(file)
+        df = lio.read_l1a_file(file)
         all_data.append(df)
 
     # Concatenate all dataframes
     combined_df = pd.concat(all_data, ignore_index=True)
 
     # Apply the level1b data processing
-    processed_df = level1b_data_processing(combined_df)
+    return level1b_data_processing(combined_df)
 
-    # Get the date and time for the filename
-    bin_start_time_str = bin_start_time.strftime("%Y-%m-%d")
 
-    # Correct file path
-    output_sci_file_name = (
-        output_sci_folder
-        / bin_start_time_str
-        / f"payload_lexi_{bin_start_time.strftime('%Y-%m-%d_%H-%M-%S')}_to_{bin_end_time.strftime('%Y-%m-%d_%H-%M-%S')}_sci_output_L1b_v0.0.cdf"
+def process_level_0_files(files, l1a_format=None):
+    # The science packets of the level 0 files are decoded one window at a time and each window
+    # goes straight to the level1b processing, which is done row by row. The L1a files are only
+    # saved when a format is given.
+    processed_data = []
+    for file, file_time in files:
+        if l1a_format is None:
+            l1a_batches = glf.iter_level_0_sci(file)
+        else:
+            l1a_batches = [glf.read_binary_file(file, file_format=l1a_format)[1]]
+        processed_data.extend(level1b_data_processing(df) for df in l1a_batches)
+
+    return pd.concat(processed_data, ignore_index=True)
+
+
+def process_file_group(
+    hour_bin,
+    files,
+    start_time,
+    output_sci_folder,
+    versions=None,
+    from_level_0=False,
+    l1a_format=None,
+):
+    save_file_group(
+        hour_bin,
+        process_files(files, from_level_0=from_level_0, l1a_format=l1a_format),
+        start_time,
+        output_sci_folder,
+        versions,
     )
 
-    # Check if the file by that version number already exists, if it does, then increase the version
-    # number by 1 and save the file with that version number
-    primary_version = 0
-    secondary_version = 0
 
-    while True:
-        output_sci_file_name = (
-            output_sci_folder
-            / bin_start_time_str
-            / f"payload_lexi_{bin_start_time.strftime('%Y-%m-%d_%H-%M-%S')}_to_{bin_end_time.strftime('%Y-%m-%d_%H-%M-%S')}_sci_output_L1b_v{primary_version}.{secondary_version}.cdf"
-        )
+def process_file_shard(files, shard_file, from_level_0=False, l1a_format=None):
+    # Part of a large hour bin, saved until all the parts of the bin are processed
+    process_files(files, from_level_0=from_level_0, l1a_format=l1a_format).to_pickle(shard_file)
+
+
+def merge_file_shards(
+    hour_bin,
+    shard_files,
+    start_time,
+    output_sci_folder,
+    versions=None,
+    from_level_0=False,
+    l1a_format=None,
+):
+    # The level1b processing is done row by row, so the processed parts only need to be joined
+    processed_df = pd.concat(
+        [pd.read_pickle(shard_file) for shard_file in shard_files], ignore_index=True
+    )
+    save_file_group(hour_bin, processed_df, start_time, output_sci_folder, versions)
+
+
+def l1b_file_name(bin_start_time, output_sci_folder, version):
+    bin_end_time = bin_start_time + datetime.timedelta(hours=1)
+    return (
+        output_sci_folder
+        / bin_start_time.strftime("%Y-%m-%d")
+        / f"payload_lexi_{bin_start_time.strftime('%Y-%m-%d_%H-%M-%S')}_to_{bin_end_time.strftime('%Y-%m-%d_%H-%M-%S')}_sci_output_L1b_v{version}.cdf"
+    )
 
-        if not output_sci_file_name.exists():  # Check if file exists
-            break  # Stop loop when an unused filename is found
 
-        # Increment secondary version; if it exceeds 9, increment primary version and reset secondary
-        secondary_version += 1
-        if secondary_version > 9:
-            secondary_version = 0
-            primary_version += 1
+def save_file_group(hour_bin, processed_df, start_time, output_sci_folder, versions=None):
+    bin_start_time = start_time + datetime.timedelta(hours=hour_bin)
+
+    # The version of the file is chosen by main when the run is journaled. Otherwise check if the
+    # file by that version number already exists, if it does, then increase the version number by
+    # 1 and save the file with that version number
+    if versions is not None and hour_bin in versions:
+        version = versions[hour_bin]
+    else:
+        version = lrj.first_free_version(
+            lambda version: l1b_file_name(bin_start_time, output_sci_folder, version)
+        )
+    output_sci_file_name = l1b_file_name(bin_start_time, output_sci_folder, version)
 
     # Based on the output file name, create the folder if it doesn't exist
     output_sci_file_name.parent.mkdir(parents=True, exist_ok=True)
@@ -161,45 +187,68 @@ def process_file_group(hour_bin, files, start_time, output_sci_folder):
     #     f"\n Saved \033[1;94m {Path(output_sci_file_name).parent}/\033[1;92m{Path(output_sci_file_name).name} \033[0m"
     # )
 
-    # Set the Date as index
-    processed_df["Date"] = processed_df["Date"].apply(parser.parse)
-    try:
-        processed_df["Date"] = processed_df["Date"].dt.tz_convert("UTC")
-    except Exception:
-        processed_df["Date"] = processed_df["Date"].dt.tz_localize("UTC")
+    # Set the Date as index. The npz L1a files already have the Date as datetime, the csv
+    # files are parsed at once.
+    processed_df["Date"] = lio.l1a_dates_to_utc(processed_df["Date"])
     processed_df.set_index("Date", inplace=True)
 
     # Save the data as cdf file
     sdtc.save_data_to_cdf(
         df=processed_df,
         file_name=output_sci_file_name,
-        file_version=f"{primary_version}.{secondary_version}",
+        file_version=version,
     )
 
 
-def main(start_time=None, end_time=None):
-    # Get the list of files in the folder and subfolders
-    sci_folder = "/mnt/cephadrius/bu_research/lexi_data/L1a/sci/csv/"
-
-    # Get all files in the folder and subfolders
-    file_val_list = sorted(glob.glob(str(sci_folder) + "/**/*.csv", recursive=True))
+def main(
+    start_time=None,
+    end_time=None,
+    refresh_catalog=True,
+    resume=False,
+    from_level_0=False,
+    l1a_format=None,
+):
+    # Get the list of files in the folder and subfolders. With from_level_0, the L1b files are
+    # made from the level 0 payload files in memory, without reading the L1a files, and the L1a
+    # files are only saved if l1a_format is given. The whole L1a science folder is cataloged: the
+    # csv files are in its "csv" subfolder, and the files saved by get_l1a_files, in any of the
+    # L1a file formats, are in its day subfolders.
+    sci_folder = "/mnt/cephadrius/bu_research/lexi_data/L1a/sci/"
+    level_zero_folder = "/mnt/cephadrius/bu_research/lexi_data/L0/"
+    catalog_path = "/mnt/cephadrius/bu_research/lexi_data/" + lfc.catalog_file_name
+
+    # Bring the catalog of the files up to date. Only the new and changed files are added, so
+    # this can be skipped when the catalog was just updated.
+    if refresh_catalog:
+        lfc.update_catalog(
+            catalog_path, folders=[level_zero_folder if from_level_0 else sci_folder]
+        )
 
-    # Filter files based on the start and end time
+    # Select the L1a files of the time range from the catalog, in any of the L1a file formats, or
+    # the level 0 payload files
     if start_time is not None and end_time is not None:
         start_time = parser.parse(start_time)
         end_time = parser.parse(end_time)
-        file_val_list = [
-            file
-            for file in file_val_list
-            if start_time
-            <= datetime.datetime.fromtimestamp(
-                int(re.search(r"payload_lexi_(\d+)_", file).group(1)), tz=datetime.timezone.utc
-            )
-            <= end_time
-        ]
     else:
         # Select all files
-        file_val_list = sorted(glob.glob(str(sci_folder) + "/**/*.csv", recursive=True))
+        start_time = None
+        end_time = None
+    if from_level_0:
+        catalog_files = lfc.query_files(
+            catalog_path, level="L0", start_time=start_time, end_time=end_time
+        )
+    else:
+        catalog_files = lfc.query_files(
+            catalog_path, level="L1a", kind="sci", start_time=start_time, end_time=end_time
+        )
+    file_times = {file["path"]: file["start_time"] for file in catalog_files}
+    file_sizes = {file["path"]: file["size"] for file in catalog_files}
+    file_info = {file["path"]: file for file in catalog_files}
+    if from_level_0:
+        file_val_list = list(file_times)
+    else:
+        file_val_list = lio.select_l1a_files(list(file_times))
+
     # Randomly select 100 files for testing
     # np.random.seed(43)
     # selected_file_val_list = np.random.choice(file_val_list, size=1000, replace=False)
@@ -211,53 +260,102 @@ def main(start_time=None, end_time=None):
     grouped_files = defaultdict(list)
     # Extract timestamps from filenames and group by 1-hour periods
     for file in file_val_list:
-        match = re.search(r"payload_lexi_(\d+)_", file)
-        if match:
-            timestamp = int(match.group(1))
-            file_time = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+        file_time = file_times[file]
 
-            # Compute the hour bin index
-            delta = file_time - start_time
-            hour_bin = delta.total_seconds() // 3600
+        # Compute the hour bin index
+        delta = file_time - start_time
+        hour_bin = delta.total_seconds() // 3600
 
-            # Assign to the corresponding group (fix incorrect append)
-            grouped_files[hour_bin].append((file, file_time))
+        # Assign to the corresponding group (fix incorrect append)
+        grouped_files[hour_bin].append((file, file_time))
     # Convert groups to a sorted list
     sorted_groups = {k: sorted(v, key=lambda x: x[1]) for k, v in sorted(grouped_files.items())}
     # Output folder for merged files
     output_sci_folder = Path("/mnt/cephadrius/bu_research/lexi_data/L1b/sci/cdf/")
     output_sci_folder.mkdir(parents=True, exist_ok=True)
 
-    # Use ProcessPoolExecutor to parallelize the processing of file groups
-    with ProcessPoolExecutor() as executor:
-        # Submit tasks to the executor
-        futures = {
-            executor.submit(
-                process_file_group, hour_bin, files, start_time, output_sci_folder
-            ): hour_bin
-            for hour_bin, files in sorted_groups.items()
+    # The journal of the runs lists the hour bins which were started and finished, with the
+    # fingerprint of their input files and the version of their output file. With resume, the
+    # finished bins are skipped and the interrupted bins are saved again into the same version, so
+    # an interrupted run can be started again without making duplicate files.
+    journal_path = output_sci_folder / lrj.journal_file_name
+    bin_starts = {
+        hour_bin: start_time + datetime.timedelta(hours=hour_bin) for hour_bin in sorted_groups
+    }
+    fingerprints = {
+        hour_bin: lrj.input_fingerprint(files, file_info)
+        for hour_bin, files in sorted_groups.items()
+    }
+    versions, skipped = lrj.plan_run(
+        journal=lrj.load_journal(journal_path),
+        bin_starts=bin_starts,
+        fingerprints=fingerprints,
+        output_file_name=lambda bin_start, version: l1b_file_name(
+            bin_start, output_sci_folder, version
+        ),
+        resume=resume,
+    )
+    if skipped:
+        print(f"Skipping {len(skipped)} hour bins finished in a previous run")
+    sorted_groups = {k: v for k, v in sorted_groups.items() if k in versions}
+    journal_entries = {
+        hour_bin: {
+            "bin_start": bin_starts[hour_bin].isoformat(),
+            "fingerprint": fingerprints[hour_bin],
+            "version": version,
+            "output_file": str(l1b_file_name(bin_starts[hour_bin], output_sci_folder, version)),
         }
+        for hour_bin, version in versions.items()
+    }
+    lrj.append_entries(
+        journal_path, [{**entry, "status": "started"} for entry in journal_entries.values()]
+    )
 
+    # All the hour bins of the time range go to a single pool, the most expensive first, so that
+    # the workers stay busy until the end of the run. The bins much larger than the others are
+    # split into shards which are processed in parallel and merged before the cdf file is saved.
+    work_items = lhb.plan_hour_bins(sorted_groups, file_sizes)
+    with ProcessPoolExecutor() as executor:
         # Use tqdm to display a progress bar
-        for future in tqdm(
-            as_completed(futures), total=len(futures), desc="Processing file groups"
+        for hour_bin, error, _ in tqdm(
+            lhb.run_hour_bins(
+                executor,
+                work_items,
+                process_group=process_file_group,
+                process_shard=process_file_shard,
+                merge_shards=merge_file_shards,
+                group_args=(start_time, output_sci_folder, versions, from_level_0, l1a_format),
+                shard_args=(from_level_0, l1a_format),
+                shard_folder=output_sci_folder,
+            ),
+            total=len(sorted_groups),
+            desc="Processing file groups",
         ):
-            hour_bin = futures[future]
-            try:
-                future.result()
-            except Exception as e:
-                print(f"Error processing hour bin {hour_bin}: {e}")
+            if error is not None:
+                print(f"Error processing hour bin {hour_bin}: {error}")
+            else:
+                lrj.append_entries(journal_path, [{**journal_entries[hour_bin], "status": "done"}])
 
 
-start_date = 30
-start_hour = 0
-end_hour = 24
+# Time range to process. All the hour bins of the range are processed in a single run.
+start_time = "2024-05-30T00:00:00Z"
+end_time = "2024-06-05T23:59:59Z"
 if __name__ == "__main__":
-    for month in range(5, 6):
-        for day in range(start_date, start_date + 7):
-            for hour in range(start_hour, end_hour):
-                start_time = f"2024-{month:02d}-{day:02d}T{hour:02d}:00:00Z"
-                end_time = f"2024-{month:02d}-{day:02d}T{hour:02d}:59:59Z"
-                print(f"Processing from {start_time} to {end_time}")
-                main(start_time=start_time, end_time=end_time)
-    print(f"\n\nProcessing completed for {start_date} from {start_hour} to {end_hour}")
+    # Run with --resume to skip the hour bins finished by an interrupted run
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--resume", action="store_true")
+    # Run with --from-level-0 to make the L1b files straight from the level 0 files, and add
+    # --l1a-format csv (or npz) to save the L1a files on the way
+    arg_parser.add_argument("--from-level-0", action="store_true")
+    arg_parser.add_argument("--l1a-format", choices=list(lio.l1a_file_formats), default=None)
+    args = arg_parser.parse_args()
+
+    print(f"Processing from {start_time} to {end_time}")
+    main(
+        start_time=start_time,
+        end_time=end_time,
+        resume=args.resume,
+        from_level_0=args.from_level_0,
+        l1a_format=args.l1a_format,
+    )
+    print(f"\n\nProcessing completed from {start_time} to {end_time}")
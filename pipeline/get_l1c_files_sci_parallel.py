@@ -1,13 +1,17 @@
+import argparse
 import datetime
 import glob
 import importlib
-import re
 import warnings
 from collections import defaultdict
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from multiprocessing import Pool, cpu_count
 from pathlib import Path
 
+import lxi_asset_cache as lac
+import lxi_file_catalog as lfc
+import lxi_hour_bins as lhb
+import lxi_run_journal as lrj
 import numpy as np
 import pandas as pd
 import pytz
@@ -17,6 +21,10 @@ from spacepy.pycdf import CDF as cdf
 from tqdm import tqdm  # Import tqdm for the progress bar
 
 importlib.reload(sdtc)
+importlib.reload(lac)
+importlib.reload(lfc)
+importlib.reload(lhb)
+importlib.reload(lrj)
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning)
@@ -26,6 +34,14 @@ warnings.filterwarnings("ignore", category=RuntimeWarning)
 # Precompute transformation matrices
 deg2rad = np.pi / 180
 
+# Pointing and quaternion files used to compute the RA and Dec of the photons
+pointing_file_name = (
+    "../data/pointing/"
+    #     "lexi_look_direction_data_uninterpolated_2025-03-02_00-00-00_to_2025-03-16_23-59-59_v0.0.csv"
+    "lexi_look_direction_data_resampled_interpolated_2025-03-02_00-00-00_to_2025-03-16_23-59-59_v0.0.csv"
+)
+quaternion_folder = "../data/quaternions/"
+
 # NOTE: The RA and Dec and other rotation matrices are hardcoded for computing the values of RA and
 # Deec of each photon for 2025-03-16. This was done since the error between the hardcoded values and
 # the actuual values are less than 1%. For the full mission, the RA and Dec values will need to be
@@ -84,23 +100,67 @@ def compute_R_db(theta1, theta2, theta3):
     return R
 
 
-def get_body_detector_rotation_matrix(epoch_value=None):
+def read_pointing_file(file_name=None):
     """
-    Get the rotation matrices for transforming coordinates from MCP to Lander and Lunar frames.
+    Reads the pointing file, with the Epoch as a sorted UTC index.
     """
-    pointing_folder = "../data/pointing/"
-    pointing_file = (
-        pointing_folder
-        +
-        #     "lexi_look_direction_data_uninterpolated_2025-03-02_00-00-00_to_2025-03-16_23-59-59_v0.0.csv"
-        "lexi_look_direction_data_resampled_interpolated_2025-03-02_00-00-00_to_2025-03-16_23-59-59_v0.0.csv"
-    )
-
-    df_pointing = pd.read_csv(pointing_file, index_col=None)
+    df_pointing = pd.read_csv(file_name, index_col=None)
     # Convert Epoch to datetime and set as index
     df_pointing["Epoch"] = pd.to_datetime(df_pointing["Epoch"], format="mixed", utc=True)
     df_pointing.set_index("Epoch", inplace=True)
     df_pointing.sort_index(inplace=True)
+    return df_pointing
+
+
+def read_quaternion_file(file_name=None):
+    """
+    Reads a quaternion file, with the Epoch_UTC as a sorted UTC index.
+    """
+    df_quaternions = pd.read_csv(file_name, index_col=None)
+    # Drop the "Epoch_MJD" column if it exists
+    if "Epoch_MJD" in df_quaternions.columns:
+        df_quaternions.drop(columns=["Epoch_MJD"], inplace=True)
+    # Convert Epoch_UTC to datetime and set as index
+    df_quaternions["Epoch_UTC"] = pd.to_datetime(
+        df_quaternions["Epoch_UTC"].str.slice(0, -3), format="mixed", utc=True
+    )
+    df_quaternions.set_index("Epoch_UTC", inplace=True)
+
+    df_quaternions.sort_index(inplace=True)
+    return df_quaternions
+
+
+def get_quaternion_file_name(quaternion_type="actual"):
+    """
+    Name of the "Actual" or "Nominal" quaternion file, None if there is none.
+    """
+    all_files = sorted(glob.glob(str(quaternion_folder) + "*.csv"))
+    if quaternion_type == "actual":
+        quaternion_file_name = [f for f in all_files if "Actual" in f]
+    else:
+        quaternion_file_name = [f for f in all_files if "Nominal" in f]
+    return quaternion_file_name[0] if quaternion_file_name else None
+
+
+def calibration_assets():
+    """
+    Files read while computing the RA and Dec of the photons and saving the cdf files, with their
+    loaders, to load them once when a worker starts with "lac.preload".
+    """
+    return [
+        (pointing_file_name, read_pointing_file),
+        (get_quaternion_file_name("actual"), read_quaternion_file),
+        (get_quaternion_file_name("nominal"), read_quaternion_file),
+        (sdtc.skeleton_file_name, sdtc.read_skeleton),
+    ]
+
+
+def get_body_detector_rotation_matrix(epoch_value=None):
+    """
+    Get the rotation matrices for transforming coordinates from MCP to Lander and Lunar frames.
+    """
+    # The pointing file is read once per process
+    df_pointing = lac.load_asset(pointing_file_name, read_pointing_file)
 
     if epoch_value is not None:
         # Set the timezone of the epoch_value to UTC
@@ -224,24 +284,10 @@ def convert_quaternions_to_rotation_matrix(quaternion_type="actual", epoch_value
     If the quaternion_type is not "actual" or "nominal", an error is raised
     """
 
-    quaternion_folder = "../data/quaternions/"
-    all_files = sorted(glob.glob(str(quaternion_folder) + "*.csv"))
-    if quaternion_type == "actual":
-        quaternion_file_name = [f for f in all_files if "Actual" in f]
-    else:
-        quaternion_file_name = [f for f in all_files if "Nominal" in f]
-
-    df_quaternions = pd.read_csv(quaternion_file_name[0], index_col=None)
-    # Drop the "Epoch_MJD" column if it exists
-    if "Epoch_MJD" in df_quaternions.columns:
-        df_quaternions.drop(columns=["Epoch_MJD"], inplace=True)
-    # Convert Epoch_UTC to datetime and set as index
-    df_quaternions["Epoch_UTC"] = pd.to_datetime(
-        df_quaternions["Epoch_UTC"].str.slice(0, -3), format="mixed", utc=True
+    # The quaternion file is read once per process
+    df_quaternions = lac.load_asset(
+        get_quaternion_file_name(quaternion_type), read_quaternion_file
     )
-    df_quaternions.set_index("Epoch_UTC", inplace=True)
-
-    df_quaternions.sort_index(inplace=True)
 
     if epoch_value is not None:
         # print(f"Finding quaternion for epoch value: {epoch_value}")
@@ -451,10 +497,15 @@ def level1c_data_processing_parallel(df, n_processes=None):
     # with Pool(n_processes) as pool:
     #     ra_dec_results = pool.starmap(compute_ra_dec_and_lunar, data)
 
-    with Pool(n_processes) as pool:
-        ra_dec_results = list(
-            tqdm(pool.imap(_wrapper_compute_ra_dec_and_lunar, data), total=len(data))
-        )
+    if n_processes == 1:
+        ra_dec_results = [_wrapper_compute_ra_dec_and_lunar(args) for args in tqdm(data)]
+    else:
+        with Pool(
+            n_processes, initializer=lac.preload, initargs=(calibration_assets(),)
+        ) as pool:
+            ra_dec_results = list(
+                tqdm(pool.imap(_wrapper_compute_ra_dec_and_lunar, data), total=len(data))
+            )
 
     ra_values, dec_values, az_values, el_values = zip(*ra_dec_results)
     df["photon_RA"] = ra_values
@@ -475,7 +526,9 @@ def level1c_data_processing_parallel(df, n_processes=None):
     ]
 
 
-def process_file_group(hour_bin, files, start_time, output_sci_folder):
+def process_file_group(
+    hour_bin, files, start_time, output_sci_folder, n_processes=None, versions=None
+):
     """
     Function to process a group of files in parallel
 
@@ -489,11 +542,40 @@ def process_file_group(hour_bin, files, start_time, output_sci_folder):
         Start time for the processing.
     output_sci_folder : str
         Output folder for the processed data.
+    n_processes : int, optional
+        Number of processes used to compute the RA and Dec of the photons. If None, defaults to
+        the number of CPUs minus one.
+    versions : dict, optional
+        Versions of the cdf files chosen by "main", see "save_file_group".
+
+    Returns
+    -------
+    cache_stats : dict
+        Loads and cache hits of the calibration assets while processing the group.
     """
+    lac.reset_cache_stats()
+    processed_df = process_files(files, n_processes=n_processes)
+    save_file_group(hour_bin, processed_df, start_time, output_sci_folder, versions)
+    return lac.cache_stats()
 
-    bin_start_time = start_time + datetime.timedelta(hours=hour_bin)
-    # bin_end_time = bin_start_time + datetime.timedelta(hours=1)
 
+def process_files(files, n_processes=None):
+    """
+    Reads the L1b files, selects the photons and computes their RA, Dec, azimuth and elevation.
+
+    Parameters
+    ----------
+    files : list
+        List of (file path, file time) to process.
+    n_processes : int, optional
+        Number of processes used to compute the RA and Dec of the photons. If None, defaults to
+        the number of CPUs minus one.
+
+    Returns
+    -------
+    processed_df : pd.DataFrame
+        Output of "level1c_data_processing_parallel".
+    """
     selected_columns = ["Epoch", "x_mcp", "y_mcp"]
     all_columns = [
         "Epoch",
@@ -564,7 +646,68 @@ def process_file_group(hour_bin, files, start_time, output_sci_folder):
 
     # print(combined_df.head())
     # Apply the Level 1C data processing
-    processed_df = level1c_data_processing_parallel(combined_df)
+    return level1c_data_processing_parallel(combined_df, n_processes=n_processes)
+
+
+def process_file_shard(files, shard_file, n_processes=None):
+    """
+    Processes a part of a large hour bin with "process_files" and saves it to a pickle file until
+    all the parts of the bin are processed. Returns the loads and cache hits of the calibration
+    assets.
+    """
+    lac.reset_cache_stats()
+    process_files(files, n_processes=n_processes).to_pickle(shard_file)
+    return lac.cache_stats()
+
+
+def merge_file_shards(
+    hour_bin, shard_files, start_time, output_sci_folder, n_processes=None, versions=None
+):
+    """
+    Joins the parts of a large hour bin saved by "process_file_shard", in time order, and saves
+    them. The photons are processed one by one, so the joined parts are the same as processing
+    the whole bin at once. Returns the loads and cache hits of the calibration assets.
+    """
+    lac.reset_cache_stats()
+    processed_df = pd.concat(
+        [pd.read_pickle(shard_file) for shard_file in shard_files], ignore_index=True
+    )
+    save_file_group(hour_bin, processed_df, start_time, output_sci_folder, versions)
+    return lac.cache_stats()
+
+
+def l1c_file_name(bin_start_time, output_sci_folder, version):
+    """
+    Name of the cdf file of an hour bin, as given by "sdtc.generate_lexi_cdf_filename".
+    """
+    return (
+        Path(output_sci_folder).resolve()
+        / bin_start_time.strftime("%Y-%m-%d")
+        / f"lexi_l1c_{bin_start_time.strftime('%Y%m%d%H')}_V{version}.cdf"
+    )
+
+
+def save_file_group(hour_bin, processed_df, start_time, output_sci_folder, versions=None):
+    """
+    Saves the processed photons of an hour bin to a cdf file.
+
+    Parameters
+    ----------
+    hour_bin : str
+        Hour bin for the files.
+    processed_df : pd.DataFrame
+        Output of "process_files".
+    start_time : datetime.datetime
+        Start time for the processing.
+    output_sci_folder : str
+        Output folder for the processed data.
+    versions : dict, optional
+        Dictionary keyed by the hour bin, with the version of the cdf file chosen by "main". An
+        existing file of that version is replaced. If None, or if the bin isn't in it, the first
+        version whose file doesn't exist yet is used.
+    """
+    bin_start_time = start_time + datetime.timedelta(hours=hour_bin)
+    # bin_end_time = bin_start_time + datetime.timedelta(hours=1)
 
     # Get the date and time for the filename
     bin_start_time_str = bin_start_time.strftime("%Y-%m-%d")
@@ -591,43 +734,53 @@ def process_file_group(hour_bin, files, start_time, output_sci_folder):
     #     (processed_df["photon_RA"].abs() - abs(median_RA) <= 4.6)
     #     & (processed_df["photon_Dec"].abs() - abs(median_Dec) <= 4.6)
     # ]
-    # Save the processed DataFrame to the output file
+    # Save the processed DataFrame to the output file, into the version chosen by main if any
+    if versions is not None and hour_bin in versions:
+        version, overwrite = versions[hour_bin], True
+    else:
+        version, overwrite = "0.0", False
     sdtc.save_data_to_cdf(
         df=processed_df,
         # file_name=output_sci_file_name,
         # file_version=f"{primary_version}.{secondary_version}",
         output_dir=output_sci_file_folder,
+        version=version,
+        overwrite=overwrite,
     )
 
 
-def main(start_time=None, end_time=None):
+def main(start_time=None, end_time=None, refresh_catalog=True, resume=False):
     # Get the list of files in the folder and subfolders
     sci_folder = "/mnt/cephadrius/bu_research/lexi_data/L1b/sci/cdf/"
+    catalog_path = "/mnt/cephadrius/bu_research/lexi_data/" + lfc.catalog_file_name
 
-    # Get all files in the folder and subfolders
-    file_val_list = sorted(glob.glob(str(sci_folder) + "/**/*.cdf", recursive=True))
+    # Bring the catalog of the files up to date. Only the new and changed files are added, so
+    # this can be skipped when the catalog was just updated.
+    if refresh_catalog:
+        lfc.update_catalog(catalog_path, folders=[sci_folder])
 
-    print(f"Found {len(file_val_list)} files in {sci_folder}")
-
-    # Filter files based on the start and end time
+    # Select the L1b files of the time range from the catalog
     if start_time is not None and end_time is not None:
         start_time = parser.parse(start_time)
         end_time = parser.parse(end_time)
-        file_val_list = [
-            file
-            for file in file_val_list
-            if (
-                (match := re.search(r"payload_lexi_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})", file))
-                and start_time
-                <= datetime.datetime.strptime(match.group(1), "%Y-%m-%d_%H-%M-%S").replace(
-                    tzinfo=datetime.timezone.utc
-                )
-                <= end_time
-            )
-        ]
     else:
         # Select all files
-        file_val_list = sorted(glob.glob(str(sci_folder) + "/**/*.cdf", recursive=True))
+        start_time = None
+        end_time = None
+    catalog_files = lfc.query_files(
+        catalog_path,
+        level="L1b",
+        kind="sci",
+        start_time=start_time,
+        end_time=end_time,
+        file_format="cdf",
+    )
+    file_times = {file["path"]: file["start_time"] for file in catalog_files}
+    file_sizes = {file["path"]: file["size"] for file in catalog_files}
+    file_info = {file["path"]: file for file in catalog_files}
+    file_val_list = list(file_times)
+
+    print(f"Found {len(file_val_list)} files in {sci_folder}")
 
     # Define reference start time
     start_time = datetime.datetime(2025, 1, 16, 0, 0, 0, tzinfo=datetime.timezone.utc)
@@ -635,57 +788,116 @@ def main(start_time=None, end_time=None):
     grouped_files = defaultdict(list)
     # Extract timestamps from filenames and group by 1-hour periods
     for file in file_val_list:
-        (match := re.search(r"payload_lexi_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})", file))
-
-        if match:
-            file_time = datetime.datetime.strptime(match.group(1), "%Y-%m-%d_%H-%M-%S").replace(
-                tzinfo=datetime.timezone.utc
-            )
+        file_time = file_times[file]
 
-            # Compute the hour bin index
-            delta = file_time - start_time
-            hour_bin = delta.total_seconds() // 3600
+        # Compute the hour bin index
+        delta = file_time - start_time
+        hour_bin = delta.total_seconds() // 3600
 
-            # Assign to the corresponding group (fix incorrect append)
-            grouped_files[hour_bin].append((file, file_time))
+        # Assign to the corresponding group (fix incorrect append)
+        grouped_files[hour_bin].append((file, file_time))
     # Convert groups to a sorted list
     sorted_groups = {k: sorted(v, key=lambda x: x[1]) for k, v in sorted(grouped_files.items())}
     # Output folder for merged files
     output_sci_folder = Path("/mnt/cephadrius/bu_research/lexi_data/L1c/sci/cdf/istp/")
     output_sci_folder.mkdir(parents=True, exist_ok=True)
 
-    # Use ProcessPoolExecutor to parallelize the processing of file groups
-    with ProcessPoolExecutor() as executor:
-        # Submit tasks to the executor
-        futures = {
-            executor.submit(
-                process_file_group, hour_bin, files, start_time, output_sci_folder
-            ): hour_bin
-            for hour_bin, files in sorted_groups.items()
+    # The journal of the runs lists the hour bins which were started and finished, with the
+    # fingerprint of their input files and the version of their output file. With resume, the
+    # finished bins are skipped and the interrupted bins are saved again into the same version, so
+    # an interrupted run can be started again without making duplicate files.
+    journal_path = output_sci_folder / lrj.journal_file_name
+    bin_starts = {
+        hour_bin: start_time + datetime.timedelta(hours=hour_bin) for hour_bin in sorted_groups
+    }
+    fingerprints = {
+        hour_bin: lrj.input_fingerprint(files, file_info)
+        for hour_bin, files in sorted_groups.items()
+    }
+    versions, skipped = lrj.plan_run(
+        journal=lrj.load_journal(journal_path),
+        bin_starts=bin_starts,
+        fingerprints=fingerprints,
+        output_file_name=lambda bin_start, version: l1c_file_name(
+            bin_start, output_sci_folder, version
+        ),
+        resume=resume,
+    )
+    if skipped:
+        print(f"Skipping {len(skipped)} hour bins finished in a previous run")
+    sorted_groups = {k: v for k, v in sorted_groups.items() if k in versions}
+    journal_entries = {
+        hour_bin: {
+            "bin_start": bin_starts[hour_bin].isoformat(),
+            "fingerprint": fingerprints[hour_bin],
+            "version": version,
+            "output_file": str(l1c_file_name(bin_starts[hour_bin], output_sci_folder, version)),
         }
+        for hour_bin, version in versions.items()
+    }
+    lrj.append_entries(
+        journal_path, [{**entry, "status": "started"} for entry in journal_entries.values()]
+    )
 
+    # All the hour bins of the time range go to a single pool, the most expensive first, so that
+    # the workers stay busy until the end of the run. The bins much larger than the others are
+    # split into shards which are processed in parallel and merged before the cdf file is saved.
+    # The CPUs left over when there are few bins are used for the RA and Dec of the photons.
+    work_items = lhb.plan_hour_bins(sorted_groups, file_sizes)
+    n_workers = max(1, min(len(work_items), cpu_count() - 1))
+    n_processes = max(1, (cpu_count() - 1) // n_workers)
+    # Each worker reads the calibration assets once when it starts
+    run_cache_stats = []
+    with ProcessPoolExecutor(
+        max_workers=n_workers, initializer=lac.preload, initargs=(calibration_assets(),)
+    ) as executor:
         # Use tqdm to display a progress bar
-        for future in tqdm(
-            as_completed(futures), total=len(futures), desc="Processing file groups"
+        for hour_bin, error, results in tqdm(
+            lhb.run_hour_bins(
+                executor,
+                work_items,
+                process_group=process_file_group,
+                process_shard=process_file_shard,
+                merge_shards=merge_file_shards,
+                group_args=(start_time, output_sci_folder, n_processes, versions),
+                shard_args=(n_processes,),
+                shard_folder=output_sci_folder,
+            ),
+            total=len(sorted_groups),
+            desc="Processing file groups",
         ):
-            hour_bin = futures[future]
-            try:
-                future.result()
-            except Exception as e:
-                print(f"Error processing hour bin {hour_bin}: {e}")
+            if error is not None:
+                print(f"Error processing hour bin {hour_bin}: {error}")
+            else:
+                bin_cache_stats = lac.merge_cache_stats(results)
+                run_cache_stats.append(bin_cache_stats)
+                lrj.append_entries(
+                    journal_path,
+                    [
+                        {
+                            **journal_entries[hour_bin],
+                            "status": "done",
+                            "asset_cache": bin_cache_stats,
+                        }
+                    ],
+                )
+
+    # Loads and cache hits of the calibration assets of the whole run
+    for name, counts in lac.merge_cache_stats(run_cache_stats).items():
+        print(f"{name}: {counts['loads']} loads, {counts['hits']} cache hits")
 
 
-start_date = 3
-start_hour = 0
-end_hour = 24
+# Time range to process. All the hour bins of the range are processed in a single run.
+start_time = "2025-03-03T00:00:00Z"
+end_time = "2025-03-03T23:59:59Z"
 
 time_of_code = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 if __name__ == "__main__":
-    for month in range(3, 4):
-        for day in range(start_date, start_date + 1):
-            for hour in range(start_hour, end_hour):
-                start_time = f"2025-{month:02d}-{day:02d}T{hour:02d}:00:00Z"
-                end_time = f"2025-{month:02d}-{day:02d}T{hour:02d}:59:59Z"
-                print(f"Processing from {start_time} to {end_time}")
-                main(start_time=start_time, end_time=end_time)
-    print(f"\n\nProcessing completed for {start_date} from {start_hour} to {end_hour}")
+    # Run with --resume to skip the hour bins finished by an interrupted run
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--resume", action="store_true")
+    args = arg_parser.parse_args()
+
+    print(f"Processing from {start_time} to {end_time}")
+    main(start_time=start_time, end_time=end_time, resume=args.resume)
+    print(f"\n\nProcessing completed from {start_time} to {end_time}")
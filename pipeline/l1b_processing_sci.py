@@ -1,16 +1,21 @@
 import pickle
 from pathlib import Path
 
+import lxi_l1b_funcs as lbf
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 import numpy as np
 
+# Matrix and offsets of the linearity correction
+lin_correction_M_inv = np.array([[0.98678, 0.16204], [0.11385, 0.993497]])
+lin_correction_b = np.array([0.5568, 0.5600])
+
 
 def lin_correction(
     x,
     y,
-    M_inv=np.array([[0.98678, 0.16204], [0.11385, 0.993497]]),
-    b=np.array([0.5568, 0.5600]),
+    M_inv=lin_correction_M_inv,
+    b=lin_correction_b,
 ):
     """
     Function to apply linearity correction to MCP position x/y data
@@ -40,7 +45,8 @@ def non_lin_correction(
     """
     Function to apply nonlinearity correction to MCP position x/y data. The model to apply the
     nonlinearity correction is a Gaussian Process model trained on the data from the LEXI massk
-    testing. The kernel used is Matern with length scale = 5 and nu = 2.5.
+    testing. The kernel used is Matern with length scale = 5 and nu = 2.5. The correction is
+    interpolated on a grid of the model with "lxi_l1b_funcs.non_lin_correction".
 
     Parameters
     ----------
@@ -61,21 +67,9 @@ def non_lin_correction(
     # )
     gp_model_file_name = "../data/gp_models/gp_data_3.0_10_0.0_0.8_4_RationalQuadratic(alpha=0.5, length_scale=5).pickle"
 
-    # Get the gp_model from the pickle file
-    with open(gp_model_file_name, "rb") as f:
-        gp_model = pickle.load(f)
-
-    # Close the pickle file
-    f.close()
-
-    xy_coord = np.array([x, y]).T
-    delta_xy, sigma = gp_model.predict(xy_coord, return_std=True)
-
-    corrected_xy = xy_coord - delta_xy
-    x_nln = corrected_xy[:, 0]
-    y_nln = corrected_xy[:, 1]
-
-    return x_nln, y_nln
+    # The model is evaluated once on a grid of positions, and the correction of the photons is
+    # interpolated on the grid
+    return lbf.non_lin_correction(x, y, gp_model_file_name)
 
 
 def level1b_data_processing(df=None, lower_threshold=None):
@@ -83,51 +77,17 @@ def level1b_data_processing(df=None, lower_threshold=None):
     # channel_2_lower_threshold = min(2, df["Channel2"].min())
     # channel_3_lower_threshold = min(2, df["Channel3"].min())
     # channel_4_lower_threshold = min(2, df["Channel4"].min())
-    if lower_threshold is None:
-        channel_1_lower_threshold = 1
-        channel_2_lower_threshold = 1
-        channel_3_lower_threshold = 1
-        channel_4_lower_threshold = 1
-    else:
-        channel_1_lower_threshold = lower_threshold
-        channel_2_lower_threshold = lower_threshold
-        channel_3_lower_threshold = lower_threshold
-        channel_4_lower_threshold = lower_threshold
 
-    # Compute the shifted values for each channel (only if IsCommanded is False), otherwise set to
-    # NaN
-    df.loc[df["IsCommanded"] == False, "Channel1_shifted"] = (
-        df["Channel1"] - channel_1_lower_threshold
+    # Compute the shifted values for each channel (only if IsCommanded is False, otherwise NaN),
+    # the position in voltage coordinates, the linear correction and the voltage to MCP
+    # conversion in a single pass
+    df = lbf.add_level1b_positions(
+        df,
+        mcp_keys=("x_mcp", "y_mcp"),
+        lower_threshold=lower_threshold,
+        M_inv=lin_correction_M_inv,
+        b=lin_correction_b,
     )
-    df.loc[df["IsCommanded"], "Channel1_shifted"] = np.nan
-    df.loc[df["Channel1_shifted"] < 0, "Channel1_shifted"] = np.nan
-
-    df.loc[df["IsCommanded"] == False, "Channel2_shifted"] = (
-        df["Channel2"] - channel_2_lower_threshold
-    )
-    df.loc[df["IsCommanded"], "Channel2_shifted"] = np.nan
-    df.loc[df["Channel2_shifted"] < 0, "Channel2_shifted"] = np.nan
-
-    df.loc[df["IsCommanded"] == False, "Channel3_shifted"] = (
-        df["Channel3"] - channel_3_lower_threshold
-    )
-    df.loc[df["IsCommanded"], "Channel3_shifted"] = np.nan
-    df.loc[df["Channel3_shifted"] < 0, "Channel3_shifted"] = np.nan
-
-    df.loc[df["IsCommanded"] == False, "Channel4_shifted"] = (
-        df["Channel4"] - channel_4_lower_threshold
-    )
-    df.loc[df["IsCommanded"], "Channel4_shifted"] = np.nan
-    df.loc[df["Channel4_shifted"] < 0, "Channel4_shifted"] = np.nan
-
-    # Compute the position in voltage coordiantes
-    df["x_volt"] = df["Channel3_shifted"] / (df["Channel3_shifted"] + df["Channel1_shifted"])
-    df["y_volt"] = df["Channel2_shifted"] / (df["Channel2_shifted"] + df["Channel4_shifted"])
-
-    # Apply the linear correction
-    df["x_volt_lin"], df["y_volt_lin"] = lin_correction(df["x_volt"], df["y_volt"])
-    # Apply the voltage to MCP conversion
-    df["x_mcp"], df["y_mcp"] = volt_to_mcp(df["x_volt_lin"], df["y_volt_lin"])
 
     # Apply the nonlinearity correction
     df["x_mcp_nln"], df["y_mcp_nln"] = non_lin_correction(df["x_mcp"], df["y_mcp"])
@@ -0,0 +1,126 @@
+import os
+from pathlib import Path
+
+# Calibration assets loaded in this process: the GP correction grids, the ISTP skeleton and the
+# pointing and quaternion files. They are keyed by the loader and the path of the file, and
+# reloaded when the modification time or the size of the file changes. The loaded values are
+# shared by all the callers and must not be modified.
+_assets = {}
+
+# Number of loads of each asset and how many were served from the cache, since the start of the
+# process or the last "reset_cache_stats"
+_stats = {}
+
+
+def _asset_key(file_name, loader):
+    return (f"{loader.__module__}.{loader.__qualname__}", str(Path(file_name).resolve()))
+
+
+def load_asset(file_name=None, loader=None):
+    """
+    Loads a calibration asset once per process. The asset is loaded again only when its file has
+    changed since the last load.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the file of the asset.
+    loader : callable
+        Module level function which reads the file, called as loader(file_name).
+
+    Returns
+    -------
+    asset : object
+        Output of the loader, shared with the other callers.
+    """
+    key = _asset_key(file_name, loader)
+    stat = os.stat(key[1])
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    stats = _stats.setdefault(key[0], {"hits": 0, "loads": 0})
+    cached = _assets.get(key)
+    if cached is not None and cached[0] == signature:
+        stats["hits"] += 1
+        return cached[1]
+
+    asset = loader(file_name)
+    _assets[key] = (signature, asset)
+    stats["loads"] += 1
+    return asset
+
+
+def invalidate(file_name=None):
+    """
+    Removes assets from the cache, so that they are loaded again on their next use.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the file of the assets to remove. If None, all the assets are removed. Default is
+        None.
+    """
+    if file_name is None:
+        _assets.clear()
+        return
+    path = str(Path(file_name).resolve())
+    for key in [key for key in _assets if key[1] == path]:
+        del _assets[key]
+
+
+def preload(assets=None):
+    """
+    Loads assets in advance. Meant to be the initializer of a pool, so that each worker loads the
+    assets once when it starts:
+    ProcessPoolExecutor(initializer=lac.preload, initargs=([(file_name, loader), ...],)).
+    The files which don't exist are skipped.
+
+    Parameters
+    ----------
+    assets : list
+        List of (file name, loader).
+    """
+    for file_name, loader in assets or []:
+        if file_name is not None and Path(file_name).exists():
+            load_asset(file_name, loader)
+
+
+def cache_stats():
+    """
+    Number of loads and cache hits of each loader in this process.
+
+    Returns
+    -------
+    stats : dict
+        Dictionary keyed by the loader name, with the number of "loads" and "hits".
+    """
+    return {name: dict(stats) for name, stats in _stats.items()}
+
+
+def reset_cache_stats():
+    """
+    Sets the counts of "cache_stats" back to 0, the cached assets are kept.
+    """
+    _stats.clear()
+
+
+def merge_cache_stats(all_stats=None):
+    """
+    Adds up the "cache_stats" of several processes or stages.
+
+    Parameters
+    ----------
+    all_stats : list of dict
+        Outputs of "cache_stats".
+
+    Returns
+    -------
+    stats : dict
+        Dictionary keyed by the loader name, with the total number of "loads" and "hits".
+    """
+    total = {}
+    for stats in all_stats:
+        for name, counts in (stats or {}).items():
+            total_counts = total.setdefault(name, {"hits": 0, "loads": 0})
+            total_counts["hits"] += counts["hits"]
+            total_counts["loads"] += counts["loads"]
+    return total
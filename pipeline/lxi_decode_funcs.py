@@ -0,0 +1,1153 @@
+import mmap
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Sync words of the PIT frame header and of the LEXI packet
+sync_lxi = b"\xfe\x6b\x28\x40"
+
+sync_pit = b"\x54\x53"
+
+volts_per_count = 4.5126 / 65536  # volts per increment of digitization
+
+# Each PIT frame is 28 bytes long: a 12 byte PIT header followed by a 16 byte LEXI packet
+pit_frame_length = 28
+pit_header_length = 12
+
+# Layout of one PIT frame. All the values are big-endian.
+# - sync_pit: PIT sync word
+# - Date: time of the packet as received from the PIT (seconds since epoch)
+# - pit_spare: two bytes of the PIT header which are not used
+# - sync_lxi: LEXI sync word
+# - timestamp_word: HK flag (bit 31), commanded flag (bit 30) and timestamp (bits 0-29)
+# - channels: the four 16 bit words of the packet
+pit_frame_dtype = np.dtype(
+    [
+        ("sync_pit", ">u2"),
+        ("Date", ">f8"),
+        ("pit_spare", ">u2"),
+        ("sync_lxi", ">u4"),
+        ("timestamp_word", ">u4"),
+        ("channels", ">u2", (4,)),
+    ]
+)
+
+
+# Largest PIT time, in absolute value and in seconds since epoch, which fits in "datetime64[ns]"
+# (years 1678 to 2261). Frames with a larger or a non-finite time can't be dated.
+pit_time_limit = 9.2e9
+
+# Displacements of the LEXI packets which can be repaired: 1 to 3 bytes before the PIT sync word
+# (negative) and 1 to 12 bytes after the PIT header (positive)
+repair_shifts = (-3, -2, -1) + tuple(range(1, 13))
+
+# The GSFC (ground test) files have no PIT header, only the 16 byte LEXI packets
+gsfc_packet_length = 16
+
+# The timestamps of the GSFC files are in milliseconds since this time (UTC)
+gsfc_epoch = np.datetime64("2024-01-01T00:00:00", "ns")
+
+# Layout of one LEXI packet of a GSFC file. All the values are big-endian.
+gsfc_frame_dtype = np.dtype(
+    [
+        ("sync_lxi", ">u4"),
+        ("timestamp_word", ">u4"),
+        ("channels", ">u2", (4,)),
+    ]
+)
+
+
+def pit_frame_count(raw_length):
+    """
+    Number of PIT frames the decoder looks at in a file. The frames start at 0, 28, 56, ... up to
+    len(raw) - 28.
+
+    Parameters
+    ----------
+    raw_length : int
+        Length of the raw data in bytes.
+
+    Returns
+    -------
+    n_frames : int
+        Number of frames.
+    """
+    return max(0, (raw_length - pit_frame_length - 1) // pit_frame_length + 1)
+
+
+def pit_frame_shifts(raw, start_frame=0, stop_frame=None):
+    """
+    Finds all the PIT frames in the raw data of a payload file and works out where the LEXI packet
+    of each frame starts. The frames are walked in steps of 28 bytes, exactly like the original
+    packet by packet decoder, and every check is done on all the frames at once.
+
+    The LEXI packet of a frame is either aligned with the PIT header, starts "k" bytes after the
+    end of the header (the packet then runs into the following frame), or starts "k" bytes
+    before the PIT sync word (k = 1, 2 or 3).
+
+    Parameters
+    ----------
+    raw : bytes or mmap.mmap
+        Raw data of the file.
+    start_frame : int
+        Index of the first frame to look at. Default is 0.
+    stop_frame : int
+        Index after the last frame to look at. If None, the frames up to the end of the file are
+        used. Default is None.
+
+    Returns
+    -------
+    shifts : numpy.ndarray
+        Displacement of the LEXI packet for each frame, in bytes. 0 for the aligned frames,
+        positive when the packet starts after the header and negative when it starts before the
+        PIT sync word.
+    is_frame : numpy.ndarray
+        Boolean array, True for the frames that could be decoded.
+    """
+    data = np.frombuffer(raw, dtype=np.uint8)
+    sync_lxi_bytes = np.frombuffer(sync_lxi, dtype=np.uint8)
+
+    if stop_frame is None:
+        stop_frame = pit_frame_count(len(raw))
+    n_frames = max(0, stop_frame - start_frame)
+    buffer = data[start_frame * pit_frame_length : stop_frame * pit_frame_length].reshape(
+        n_frames, pit_frame_length
+    )
+    offsets = np.arange(start_frame, start_frame + n_frames, dtype=np.int64) * pit_frame_length
+
+    has_sync_pit = (buffer[:, 0] == sync_pit[0]) & (buffer[:, 1] == sync_pit[1])
+    has_sync_lxi = np.all(buffer[:, 12:16] == sync_lxi_bytes, axis=1)
+
+    shifts = np.zeros(n_frames, dtype=np.int8)
+    is_frame = has_sync_pit & has_sync_lxi
+
+    # Frames with a PIT header but no LEXI sync word right after it. The last packet is ignored
+    # because it often isn't complete.
+    displaced = np.flatnonzero(
+        has_sync_pit & ~has_sync_lxi & (offsets < len(raw) - pit_frame_length - 16)
+    )
+    if len(displaced) == 0:
+        return shifts, is_frame
+
+    # Check if sync_lxi is present in the next 16 bytes. The first match wins.
+    window = buffer[displaced, 12:]
+    found_after = np.stack(
+        [np.all(window[:, k : k + 4] == sync_lxi_bytes, axis=1) for k in range(1, 13)], axis=1
+    )
+    has_after = found_after.any(axis=1)
+    shift_after = np.argmax(found_after, axis=1) + 1
+    # The rest of the packet is in the next frame, which has to be complete
+    has_after &= offsets[displaced] + 40 + shift_after <= len(raw)
+    shifts[displaced[has_after]] = shift_after[has_after]
+    is_frame[displaced[has_after]] = True
+
+    # Check if sync_lxi starts 3, 2 or 1 bytes before the PIT sync word, in that order
+    remaining = displaced[~has_after]
+    for shift in (3, 2, 1):
+        remaining = remaining[offsets[remaining] >= shift]
+        sync_index = offsets[remaining, None] + np.r_[-shift:0, 12 : 16 - shift]
+        has_before = np.all(data[sync_index] == sync_lxi_bytes, axis=1)
+        shifts[remaining[has_before]] = -shift
+        is_frame[remaining[has_before]] = True
+        remaining = remaining[~has_before]
+
+    return shifts, is_frame
+
+
+def find_pit_frames(raw, start_frame=0, stop_frame=None, shifts=None, is_frame=None):
+    """
+    Finds all the PIT frames in the raw data of a payload file and puts every LEXI packet back
+    behind its PIT header. The frames are sorted into buckets by the displacement of their LEXI
+    packet, and each bucket is rebuilt with a single gather.
+
+    NOTE: The frames whose PIT time isn't a valid date (see "is_valid_unix_time") are dropped,
+    and counted as "invalid_date_frames" by "pit_frame_stats". The original decoder raised
+    ValueError or OverflowError in "datetime.datetime.fromtimestamp" on these frames and
+    stopped decoding the file.
+
+    Parameters
+    ----------
+    raw : bytes or mmap.mmap
+        Raw data of the file.
+    start_frame : int
+        Index of the first frame to decode. Default is 0.
+    stop_frame : int
+        Index after the last frame to decode. If None, the frames up to the end of the file are
+        decoded. Default is None.
+    shifts, is_frame : numpy.ndarray
+        Output of "pit_frame_shifts" for the same frames, if already known. Default is None.
+
+    Returns
+    -------
+    frames : numpy.ndarray
+        Structured array of dtype "pit_frame_dtype", one entry per frame with a valid date, in
+        file order.
+    """
+    if shifts is None or is_frame is None:
+        shifts, is_frame = pit_frame_shifts(raw, start_frame=start_frame, stop_frame=stop_frame)
+
+    data = np.frombuffer(raw, dtype=np.uint8)
+    n_frames = len(shifts)
+    frames = data[
+        start_frame * pit_frame_length : (start_frame + n_frames) * pit_frame_length
+    ].reshape(n_frames, pit_frame_length)
+    frame_index = np.flatnonzero(is_frame)
+    frame_shifts = shifts[frame_index]
+
+    if not frame_shifts.any():
+        return _drop_invalid_dates(frames[frame_index].copy().view(pit_frame_dtype).reshape(-1))
+
+    frames = frames[frame_index]
+    offsets = (start_frame + frame_index) * pit_frame_length
+    header = np.arange(pit_header_length)
+    for shift in np.unique(frame_shifts[frame_shifts != 0]):
+        bucket = np.flatnonzero(frame_shifts == shift)
+        if shift > 0:
+            # The packet starts after the header and continues after the next PIT header
+            packet = np.r_[12 + shift : 28, 40 : 40 + shift]
+        else:
+            # The packet starts before the PIT sync word
+            # NOTE: This fixes a crash of the original decoder, which built 27 and 26 byte packets
+            # for the shifts of -2 and -1 bytes (it skipped the byte after the PIT header) and
+            # failed in struct.unpack. The whole 16 byte packet is used for every shift.
+            packet = np.r_[shift:0, 12 : 28 + shift]
+        frames[bucket] = data[offsets[bucket, None] + np.r_[header, packet]]
+
+    # NOTE: For the science packets which start after the header, the original decoder takes the
+    # PIT header (and thus the Date) from the following frame. This is kept as is.
+    is_after_sci = (frame_shifts > 0) & ((frames[:, 16] & 0x80) == 0)
+    frames[is_after_sci, :pit_header_length] = data[
+        offsets[is_after_sci, None] + pit_frame_length + header
+    ]
+
+    return _drop_invalid_dates(frames.view(pit_frame_dtype).reshape(-1))
+
+
+def _drop_invalid_dates(frames):
+    """
+    Removes the PIT frames whose time isn't a valid date.
+    """
+    is_valid = is_valid_unix_time(frames["Date"])
+    if is_valid.all():
+        return frames
+    return frames[is_valid]
+
+
+def is_valid_unix_time(unix_time):
+    """
+    Checks which times in seconds since epoch can be converted to "datetime64[ns]": the finite
+    times smaller than "pit_time_limit" in absolute value.
+
+    Parameters
+    ----------
+    unix_time : numpy.ndarray
+        Times in seconds since epoch.
+
+    Returns
+    -------
+    is_valid : numpy.ndarray
+        Boolean array, True for the valid times.
+    """
+    unix_time = np.asarray(unix_time, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        return np.abs(unix_time) < pit_time_limit
+
+
+def unix_time_to_datetime64(unix_time):
+    """
+    Converts times in seconds since epoch to "datetime64[ns]". The times are rounded to the
+    nearest microsecond (half to even), the same way "datetime.datetime.utcfromtimestamp" does, so
+    for the valid times (see "is_valid_unix_time") the result is the same as converting each
+    value with it. The invalid times (NaN, infinite, or out of the range of "datetime64[ns]"),
+    on which "datetime" raises an error, are NaT.
+
+    Parameters
+    ----------
+    unix_time : numpy.ndarray
+        Times in seconds since epoch.
+
+    Returns
+    -------
+    date : numpy.ndarray
+        Array of dtype "datetime64[ns]" (UTC), NaT for the invalid times.
+    """
+    unix_time = np.asarray(unix_time, dtype=np.float64)
+    is_valid = is_valid_unix_time(unix_time)
+    unix_time = np.where(is_valid, unix_time, 0.0)
+    seconds = np.trunc(unix_time)
+    microseconds = np.round((unix_time - seconds) * 1e6)
+
+    date_us = seconds.astype(np.int64) * 10**6 + microseconds.astype(np.int64)
+    date = (date_us * 1000).astype("datetime64[ns]")
+    date[~is_valid] = np.datetime64("NaT")
+
+    return date
+
+
+def gsfc_time_to_datetime64(timestamp):
+    """
+    Converts the timestamps of the GSFC files, in milliseconds since 2024-01-01 00:00:00 UTC, to
+    "datetime64[ns]".
+
+    Parameters
+    ----------
+    timestamp : numpy.ndarray
+        Timestamps in milliseconds.
+
+    Returns
+    -------
+    date : numpy.ndarray
+        Array of dtype "datetime64[ns]" (UTC).
+    """
+    timestamp = np.asarray(timestamp, dtype=np.int64)
+
+    return gsfc_epoch + timestamp.astype("timedelta64[ms]")
+
+
+def decode_sci_frames(frames):
+    """
+    Decodes the science packets from the PIT frames. The housekeeping packets (bit 31 of the
+    timestamp word set) are dropped.
+
+    Parameters
+    ----------
+    frames : numpy.ndarray
+        Structured array of dtype "pit_frame_dtype".
+
+    Returns
+    -------
+    sci_data : dict
+        Dictionary of arrays with the keys "Date", "TimeStamp", "IsCommanded", "Channel1",
+        "Channel2", "Channel3" and "Channel4". "Date" is the PIT time in seconds since epoch and
+        "TimeStamp" is in seconds.
+    """
+    timestamp_word = frames["timestamp_word"]
+    frames = frames[(timestamp_word & 0x80000000) == 0]
+    timestamp_word = frames["timestamp_word"].astype(np.uint32)
+    channels = frames["channels"].astype(np.float64) * volts_per_count
+
+    sci_data = {
+        "Date": frames["Date"].astype(np.float64),
+        "TimeStamp": (timestamp_word & 0x3FFFFFFF) / 1e3,
+        "IsCommanded": (timestamp_word & 0x40000000) != 0,
+        "Channel1": channels[:, 0],
+        "Channel2": channels[:, 1],
+        "Channel3": channels[:, 2],
+        "Channel4": channels[:, 3],
+    }
+
+    return sci_data
+
+
+def decode_sci_data(raw):
+    """
+    Decodes the science packets from the raw data of a payload file.
+
+    Parameters
+    ----------
+    raw : bytes
+        Raw data of the file.
+
+    Returns
+    -------
+    sci_data : dict
+        Dictionary of arrays. See "decode_sci_frames".
+    """
+    return decode_sci_frames(find_pit_frames(raw))
+
+
+def decode_hk_frames(frames):
+    """
+    Decodes the housekeeping packets from the PIT frames. The science packets (bit 31 of the
+    timestamp word not set) are dropped.
+
+    Parameters
+    ----------
+    frames : numpy.ndarray
+        Structured array of dtype "pit_frame_dtype".
+
+    Returns
+    -------
+    hk_data : dict
+        Dictionary of arrays with the keys "Date", "timestamp", "hk_id", "hk_value",
+        "delta_event_count", "delta_drop_event_count" and "delta_lost_event_count". "Date" is the
+        PIT time in seconds since epoch and "timestamp" is in milliseconds.
+    """
+    timestamp_word = frames["timestamp_word"]
+    frames = frames[(timestamp_word & 0x80000000) != 0]
+
+    hk_data = {
+        "Date": frames["Date"].astype(np.float64),
+        **_decode_hk_fields(frames),
+    }
+
+    return hk_data
+
+
+def _decode_hk_fields(frames):
+    """
+    Decodes the fields of the housekeeping packets which are the same for the PIT frames and the
+    GSFC packets. The frames must all be housekeeping packets.
+    """
+    channels = frames["channels"].astype(np.int64)
+
+    # The upper 4 bits of the first word are the hk_id, the lower 12 bits are the hk_value. Except
+    # for the command count and the pin puller armed (hk_id 10 and 11), the hk_value is up-shifted
+    # by 4 bits.
+    hk_id = (channels[:, 0] & 0xF000) >> 12
+    hk_value = channels[:, 0] & 0xFFF
+    hk_value = np.where((hk_id == 10) | (hk_id == 11), hk_value, hk_value << 4)
+
+    hk_data = {
+        "timestamp": frames["timestamp_word"].astype(np.int64) & 0x3FFFFFFF,
+        "hk_id": hk_id,
+        "hk_value": hk_value,
+        "delta_event_count": channels[:, 1],
+        "delta_drop_event_count": channels[:, 2],
+        "delta_lost_event_count": channels[:, 3],
+    }
+
+    return hk_data
+
+
+def decode_hk_data(raw):
+    """
+    Decodes the housekeeping packets from the raw data of a payload file.
+
+    Parameters
+    ----------
+    raw : bytes
+        Raw data of the file.
+
+    Returns
+    -------
+    hk_data : dict
+        Dictionary of arrays. See "decode_hk_frames".
+    """
+    return decode_hk_frames(find_pit_frames(raw))
+
+
+def find_gsfc_frames(raw):
+    """
+    Finds all the LEXI packets in the raw data of a GSFC file. All the positions of the sync word
+    are found at once, and the packets are then picked the same way as the original byte by byte
+    search: the first sync word starts a packet, and the search resumes 16 bytes later, so a sync
+    word inside an accepted packet is skipped.
+
+    Parameters
+    ----------
+    raw : bytes or mmap.mmap
+        Raw data of the file.
+
+    Returns
+    -------
+    frames : numpy.ndarray
+        Structured array of dtype "gsfc_frame_dtype", one entry per packet, in file order.
+    """
+    data = np.frombuffer(raw, dtype=np.uint8)
+
+    # The original search stops 16 bytes before the end of the file
+    n_positions = max(0, len(data) - gsfc_packet_length)
+    offsets = np.flatnonzero(data[:n_positions] == sync_lxi[0])
+    for k in range(1, len(sync_lxi)):
+        offsets = offsets[data[offsets + k] == sync_lxi[k]]
+
+    # A sync word at least 16 bytes after the previous one always starts a packet. Only the sync
+    # words closer than that to the previous one need to be checked against the last packet.
+    is_packet = np.ones(len(offsets), dtype=bool)
+    last_offset = -gsfc_packet_length
+    for ii in np.flatnonzero(np.diff(offsets) < gsfc_packet_length) + 1:
+        if is_packet[ii - 1]:
+            last_offset = offsets[ii - 1]
+        if offsets[ii] - last_offset < gsfc_packet_length:
+            is_packet[ii] = False
+    offsets = offsets[is_packet]
+
+    frames = data[offsets[:, None] + np.arange(gsfc_packet_length)]
+
+    return frames.view(gsfc_frame_dtype).reshape(-1)
+
+
+def decode_gsfc_sci_frames(frames):
+    """
+    Decodes the science packets from the LEXI packets of a GSFC file. The housekeeping packets
+    (bit 31 of the timestamp word set) are dropped.
+
+    Parameters
+    ----------
+    frames : numpy.ndarray
+        Structured array of dtype "gsfc_frame_dtype".
+
+    Returns
+    -------
+    sci_data : dict
+        Dictionary of arrays with the keys "TimeStamp", "IsCommanded", "Channel1", "Channel2",
+        "Channel3" and "Channel4". "TimeStamp" is in milliseconds.
+    """
+    timestamp_word = frames["timestamp_word"]
+    frames = frames[(timestamp_word & 0x80000000) == 0]
+    timestamp_word = frames["timestamp_word"].astype(np.int64)
+    channels = frames["channels"].astype(np.float64) * volts_per_count
+
+    sci_data = {
+        "TimeStamp": timestamp_word & 0x3FFFFFFF,
+        "IsCommanded": (timestamp_word & 0x40000000) != 0,
+        "Channel1": channels[:, 0],
+        "Channel2": channels[:, 1],
+        "Channel3": channels[:, 2],
+        "Channel4": channels[:, 3],
+    }
+
+    return sci_data
+
+
+def decode_gsfc_sci_data(raw):
+    """
+    Decodes the science packets from the raw data of a GSFC file.
+
+    Parameters
+    ----------
+    raw : bytes
+        Raw data of the file.
+
+    Returns
+    -------
+    sci_data : dict
+        Dictionary of arrays. See "decode_gsfc_sci_frames".
+    """
+    return decode_gsfc_sci_frames(find_gsfc_frames(raw))
+
+
+def decode_gsfc_hk_frames(frames):
+    """
+    Decodes the housekeeping packets from the LEXI packets of a GSFC file. The science packets
+    (bit 31 of the timestamp word not set) are dropped.
+
+    Parameters
+    ----------
+    frames : numpy.ndarray
+        Structured array of dtype "gsfc_frame_dtype".
+
+    Returns
+    -------
+    hk_data : dict
+        Dictionary of arrays with the keys of "decode_hk_frames", except "Date".
+    """
+    hk_data = _decode_hk_fields(frames[(frames["timestamp_word"] & 0x80000000) != 0])
+
+    return hk_data
+
+
+def decode_gsfc_hk_data(raw):
+    """
+    Decodes the housekeeping packets from the raw data of a GSFC file.
+
+    Parameters
+    ----------
+    raw : bytes
+        Raw data of the file.
+
+    Returns
+    -------
+    hk_data : dict
+        Dictionary of arrays. See "decode_gsfc_hk_frames".
+    """
+    return decode_gsfc_hk_frames(find_gsfc_frames(raw))
+
+
+def decode_pit_data(raw, start_frame=0, stop_frame=None, return_stats=False):
+    """
+    Decodes both the science and the housekeeping packets from the raw data of a payload file.
+    The file is scanned for the PIT frames only once, and the frames are split by the HK flag.
+
+    Parameters
+    ----------
+    raw : bytes or mmap.mmap
+        Raw data of the file.
+    start_frame : int
+        Index of the first frame to decode. Default is 0.
+    stop_frame : int
+        Index after the last frame to decode. If None, the frames up to the end of the file are
+        decoded. Default is None.
+    return_stats : bool
+        If True, the frame statistics are returned too. Default is False.
+
+    Returns
+    -------
+    sci_data : dict
+        Dictionary of arrays. See "decode_sci_frames".
+    hk_data : dict
+        Dictionary of arrays. See "decode_hk_frames".
+    frame_stats : dict
+        Only if return_stats is True. See "pit_frame_stats".
+    """
+    shifts, is_frame = pit_frame_shifts(raw, start_frame=start_frame, stop_frame=stop_frame)
+    frames = find_pit_frames(
+        raw, start_frame=start_frame, stop_frame=stop_frame, shifts=shifts, is_frame=is_frame
+    )
+
+    if return_stats:
+        return (
+            decode_sci_frames(frames),
+            decode_hk_frames(frames),
+            pit_frame_stats(shifts, is_frame, frames),
+        )
+
+    return decode_sci_frames(frames), decode_hk_frames(frames)
+
+
+def pit_frame_stats(shifts, is_frame, frames):
+    """
+    Counts how the PIT frames of a file, or of a part of a file, were decoded.
+
+    Parameters
+    ----------
+    shifts, is_frame : numpy.ndarray
+        Output of "pit_frame_shifts".
+    frames : numpy.ndarray
+        Output of "find_pit_frames" for the same frames.
+
+    Returns
+    -------
+    frame_stats : dict
+        Dictionary with the number of frames walked ("frames"), of frames with the LEXI packet
+        right after the PIT header ("aligned_frames"), of repaired frames for each displacement in
+        bytes ("repaired_frames", negative before the PIT sync word and positive after the header),
+        of frames which could not be decoded ("dropped_frames"), of decoded frames dropped because
+        their PIT time isn't a valid date ("invalid_date_frames"), and of science and
+        housekeeping packets ("sci_packets" and "hk_packets").
+    """
+    frame_shifts = shifts[is_frame]
+    n_hk = int(np.count_nonzero(frames["timestamp_word"] & 0x80000000))
+
+    frame_stats = {
+        "frames": len(shifts),
+        "aligned_frames": int(np.count_nonzero(frame_shifts == 0)),
+        "repaired_frames": {
+            str(shift): int(np.count_nonzero(frame_shifts == shift)) for shift in repair_shifts
+        },
+        "dropped_frames": len(shifts) - len(frame_shifts),
+        "invalid_date_frames": len(frame_shifts) - len(frames),
+        "sci_packets": len(frames) - n_hk,
+        "hk_packets": n_hk,
+    }
+
+    return frame_stats
+
+
+def sum_stats(stats_list):
+    """
+    Adds up the counts of several statistics records, for example of the windows of a file or of
+    all the files of a run. Only the numbers, and the dictionaries of numbers, are added up.
+
+    Parameters
+    ----------
+    stats_list : list of dict
+        Statistics records with the same keys.
+
+    Returns
+    -------
+    stats : dict
+        The summed record.
+    """
+    total = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                total.setdefault(key, {})
+                for sub_key, sub_value in value.items():
+                    total[key][sub_key] = total[key].get(sub_key, 0) + sub_value
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                total[key] = total.get(key, 0) + value
+
+    return total
+
+
+def file_decode_stats(frame_stats, raw_length, decode_time, in_file_name=None):
+    """
+    Completes the frame statistics of a file with the number of bytes read, the bytes at the end of
+    the file which are not part of any frame, and the decode time and throughput.
+
+    Parameters
+    ----------
+    frame_stats : dict
+        Frame statistics of the whole file. See "pit_frame_stats".
+    raw_length : int
+        Length of the raw data in bytes.
+    decode_time : float
+        Wall time of the decode in seconds.
+    in_file_name : str
+        Name of the input file. Default is None.
+
+    Returns
+    -------
+    decode_stats : dict
+        The statistics record of the file.
+    """
+    decode_stats = {
+        "file_name": None if in_file_name is None else str(in_file_name),
+        "bytes_read": raw_length,
+        **frame_stats,
+        "trailing_bytes": raw_length - pit_frame_count(raw_length) * pit_frame_length,
+        "decode_time_s": decode_time,
+        "mb_per_s": raw_length / 1e6 / decode_time if decode_time > 0 else 0.0,
+    }
+
+    return decode_stats
+
+
+def summarize_decode_stats(decode_stats_list):
+    """
+    Adds up the decode statistics of several files into the totals of a run. The throughput is
+    worked out again from the total bytes and the total decode time.
+
+    Parameters
+    ----------
+    decode_stats_list : list of dict
+        Statistics records of the files. See "file_decode_stats".
+
+    Returns
+    -------
+    totals : dict
+        The summed record, with the number of files in "files".
+    """
+    totals = {"files": len(decode_stats_list), **sum_stats(decode_stats_list)}
+    decode_time = totals.get("decode_time_s", 0)
+    totals["mb_per_s"] = totals.get("bytes_read", 0) / 1e6 / decode_time if decode_time > 0 else 0.0
+
+    return totals
+
+
+def iter_pit_data(in_file_name=None, window_size=64 * 1024**2, return_stats=False):
+    """
+    Decodes a payload file through a memory map, one window of PIT frames at a time. The windows
+    follow the 28 byte frame grid of the file. A frame whose LEXI packet runs into the next
+    window reads those bytes straight from the map, so no frame is lost at the window
+    boundaries and the result is the same as decoding the whole file at once.
+
+    Parameters
+    ----------
+    in_file_name : str
+        Name of the input file. Default is None.
+    window_size : int
+        Size of each window in bytes. Default is 64 MB.
+    return_stats : bool
+        If True, the frame statistics of each window are yielded too. Default is False.
+
+    Yields
+    ------
+    sci_data : dict
+        Dictionary of arrays for the science packets of the window. See "decode_sci_frames".
+    hk_data : dict
+        Dictionary of arrays for the housekeeping packets of the window. See "decode_hk_frames".
+    frame_stats : dict
+        Only if return_stats is True. See "pit_frame_stats".
+    """
+    if in_file_name is None:
+        raise ValueError("The input file name must be provided.")
+
+    frames_per_window = max(1, window_size // pit_frame_length)
+
+    with open(in_file_name, "rb") as file:
+        # An empty file can not be memory mapped
+        file.seek(0, 2)
+        if file.tell() == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+            n_frames = pit_frame_count(len(raw))
+            for start_frame in range(0, n_frames, frames_per_window):
+                yield decode_pit_data(
+                    raw,
+                    start_frame=start_frame,
+                    stop_frame=min(start_frame + frames_per_window, n_frames),
+                    return_stats=return_stats,
+                )
+
+
+def concatenate_data(data_list):
+    """
+    Joins the dictionaries of arrays of consecutive batches into one dictionary.
+
+    Parameters
+    ----------
+    data_list : list of dict
+        Dictionaries of arrays with the same keys.
+
+    Returns
+    -------
+    data : dict
+        Dictionary with the arrays of all the batches joined in order.
+    """
+    return {key: np.concatenate([data[key] for data in data_list]) for key in data_list[0]}
+
+
+def read_pit_data(in_file_name=None, window_size=64 * 1024**2, return_stats=False):
+    """
+    Decodes all the science and housekeeping packets of a payload file with "iter_pit_data".
+
+    Parameters
+    ----------
+    in_file_name : str
+        Name of the input file. Default is None.
+    window_size : int
+        Size of each window in bytes. Default is 64 MB.
+    return_stats : bool
+        If True, the decode statistics of the file are returned too. Default is False.
+
+    Returns
+    -------
+    sci_data : dict
+        Dictionary of arrays. See "decode_sci_frames".
+    hk_data : dict
+        Dictionary of arrays. See "decode_hk_frames".
+    decode_stats : dict
+        Only if return_stats is True. See "file_decode_stats".
+    """
+    start_time = time.perf_counter()
+
+    batches = list(iter_pit_data(in_file_name, window_size=window_size, return_stats=True))
+    if not batches:
+        batches = [decode_pit_data(b"", return_stats=True)]
+
+    sci_data = concatenate_data([batch[0] for batch in batches])
+    hk_data = concatenate_data([batch[1] for batch in batches])
+
+    if return_stats:
+        decode_stats = file_decode_stats(
+            sum_stats([batch[2] for batch in batches]),
+            raw_length=os.path.getsize(in_file_name),
+            decode_time=time.perf_counter() - start_time,
+            in_file_name=in_file_name,
+        )
+        return sci_data, hk_data, decode_stats
+
+    return sci_data, hk_data
+
+
+def pit_final_frame_count(raw_length):
+    """
+    Number of PIT frames of a file which is still being written whose decode can't change anymore.
+    A frame at offset o only reads the bytes o - 3 to o + 56 (the frame itself, a packet displaced
+    by up to 12 bytes and the header of the next frame), so once these bytes are on the disk the
+    frame decodes the same way as in the complete file.
+
+    Parameters
+    ----------
+    raw_length : int
+        Length of the raw data in bytes.
+
+    Returns
+    -------
+    n_frames : int
+        Number of frames.
+    """
+    return min(
+        pit_frame_count(raw_length),
+        max(0, (raw_length - 2 * pit_frame_length) // pit_frame_length + 1),
+    )
+
+
+def read_new_pit_data(in_file_name=None, start_frame=0, final=False, window_size=64 * 1024**2):
+    """
+    Decodes the PIT frames appended to a payload file which is still being written, starting at
+    "start_frame". Only the frames which can't change when more bytes arrive are decoded, the
+    partial frames at the end of the file are left for the next call. Calling this function
+    again with the returned "next_frame" while the file grows gives the same packets as decoding
+    the complete file once.
+
+    Parameters
+    ----------
+    in_file_name : str
+        Name of the input file. Default is None.
+    start_frame : int
+        Index of the first frame not decoded yet. Default is 0.
+    final : bool
+        If True, the file is complete and all the remaining frames are decoded. Default is False.
+    window_size : int
+        Size of each window in bytes. Default is 64 MB.
+
+    Returns
+    -------
+    sci_data : dict
+        Dictionary of arrays for the new science packets. See "decode_sci_frames".
+    hk_data : dict
+        Dictionary of arrays for the new housekeeping packets. See "decode_hk_frames".
+    next_frame : int
+        Index of the first frame to decode on the next call.
+    """
+    if in_file_name is None:
+        raise ValueError("The input file name must be provided.")
+
+    with open(in_file_name, "rb") as file:
+        file.seek(0, 2)
+        raw_length = file.tell()
+        n_frames = pit_frame_count(raw_length) if final else pit_final_frame_count(raw_length)
+        if n_frames <= start_frame:
+            sci_data, hk_data = decode_pit_data(b"")
+            return sci_data, hk_data, start_frame
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+            sci_data, hk_data, _ = _decode_pit_range(raw, start_frame, n_frames, window_size)
+
+    return sci_data, hk_data, n_frames
+
+
+def split_pit_frames(raw, n_parts, start_frame=0, stop_frame=None):
+    """
+    Splits the PIT frames of the raw data into "n_parts" consecutive ranges of about the same
+    size. Each split is moved forward to the next frame with both the PIT and the LEXI sync words
+    in place, so that no displaced packet sits right at the start of a range.
+
+    The decoder walks the file on a fixed 28 byte grid and a displaced packet reads the bytes it
+    needs from the whole buffer, so decoding the ranges one after the other gives the same result
+    as decoding all the frames at once, wherever the splits are.
+
+    Parameters
+    ----------
+    raw : bytes or mmap.mmap
+        Raw data of the file.
+    n_parts : int
+        Number of ranges.
+    start_frame : int
+        Index of the first frame. Default is 0.
+    stop_frame : int
+        Index after the last frame. If None, the frames up to the end of the file are used.
+        Default is None.
+
+    Returns
+    -------
+    frame_ranges : list of tuple
+        List of (start_frame, stop_frame) for each range, in file order. Empty ranges are dropped.
+    """
+    if stop_frame is None:
+        stop_frame = pit_frame_count(len(raw))
+    data = np.frombuffer(raw, dtype=np.uint8)
+    sync_bytes = np.frombuffer(sync_pit + bytes(10) + sync_lxi, dtype=np.uint8)
+    sync_mask = np.r_[0:2, 12:16]
+
+    splits = [start_frame]
+    for split in np.linspace(start_frame, stop_frame, max(1, n_parts) + 1)[1:-1]:
+        # Look for a verified sync boundary in the next few frames
+        split = max(int(split), splits[-1])
+        n_look = min(256, stop_frame - split)
+        if n_look > 0:
+            frames = data[split * pit_frame_length : (split + n_look) * pit_frame_length]
+            frames = frames.reshape(n_look, pit_frame_length)[:, sync_mask]
+            is_synced = np.all(frames == sync_bytes[sync_mask], axis=1)
+            if is_synced.any():
+                split += int(np.argmax(is_synced))
+        splits.append(split)
+    splits.append(stop_frame)
+
+    return [(start, stop) for start, stop in zip(splits[:-1], splits[1:]) if stop > start]
+
+
+def _decode_pit_range(raw, start_frame, stop_frame, window_size):
+    """
+    Decodes a range of PIT frames, one window at a time, and joins the windows. The frame
+    statistics of the range are returned too.
+    """
+    frames_per_window = max(1, window_size // pit_frame_length)
+    batches = [
+        decode_pit_data(
+            raw,
+            start_frame=window_start,
+            stop_frame=min(window_start + frames_per_window, stop_frame),
+            return_stats=True,
+        )
+        for window_start in range(start_frame, stop_frame, frames_per_window)
+    ]
+
+    return (
+        concatenate_data([batch[0] for batch in batches]),
+        concatenate_data([batch[1] for batch in batches]),
+        sum_stats([batch[2] for batch in batches]),
+    )
+
+
+def _decode_pit_file_range(in_file_name, start_frame, stop_frame, window_size):
+    """
+    Worker of "read_pit_data_parallel". Memory maps the file, so all the workers share the pages
+    of the file, and decodes one range of frames.
+    """
+    with open(in_file_name, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+            return _decode_pit_range(raw, start_frame, stop_frame, window_size)
+
+
+def _decode_pit_shared_range(shared_name, raw_length, start_frame, stop_frame, window_size):
+    """
+    Worker of "decode_pit_data_parallel". Attaches to the shared memory block holding the raw data
+    and decodes one range of frames.
+    """
+    shared_raw = shared_memory.SharedMemory(name=shared_name)
+    try:
+        raw = shared_raw.buf[:raw_length]
+        try:
+            return _decode_pit_range(raw, start_frame, stop_frame, window_size)
+        finally:
+            raw.release()
+    finally:
+        shared_raw.close()
+
+
+def _n_parallel_parts(n_frames, n_workers, min_frames_per_part):
+    """
+    Number of ranges a decode is split into. Small inputs are decoded in a single range.
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    return max(1, min(n_workers, n_frames // max(1, min_frames_per_part)))
+
+
+def read_pit_data_parallel(
+    in_file_name=None,
+    n_workers=None,
+    window_size=64 * 1024**2,
+    min_frames_per_part=100_000,
+    return_stats=False,
+):
+    """
+    Decodes all the science and housekeeping packets of a payload file in a pool of processes.
+    The frames are split with "split_pit_frames", each process memory maps the file and decodes
+    its range, and the ranges are joined in file order. The result is the same as the one of
+    "read_pit_data".
+
+    Parameters
+    ----------
+    in_file_name : str
+        Name of the input file. Default is None.
+    n_workers : int
+        Number of processes. If None, the number of CPUs is used. Default is None.
+    window_size : int
+        Size of the windows each process decodes at a time, in bytes. Default is 64 MB.
+    min_frames_per_part : int
+        Smallest number of frames worth a process of its own. Smaller files are decoded in the
+        calling process. Default is 100000 (2.8 MB).
+    return_stats : bool
+        If True, the decode statistics of the file are returned too. Default is False.
+
+    Returns
+    -------
+    sci_data : dict
+        Dictionary of arrays. See "decode_sci_frames".
+    hk_data : dict
+        Dictionary of arrays. See "decode_hk_frames".
+    decode_stats : dict
+        Only if return_stats is True. See "file_decode_stats".
+    """
+    if in_file_name is None:
+        raise ValueError("The input file name must be provided.")
+
+    start_time = time.perf_counter()
+    raw_length = os.path.getsize(in_file_name)
+    n_frames = pit_frame_count(raw_length)
+    n_parts = _n_parallel_parts(n_frames, n_workers, min_frames_per_part)
+    if n_parts == 1:
+        return read_pit_data(in_file_name, window_size=window_size, return_stats=return_stats)
+
+    with open(in_file_name, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+            frame_ranges = split_pit_frames(raw, n_parts)
+
+    with ProcessPoolExecutor(max_workers=n_parts) as executor:
+        futures = [
+            executor.submit(_decode_pit_file_range, in_file_name, start, stop, window_size)
+            for start, stop in frame_ranges
+        ]
+        batches = [future.result() for future in futures]
+
+    sci_data = concatenate_data([batch[0] for batch in batches])
+    hk_data = concatenate_data([batch[1] for batch in batches])
+
+    if return_stats:
+        decode_stats = file_decode_stats(
+            sum_stats([batch[2] for batch in batches]),
+            raw_length=raw_length,
+            decode_time=time.perf_counter() - start_time,
+            in_file_name=in_file_name,
+        )
+        return sci_data, hk_data, decode_stats
+
+    return sci_data, hk_data
+
+
+def decode_pit_data_parallel(
+    raw, n_workers=None, window_size=64 * 1024**2, min_frames_per_part=100_000, return_stats=False
+):
+    """
+    Decodes all the science and housekeeping packets of a payload buffer in a pool of processes.
+    The buffer is copied once into a shared memory block which all the processes read from. The
+    frames are split with "split_pit_frames" and the ranges are joined in order, so the result is
+    the same as the one of "decode_pit_data".
+
+    Parameters
+    ----------
+    raw : bytes
+        Raw data, for example several files joined together.
+    n_workers : int
+        Number of processes. If None, the number of CPUs is used. Default is None.
+    window_size : int
+        Size of the windows each process decodes at a time, in bytes. Default is 64 MB.
+    min_frames_per_part : int
+        Smallest number of frames worth a process of its own. Smaller buffers are decoded in the
+        calling process. Default is 100000 (2.8 MB).
+    return_stats : bool
+        If True, the decode statistics of the buffer are returned too. Default is False.
+
+    Returns
+    -------
+    sci_data : dict
+        Dictionary of arrays. See "decode_sci_frames".
+    hk_data : dict
+        Dictionary of arrays. See "decode_hk_frames".
+    decode_stats : dict
+        Only if return_stats is True. See "file_decode_stats".
+    """
+    start_time = time.perf_counter()
+    n_frames = pit_frame_count(len(raw))
+    n_parts = _n_parallel_parts(n_frames, n_workers, min_frames_per_part)
+    if n_parts == 1:
+        batches = [decode_pit_data(raw, return_stats=True)]
+    else:
+        batches = _decode_pit_shared_ranges(raw, n_parts, window_size)
+
+    sci_data = concatenate_data([batch[0] for batch in batches])
+    hk_data = concatenate_data([batch[1] for batch in batches])
+
+    if return_stats:
+        decode_stats = file_decode_stats(
+            sum_stats([batch[2] for batch in batches]),
+            raw_length=len(raw),
+            decode_time=time.perf_counter() - start_time,
+        )
+        return sci_data, hk_data, decode_stats
+
+    return sci_data, hk_data
+
+
+def _decode_pit_shared_ranges(raw, n_parts, window_size):
+    """
+    Copies the raw data into a shared memory block and decodes "n_parts" ranges of frames of it in
+    a pool of processes. The results of the ranges are returned in order.
+    """
+    frame_ranges = split_pit_frames(raw, n_parts)
+
+    shared_raw = shared_memory.SharedMemory(create=True, size=len(raw))
+    try:
+        shared_raw.buf[: len(raw)] = raw
+        with ProcessPoolExecutor(max_workers=n_parts) as executor:
+            futures = [
+                executor.submit(
+                    _decode_pit_shared_range, shared_raw.name, len(raw), start, stop, window_size
+                )
+                for start, stop in frame_ranges
+            ]
+            batches = [future.result() for future in futures]
+    finally:
+        shared_raw.close()
+        shared_raw.unlink()
+
+    return batches
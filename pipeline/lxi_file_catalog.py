@@ -0,0 +1,277 @@
+import datetime
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+# Name of the catalog file. It's saved at the top of the data folder and lists the L0, L1a, L1b
+# and L1c files with their time range, so that the files of a time range are found with a query
+# instead of a recursive glob of the whole data folder.
+catalog_file_name = "lexi_file_catalog.sqlite"
+
+# Patterns of the file names of each level
+# - L0: payload_lexi_<unix time>_....dat
+# - L1a: payload_lexi_<unix time>_..._sci_output_L1a.csv (or .npz, and hk)
+# - L1b: payload_lexi_<start>_to_<end>_sci_output_L1b_v0.0.cdf
+# - L1c: lexi_l1c_<YYYYmmddHH>_V0.1.cdf
+l0_pattern = re.compile(r"payload_lexi_(\d+)_.*\.dat$")
+l1a_pattern = re.compile(r"payload_lexi_(\d+)_(?:.*_)?(sci|hk)_output_L1a\.(csv|npz)$")
+l1b_pattern = re.compile(
+    r"payload_lexi_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})_to_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})"
+    r"_(sci|hk)_output_L1b_v(\d+\.\d+)\.(cdf|csv)$"
+)
+l1c_pattern = re.compile(r"lexi_l1c_(\d{10})_V(\d+\.\d+)\.cdf$")
+
+catalog_columns = (
+    "path",
+    "level",
+    "kind",
+    "file_format",
+    "start_time",
+    "end_time",
+    "version",
+    "size",
+    "mtime_ns",
+)
+
+
+def _unix_time(date_string, date_format):
+    """
+    Converts a UTC date in a file name to seconds since epoch.
+    """
+    date = datetime.datetime.strptime(date_string, date_format)
+    return date.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def parse_file_name(file_name=None):
+    """
+    Gets the level, the kind, the time range and the version of a LEXI file from its name.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the file.
+
+    Returns
+    -------
+    file_info : dict
+        Dictionary with the "level" ("L0", "L1a", "L1b" or "L1c"), the "kind" ("sci" or "hk",
+        None for the L0 files), the "file_format" (the extension without the dot), the
+        "start_time" and "end_time" in seconds since epoch and the "version". The end time of the
+        L0 and L1a files and the version of the L0 and L1a files aren't in the name and are None.
+        None if the name doesn't match any level.
+    """
+    name = os.path.basename(file_name)
+
+    if match := l1a_pattern.search(name):
+        return {
+            "level": "L1a",
+            "kind": match.group(2),
+            "file_format": match.group(3),
+            "start_time": float(match.group(1)),
+            "end_time": None,
+            "version": None,
+        }
+    if match := l0_pattern.search(name):
+        return {
+            "level": "L0",
+            "kind": None,
+            "file_format": "dat",
+            "start_time": float(match.group(1)),
+            "end_time": None,
+            "version": None,
+        }
+    if match := l1b_pattern.search(name):
+        return {
+            "level": "L1b",
+            "kind": match.group(3),
+            "file_format": match.group(5),
+            "start_time": _unix_time(match.group(1), "%Y-%m-%d_%H-%M-%S"),
+            "end_time": _unix_time(match.group(2), "%Y-%m-%d_%H-%M-%S"),
+            "version": match.group(4),
+        }
+    if match := l1c_pattern.search(name):
+        start_time = _unix_time(match.group(1), "%Y%m%d%H")
+        return {
+            "level": "L1c",
+            "kind": "sci",
+            "file_format": "cdf",
+            "start_time": start_time,
+            "end_time": start_time + 3600,
+            "version": match.group(2),
+        }
+    return None
+
+
+def connect_catalog(catalog_path=None):
+    """
+    Opens the catalog, and creates it if it doesn't exist yet.
+
+    Parameters
+    ----------
+    catalog_path : str
+        Name of the catalog file.
+
+    Returns
+    -------
+    connection : sqlite3.Connection
+        Connection to the catalog.
+    """
+    Path(catalog_path).parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(str(catalog_path))
+    connection.row_factory = sqlite3.Row
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            level TEXT NOT NULL,
+            kind TEXT,
+            file_format TEXT,
+            start_time REAL NOT NULL,
+            end_time REAL,
+            version TEXT,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL
+        )
+        """
+    )
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS files_level_kind_time ON files (level, kind, start_time)"
+    )
+    return connection
+
+
+def _scan_folder(folder):
+    """
+    Yields the path and the stat of all the files in a folder and its subfolders.
+    """
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scan_folder(entry.path)
+            elif entry.is_file():
+                yield entry.path, entry.stat()
+
+
+def update_catalog(catalog_path=None, folders=None):
+    """
+    Brings the catalog up to date with the files in the folders. Only the new files and the files
+    whose size or modification time have changed are parsed and written, and the files which
+    don't exist anymore are removed from the catalog. Files whose name doesn't match any level
+    are ignored.
+
+    Parameters
+    ----------
+    catalog_path : str
+        Name of the catalog file.
+    folders : list of str
+        Folders to scan, with their subfolders.
+
+    Returns
+    -------
+    changes : dict
+        Number of files "added", "updated" and "removed".
+    """
+    changes = {"added": 0, "updated": 0, "removed": 0}
+
+    with connect_catalog(catalog_path) as connection:
+        for folder in folders:
+            folder = str(Path(folder).resolve())
+            if not os.path.isdir(folder):
+                continue
+            prefix = folder + os.sep
+            known_files = {
+                row["path"]: (row["size"], row["mtime_ns"])
+                for row in connection.execute(
+                    "SELECT path, size, mtime_ns FROM files WHERE substr(path, 1, ?) = ?",
+                    (len(prefix), prefix),
+                )
+            }
+
+            rows = []
+            for path, stat in _scan_folder(folder):
+                known = known_files.pop(path, None)
+                if known == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                file_info = parse_file_name(path)
+                if file_info is None:
+                    continue
+                rows.append(
+                    {**file_info, "path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                )
+                changes["added" if known is None else "updated"] += 1
+
+            connection.executemany(
+                f"INSERT OR REPLACE INTO files ({', '.join(catalog_columns)}) "
+                f"VALUES ({', '.join(':' + column for column in catalog_columns)})",
+                rows,
+            )
+            # The files left in known_files have been deleted
+            connection.executemany(
+                "DELETE FROM files WHERE path = ?", [(path,) for path in known_files]
+            )
+            changes["removed"] += len(known_files)
+
+    connection.close()
+    return changes
+
+
+def query_files(
+    catalog_path=None, level=None, kind=None, start_time=None, end_time=None, file_format=None
+):
+    """
+    Selects the files of a level whose start time is in a time range.
+
+    Parameters
+    ----------
+    catalog_path : str
+        Name of the catalog file.
+    level : str
+        "L0", "L1a", "L1b" or "L1c".
+    kind : str
+        "sci" or "hk". If None, the files of all kinds are selected. Default is None.
+    start_time : datetime.datetime
+        Start of the time range. If None, the range has no start. Default is None.
+    end_time : datetime.datetime
+        End of the time range, included. If None, the range has no end. Default is None.
+    file_format : str or list of str
+        Extensions of the files to select, without the dot. If None, all the formats are
+        selected. Default is None.
+
+    Returns
+    -------
+    files : list of dict
+        One dictionary per file with the columns of the catalog, sorted by start time. The
+        "start_time" and "end_time" are timezone aware datetimes.
+    """
+    conditions = ["level = ?"]
+    parameters = [level]
+    if kind is not None:
+        conditions.append("kind = ?")
+        parameters.append(kind)
+    if start_time is not None:
+        conditions.append("start_time >= ?")
+        parameters.append(start_time.timestamp())
+    if end_time is not None:
+        conditions.append("start_time <= ?")
+        parameters.append(end_time.timestamp())
+    if file_format is not None:
+        file_formats = [file_format] if isinstance(file_format, str) else list(file_format)
+        conditions.append(f"file_format IN ({', '.join('?' for _ in file_formats)})")
+        parameters.extend(file_formats)
+
+    with connect_catalog(catalog_path) as connection:
+        rows = connection.execute(
+            f"SELECT * FROM files WHERE {' AND '.join(conditions)} ORDER BY start_time, path",
+            parameters,
+        ).fetchall()
+    connection.close()
+
+    files = []
+    for row in rows:
+        file = dict(row)
+        for key in ["start_time", "end_time"]:
+            if file[key] is not None:
+                file[key] = datetime.datetime.fromtimestamp(file[key], tz=datetime.timezone.utc)
+        files.append(file)
+    return files
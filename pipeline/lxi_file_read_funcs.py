@@ -1,23 +1,26 @@
-import csv
 import datetime
 import importlib
 import logging
 import os
-import pickle
 import platform
 import shutil
 import struct
+import time
 from pathlib import Path
 from tkinter import filedialog
 from typing import NamedTuple
 
 import global_variables
+import lxi_decode_funcs as ldf
+import lxi_l1b_funcs as lbf
 import lxi_misc_codes as lmsc
 import numpy as np
 import pandas as pd
 import pytz
 
 importlib.reload(lmsc)
+importlib.reload(ldf)
+importlib.reload(lbf)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -276,6 +279,185 @@ class hk_packet_cls_gsfc(NamedTuple):
             )
 
 
+def l1a_save_file_name(in_file_name=None, data_type="sci"):
+    """
+    Gets the name of the L1a csv file of a level 0 file. The L1a files are saved in the folder
+    "L1a/sci" or "L1a/hk" next to the folder of the level 0 files, in a subfolder with the name
+    of the folder of the level 0 file.
+
+    Parameters
+    ----------
+    in_file_name : str
+        Name of the level 0 file. Default is None.
+    data_type : str
+        Either "sci" or "hk". Default is "sci".
+
+    Raises
+    ------
+    OSError :
+        If the operating system is not supported.
+
+    Returns
+    -------
+    save_file_name : str
+        Name of the L1a file.
+    """
+    # Format filenames and folder names for the different operating systems
+    if platform.system() in ["Linux", "Darwin"]:
+        separator = "/"
+    elif platform.system() == "Windows":
+        separator = "\\"
+    else:
+        raise OSError("The operating system is not supported.")
+
+    output_file_name = (
+        os.path.basename(os.path.normpath(in_file_name)).split(".")[0]
+        + f"_{data_type}_output_L1a.csv"
+    )
+    output_folder_name_list = os.path.dirname(os.path.normpath(in_file_name)).split(separator)
+    output_folder_name = separator.join(
+        [
+            separator.join(output_folder_name_list[:-2]),
+            "L1a",
+            data_type,
+            output_folder_name_list[-1],
+        ]
+    )
+
+    return output_folder_name + separator + output_file_name
+
+
+def sci_data_to_dataframe(sci_data=None, is_payload=True, number_of_decimals=6):
+    """
+    Creates the L1a dataframe of the science packets from the decoded arrays.
+
+    Parameters
+    ----------
+    sci_data : dict
+        Dictionary of arrays from "lxi_decode_funcs.decode_sci_data" or
+        "lxi_decode_funcs.decode_gsfc_sci_data".
+    is_payload : bool
+        True if the packets are from a payload (PIT) file, False for a GSFC file. Default is True.
+    number_of_decimals : int
+        Number of decimals of the channel voltages. Default is 6.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        DataFrame of the science packets.
+    """
+    if is_payload:
+        Date = pd.to_datetime(ldf.unix_time_to_datetime64(sci_data["Date"]))
+    else:
+        Date = pd.to_datetime(ldf.gsfc_time_to_datetime64(sci_data["TimeStamp"]), utc=True)
+
+    df = pd.DataFrame(
+        {
+            "Date": Date,
+            "TimeStamp": sci_data["TimeStamp"],
+            "IsCommanded": sci_data["IsCommanded"],
+            "Channel1": np.round(sci_data["Channel1"], decimals=number_of_decimals),
+            "Channel2": np.round(sci_data["Channel2"], decimals=number_of_decimals),
+            "Channel3": np.round(sci_data["Channel3"], decimals=number_of_decimals),
+            "Channel4": np.round(sci_data["Channel4"], decimals=number_of_decimals),
+        }
+    )
+
+    return df
+
+
+def hk_data_to_dataframe(hk_data=None, lxi_unit=1, is_payload=True, previous_row=None):
+    """
+    Creates the L1a dataframe of the housekeeping packets from the decoded arrays. Each "hk_id"
+    has its own column, and the value of a column is carried forward until the next packet with
+    the same "hk_id".
+
+    Parameters
+    ----------
+    hk_data : dict
+        Dictionary of arrays from "lxi_decode_funcs.decode_hk_data" or
+        "lxi_decode_funcs.decode_gsfc_hk_data".
+    lxi_unit : int
+        LEXI unit, either 1 or 2. Default is 1.
+    is_payload : bool
+        True if the packets are from a payload (PIT) file, False for a GSFC file. Default is True.
+    previous_row : pandas.Series
+        Last row of the dataframe of the packets before these ones, used to carry the values
+        forward across the batches of a file which is read in pieces. Default is None.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        DataFrame of the housekeeping packets, with the Date as the index and as a column.
+    """
+    # Convert the hk_value of all the packets at once. Each "hk_id" gets its own column, which is
+    # NaN for the packets with a different "hk_id".
+    hk_values = lmsc.hk_value_comp_array(
+        vpc=volts_per_count,
+        hk_value=hk_data["hk_value"],
+        hk_id=hk_data["hk_id"],
+        lxi_unit=lxi_unit,
+    )
+
+    # Convert the times of all the packets to UTC dates at once
+    if is_payload:
+        Date = ldf.unix_time_to_datetime64(hk_data["Date"])
+    else:
+        Date = ldf.gsfc_time_to_datetime64(hk_data["timestamp"])
+
+    all_data_dict = {
+        "Date": Date,
+        "TimeStamp": hk_data["timestamp"] / 1e3,
+        "HK_id": hk_data["hk_id"].astype(np.float64),
+        **{str(hk_id): hk_values[:, hk_id] for hk_id in range(16)},
+        "DeltaEvntCount": hk_data["delta_event_count"].astype(np.float64),
+        "DeltaDroppedCount": hk_data["delta_drop_event_count"].astype(np.float64),
+        "DeltaLostEvntCount": hk_data["delta_lost_event_count"].astype(np.float64),
+    }
+
+    # Create a dataframe with the data
+    df_key_list = [
+        "Date",
+        "TimeStamp",
+        "HK_id",
+        "PinPullerTemp",
+        "OpticsTemp",
+        "LEXIbaseTemp",
+        "HVsupplyTemp",
+        "+5.2V_Imon",
+        "+10V_Imon",
+        "+3.3V_Imon",
+        "AnodeVoltMon",
+        "+28V_Imon",
+        "ADC_Ground",
+        "Cmd_count",
+        "Pinpuller_Armed",
+        "Unused1",
+        "Unused2",
+        "HVmcpAuto",
+        "HVmcpMan",
+        "DeltaEvntCount",
+        "DeltaDroppedCount",
+        "DeltaLostEvntCount",
+    ]
+
+    df = pd.DataFrame(columns=df_key_list)
+    for ii, key in enumerate(df_key_list):
+        df[key] = all_data_dict[list(all_data_dict.keys())[ii]]
+
+    # For the dataframe, replace the nans with the value from the previous index.
+    # This is to make sure that the file isn't inundated with nans.
+    df = df.ffill()
+    if previous_row is not None:
+        # The columns without a packet yet in this batch take the last value of the batch before
+        df = df.fillna(previous_row.drop(labels="Date"))
+
+    # Set Date as the index without replacing the column
+    df.set_index("Date", inplace=True, drop=False)
+
+    return df
+
+
 def read_binary_data_sci(
     in_file_name=None,
     save_file_name="../data/processed/sci/output_sci.csv",
@@ -330,219 +512,24 @@ def read_binary_data_sci(
     with open(input_file_name, "rb") as file:
         raw = file.read()
 
-    index = 0
-    packets = []
-
     # Check if the "file_name" has payload in its name or not. If it has payload in its name, then
-    # use the sci_packet_cls else use sci_packet_cls_gsfc
+    # the packets are in PIT frames, else the file is a GSFC file with only the LEXI packets.
+    # Either way all the science packets are decoded at once.
     if "payload" in in_file_name:
-        while index < len(raw) - 28:
-            if raw[index : index + 2] == sync_pit and raw[index + 12 : index + 16] == sync_lxi:
-                packets.append(sci_packet_cls.from_bytes(raw[index : index + 28]))
-                index += 28
-                continue
-            elif (raw[index : index + 2] == sync_pit) and (
-                raw[index + 12 : index + 16] != sync_lxi
-            ):
-                # Ignore the last packet
-                if index >= len(raw) - 28 - 16:
-                    # NOTE: This is a temporary fix. The last packet is ignored because the last
-                    # packet often isn't complete. Need to find a better solution. Check the function
-                    # read_binary_data_hk for the same.
-                    index += 28
-                    continue
-                # Check if sync_lxi is present in the next 16 bytes
-                if sync_lxi in raw[index + 12 : index + 28] and index + 28 < len(raw):
-                    # Find the index of sync_lxi
-                    index_sync = index + 12 + raw[index + 12 : index + 28].index(sync_lxi)
-                    # Reorder the packet
-                    new_packet = (
-                        raw[index + 28 : index + 12 + 28]
-                        + raw[index_sync : index + 28]
-                        + raw[index + 12 + 28 : index_sync + 28]
-                    )
-                    # Check if the packet length is 28
-                    if len(new_packet) != 28:
-                        # If the index + 28 is greater than the length of the raw data, then break
-                        if index + 28 > len(raw):
-                            break
-                    packets.append(sci_packet_cls.from_bytes(new_packet))
-                    index += 28
-                    continue
-                # Check if raw[index - 3:index] + raw[index+12:index+13] == sync_lxi
-                elif raw[index - 3 : index] + raw[index + 12 : index + 13] == sync_lxi:
-                    # Reorder the packet
-                    new_packet = (
-                        raw[index : index + 12]
-                        + raw[index - 3 : index]
-                        + raw[index + 12 : index + 25]
-                    )
-                    packets.append(sci_packet_cls.from_bytes(new_packet))
-                    index += 28
-                    continue
-                # Check if raw[index - 2:index] + raw[index+12:index+14] == sync_lxi
-                elif raw[index - 2 : index] + raw[index + 12 : index + 14] == sync_lxi:
-                    # Reorder the packet
-                    new_packet = (
-                        raw[index : index + 12]
-                        + raw[index - 2 : index]
-                        + raw[index + 13 : index + 26]
-                    )
-                    packets.append(sci_packet_cls.from_bytes(new_packet))
-                    index += 28
-                    continue
-                # Check if raw[index - 1:index] + raw[index+12:index+15] == sync_lxi
-                elif raw[index - 1 : index] + raw[index + 12 : index + 15] == sync_lxi:
-                    # Reorder the packet
-                    new_packet = (
-                        raw[index : index + 12]
-                        + raw[index - 1 : index]
-                        + raw[index + 14 : index + 27]
-                    )
-                    packets.append(sci_packet_cls.from_bytes(new_packet))
-                    index += 28
-                    continue
-                index += 28
-                continue
-            index += 28
+        sci_data = ldf.decode_sci_data(raw)
     else:
         # Print in green color that the gsfc code is running
         print("\033[92mRunning the GSFC code for Science.\033[0m")
-        while index < len(raw) - 16:
-            if raw[index : index + 4] == sync_lxi:
-                packets.append(sci_packet_cls_gsfc.from_bytes(raw[index : index + 16]))
-                index += 16
-                continue
-
-            index += 1
-
-    # Drop the packets that are None
-    packets = [packet for packet in packets if packet is not None]
-
-    # Split the file name in a folder and a file name
-    # Format filenames and folder names for the different operating systems
-    if platform.system() == "Linux":
-        output_file_name = (
-            os.path.basename(os.path.normpath(in_file_name)).split(".")[0] + "_sci_output_L1a.csv"
-        )
-        output_folder_name_list = os.path.dirname(os.path.normpath(in_file_name)).split("/")
-        output_folder_name = (
-            "/".join(output_folder_name_list[:-2]) + "/L1a/sci/" + output_folder_name_list[-1]
-        )
-        save_file_name = output_folder_name + "/" + output_file_name
-    elif platform.system() == "Windows":
-        output_file_name = (
-            os.path.basename(os.path.normpath(in_file_name)).split(".")[0] + "_sci_output_L1a.csv"
-        )
-        output_folder_name_list = os.path.dirname(os.path.normpath(in_file_name)).split("\\")
-        output_folder_name = (
-            "\\".join(output_folder_name_list[:-2]) + "\\L1a\\sci\\" + output_folder_name_list[-1]
-        )
-        save_file_name = output_folder_name + "\\" + output_file_name
-    elif platform.system() == "Darwin":
-        output_file_name = (
-            os.path.basename(os.path.normpath(in_file_name)).split(".")[0] + "_sci_output_L1a.csv"
-        )
-        output_folder_name_list = os.path.dirname(os.path.normpath(in_file_name)).split("/")
-        output_folder_name = (
-            "/".join(output_folder_name_list[:-2]) + "/L1a/sci/" + output_folder_name_list[-1]
-        )
-        save_file_name = output_folder_name + "/" + output_file_name
-    else:
-        raise OSError("The operating system is not supported.")
+        sci_data = ldf.decode_gsfc_sci_data(raw)
 
-    # Check if the save folder exists, if not then create it
-    if not Path(output_folder_name).exists():
-        Path(output_folder_name).mkdir(parents=True, exist_ok=True)
+    # Get the name of the L1a file and create its folder
+    save_file_name = l1a_save_file_name(in_file_name, data_type="sci")
+    Path(save_file_name).parent.mkdir(parents=True, exist_ok=True)
 
-    if "payload" in in_file_name:
-        with open(save_file_name, "w", newline="") as file:
-            dict_writer = csv.DictWriter(
-                file,
-                fieldnames=(
-                    "Date",
-                    "TimeStamp",
-                    "IsCommanded",
-                    "Channel1",
-                    "Channel2",
-                    "Channel3",
-                    "Channel4",
-                ),
-            )
-            dict_writer.writeheader()
-            try:
-                dict_writer.writerows(
-                    {
-                        "Date": datetime.datetime.utcfromtimestamp(sci_packet_cls.Date),
-                        "TimeStamp": sci_packet_cls.timestamp / 1e3,
-                        "IsCommanded": sci_packet_cls.is_commanded,
-                        "Channel1": np.round(sci_packet_cls.channel1, decimals=number_of_decimals),
-                        "Channel2": np.round(sci_packet_cls.channel2, decimals=number_of_decimals),
-                        "Channel3": np.round(sci_packet_cls.channel3, decimals=number_of_decimals),
-                        "Channel4": np.round(sci_packet_cls.channel4, decimals=number_of_decimals),
-                    }
-                    for sci_packet_cls in packets
-                )
-            except Exception as e:
-                # Print the exception in red color
-                print(f"\n\033[91m{e}\033[00m\n")
-                print(
-                    f"Number of science packets found in the file \033[96m {in_file_name}\033[0m "
-                    f"is just \033[91m {len(packets)}\033[0m. \n \033[96m Check the datafile to "
-                    "see if the datafile has proper data.\033[0m \n "
-                )
-    else:
-        default_time = datetime.datetime(2024, 1, 1, 0, 0, 0, tzinfo=pytz.timezone("UTC"))
-        with open(save_file_name, "w", newline="") as file:
-            dict_writer = csv.DictWriter(
-                file,
-                fieldnames=(
-                    "Date",
-                    "TimeStamp",
-                    "IsCommanded",
-                    "Channel1",
-                    "Channel2",
-                    "Channel3",
-                    "Channel4",
-                ),
-            )
-            dict_writer.writeheader()
-            try:
-                dict_writer.writerows(
-                    {
-                        "Date": default_time
-                        + datetime.timedelta(milliseconds=sci_packet_cls.timestamp),
-                        "TimeStamp": sci_packet_cls.timestamp,
-                        "IsCommanded": sci_packet_cls.is_commanded,
-                        "Channel1": np.round(sci_packet_cls.channel1, decimals=number_of_decimals),
-                        "Channel2": np.round(sci_packet_cls.channel2, decimals=number_of_decimals),
-                        "Channel3": np.round(sci_packet_cls.channel3, decimals=number_of_decimals),
-                        "Channel4": np.round(sci_packet_cls.channel4, decimals=number_of_decimals),
-                    }
-                    for sci_packet_cls in packets
-                )
-            except Exception as e:
-                # Print the exception in red color
-                print(f"\n\033[91m{e}\033[00m\n")
-                print(
-                    f"Number of science packets found in the file \033[96m {in_file_name}\033[0m "
-                    f"is just \033[91m {len(packets)}\033[0m. \n \033[96m Check the datafile to "
-                    "see if the datafile has proper data.\033[0m \n "
-                )
-
-    # Read the saved file data in a dataframe
-    df = pd.read_csv(save_file_name)
-
-    # Convert the date column to datetime
-    if platform.system() == "Windows":
-        df["Date"] = pd.to_datetime(df["Date"], format="mixed")
-    else:
-        try:
-            df["Date"] = pd.to_datetime(df["Date"])
-        except Exception:
-            df["Date"] = pd.to_datetime(df["Date"], format="mixed")
-        except Exception:
-            df["Date"] = pd.to_datetime(df["Date"], format="ISO8601")
+    # Create the dataframe directly from the decoded arrays
+    df = sci_data_to_dataframe(
+        sci_data, is_payload="payload" in in_file_name, number_of_decimals=number_of_decimals
+    )
 
     # Set index to the date
     df.set_index("Date", inplace=False)
@@ -633,168 +620,13 @@ def read_binary_data_hk(
     with open(input_file_name, "rb") as file:
         raw = file.read()
 
-    index = 0
-    packets = []
-
+    # Decode all the housekeeping packets in the file at once
     if "payload" in in_file_name:
-        while index < len(raw) - 28:
-            if raw[index : index + 2] == sync_pit and raw[index + 12 : index + 16] == sync_lxi:
-                # print(f"{index} d ==> {raw[index:index + 28].hex()}\n")
-                packets.append(hk_packet_cls.from_bytes(raw[index : index + 28]))
-                index += 28
-                continue
-            elif raw[index : index + 2] == sync_pit and raw[index + 12 : index + 16] != sync_lxi:
-                # Ignore the last packet
-                if index >= len(raw) - 28 - 16:
-                    # NOTE: This is a temporary fix. The last packet is ignored because the last
-                    # packet often isn't complete. Need to find a better solution. Check the function
-                    # read_binary_data_sci for the same.
-                    index += 28
-                    continue
-                # Check if sync_lxi is present in the next 16 bytes
-                if sync_lxi in raw[index + 12 : index + 28] and index + 28 < len(raw):
-                    # Find the index of sync_lxi
-                    index_sync = index + 12 + raw[index + 12 : index + 28].index(sync_lxi)
-                    # Reorder the packet
-                    new_packet = (
-                        raw[index : index + 12]
-                        + raw[index_sync : index + 28]
-                        + raw[index + 12 + 28 : index_sync + 28]
-                    )
-                    # Check if the packet length is 28
-                    if len(new_packet) != 28:
-                        # Print the packet length
-                        print(
-                            f"The packet length is {len(new_packet)}, index = {index} and length of raw is {len(raw)}"
-                        )
-                        print(f"{index} 1 ==> {new_packet.hex()}\n")
-                        # If the index + 28 is greater than the length of the raw data, then break
-                        if index + 28 > len(raw):
-                            break
-                    # print(f"{index} 1 ==> {new_packet.hex()}\n")
-                    packets.append(hk_packet_cls.from_bytes(new_packet))
-                    index += 28
-                    continue
-                # Check if raw[index - 3:index] + raw[index+12:index+13] == sync_lxi
-                elif raw[index - 3 : index] + raw[index + 12 : index + 13] == sync_lxi:
-                    # Reorder the packet
-                    new_packet = (
-                        raw[index : index + 12]
-                        + raw[index - 3 : index]
-                        + raw[index + 12 : index + 25]
-                    )
-                    # print(f"{index} 2 ==> {new_packet.hex()}\n")
-                    packets.append(hk_packet_cls.from_bytes(new_packet))
-                    index += 28
-                    continue
-                # Check if raw[index - 2:index] + raw[index+12:index+14] == sync_lxi
-                elif raw[index - 2 : index] + raw[index + 12 : index + 14] == sync_lxi:
-                    # Reorder the packet
-                    new_packet = (
-                        raw[index : index + 12]
-                        + raw[index - 2 : index]
-                        + raw[index + 13 : index + 26]
-                    )
-                    # print(f"{index} 3 ==> {new_packet.hex()}\n")
-                    packets.append(hk_packet_cls.from_bytes(new_packet))
-                    index += 28
-                    continue
-                # Check if raw[index - 1:index] + raw[index+12:index+15] == sync_lxi
-                elif raw[index - 1 : index] + raw[index + 12 : index + 15] == sync_lxi:
-                    # Reorder the packet
-                    new_packet = (
-                        raw[index : index + 12]
-                        + raw[index - 1 : index]
-                        + raw[index + 14 : index + 27]
-                    )
-                    # print(f"{index} 4 ==> {new_packet.hex()}\n")
-                    packets.append(hk_packet_cls.from_bytes(new_packet))
-                    index += 28
-                    continue
-                index += 28
-                continue
-            index += 28
+        hk_data = ldf.decode_hk_data(raw)
     else:
         # Print in green color that the gsfc code is running
         print("\033[92mRunning the GSFC code for Housekeeping.\033[0m")
-        while index < len(raw) - 16:
-            if raw[index : index + 4] == sync_lxi:
-                packets.append(hk_packet_cls_gsfc.from_bytes(raw[index : index + 16]))
-                index += 16
-                continue
-            index += 1
-    # Get only those packets that have the HK data
-    hk_idx = []
-    for idx, hk_packet in enumerate(packets):
-        if hk_packet is not None:
-            hk_idx.append(idx)
-
-    Date = np.full(len(hk_idx), np.nan)
-    TimeStamp = np.full(len(hk_idx), np.nan)
-    HK_id = np.full(len(hk_idx), np.nan)
-    PinPullerTemp = np.full(len(hk_idx), np.nan)
-    OpticsTemp = np.full(len(hk_idx), np.nan)
-    LEXIbaseTemp = np.full(len(hk_idx), np.nan)
-    HVsupplyTemp = np.full(len(hk_idx), np.nan)
-    V_Imon_5_2 = np.full(len(hk_idx), np.nan)
-    V_Imon_10 = np.full(len(hk_idx), np.nan)
-    V_Imon_3_3 = np.full(len(hk_idx), np.nan)
-    AnodeVoltMon = np.full(len(hk_idx), np.nan)
-    V_Imon_28 = np.full(len(hk_idx), np.nan)
-    ADC_Ground = np.full(len(hk_idx), np.nan)
-    Cmd_count = np.full(len(hk_idx), np.nan)
-    Pinpuller_Armed = np.full(len(hk_idx), np.nan)
-    Unused1 = np.full(len(hk_idx), np.nan)
-    Unused2 = np.full(len(hk_idx), np.nan)
-    HVmcpAuto = np.full(len(hk_idx), np.nan)
-    HVmcpMan = np.full(len(hk_idx), np.nan)
-    DeltaEvntCount = np.full(len(hk_idx), np.nan)
-    DeltaDroppedCount = np.full(len(hk_idx), np.nan)
-    DeltaLostEvntCount = np.full(len(hk_idx), np.nan)
-
-    all_data_dict = {
-        "Date": Date,
-        "TimeStamp": TimeStamp,
-        "HK_id": HK_id,
-        "0": PinPullerTemp,
-        "1": OpticsTemp,
-        "2": LEXIbaseTemp,
-        "3": HVsupplyTemp,
-        "4": V_Imon_5_2,
-        "5": V_Imon_10,
-        "6": V_Imon_3_3,
-        "7": AnodeVoltMon,
-        "8": V_Imon_28,
-        "9": ADC_Ground,
-        "10": Cmd_count,
-        "11": Pinpuller_Armed,
-        "12": Unused1,
-        "13": Unused2,
-        "14": HVmcpAuto,
-        "15": HVmcpMan,
-        "DeltaEvntCount": DeltaEvntCount,
-        "DeltaDroppedCount": DeltaDroppedCount,
-        "DeltaLostEvntCount": DeltaLostEvntCount,
-    }
-
-    selected_keys = [
-        "0",
-        "1",
-        "2",
-        "3",
-        "4",
-        "5",
-        "6",
-        "7",
-        "8",
-        "9",
-        "10",
-        "11",
-        "12",
-        "13",
-        "14",
-        "15",
-    ]
+        hk_data = ldf.decode_gsfc_hk_data(raw)
 
     # Check if "unit_1" or "unit1" is in the file name, if so then the data is from the unit 1
     if "unit_1" in input_file_name or "unit1" in input_file_name:
@@ -809,73 +641,8 @@ def read_binary_data_hk(
         )
         lxi_unit = 1
 
-    for ii, idx in enumerate(hk_idx):
-        hk_packet = packets[idx]
-        # Convert to seconds from milliseconds for the timestamp
-        if "payload" in in_file_name:
-            all_data_dict["Date"][ii] = hk_packet.Date
-        else:
-            default_time = datetime.datetime(2024, 1, 1, 0, 0, 0, tzinfo=pytz.timezone("UTC"))
-            new_time = default_time + datetime.timedelta(milliseconds=hk_packet.timestamp)
-            all_data_dict["Date"][ii] = new_time.timestamp()
-        all_data_dict["TimeStamp"][ii] = hk_packet.timestamp / 1e3
-        all_data_dict["HK_id"][ii] = hk_packet.hk_id
-        key = str(hk_packet.hk_id)
-        if key in selected_keys:
-            all_data_dict[key][ii] = lmsc.hk_value_comp(
-                ii=ii,
-                vpc=volts_per_count,
-                hk_value=hk_packet.hk_value,
-                hk_id=hk_packet.hk_id,
-                lxi_unit=lxi_unit,
-            )
-
-        all_data_dict["DeltaEvntCount"][ii] = hk_packet.delta_event_count
-        all_data_dict["DeltaDroppedCount"][ii] = hk_packet.delta_drop_event_count
-        all_data_dict["DeltaLostEvntCount"][ii] = hk_packet.delta_lost_event_count
-
-    # Create a dataframe with the data
-    df_key_list = [
-        "Date",
-        "TimeStamp",
-        "HK_id",
-        "PinPullerTemp",
-        "OpticsTemp",
-        "LEXIbaseTemp",
-        "HVsupplyTemp",
-        "+5.2V_Imon",
-        "+10V_Imon",
-        "+3.3V_Imon",
-        "AnodeVoltMon",
-        "+28V_Imon",
-        "ADC_Ground",
-        "Cmd_count",
-        "Pinpuller_Armed",
-        "Unused1",
-        "Unused2",
-        "HVmcpAuto",
-        "HVmcpMan",
-        "DeltaEvntCount",
-        "DeltaDroppedCount",
-        "DeltaLostEvntCount",
-    ]
-
-    Date_datetime = [datetime.datetime.utcfromtimestamp(x) for x in all_data_dict["Date"]]
-
-    df = pd.DataFrame(columns=df_key_list)
-    for ii, key in enumerate(df_key_list):
-        df[key] = all_data_dict[list(all_data_dict.keys())[ii]]
-
-    # For the dataframe, replace the nans with the value from the previous index.
-    # This is to make sure that the file isn't inundated with nans.
-    for key in df.keys():
-        for ii in range(1, len(df[key])):
-            if np.isnan(df[key][ii]):
-                # df[key][ii] = df[key][ii - 1]
-                df.loc[ii, key] = df.loc[ii - 1, key]
-
-    # Set the date column to the Date_datetime
-    df["Date"] = Date_datetime
+    # Create the dataframe, with the Date as the index
+    df = hk_data_to_dataframe(hk_data, lxi_unit=lxi_unit, is_payload="payload" in in_file_name)
 
     # Get the time difference between the first and last timestamp
     try:
@@ -897,43 +664,9 @@ def read_binary_data_hk(
             f"For the housekeeping data, the time difference between the current row and the last row is 0 for {input_file_name}."
         )
 
-    # Set Date as the index without replacing the column
-    df.set_index("Date", inplace=True, drop=False)
-    # Split the file name in a folder and a file name
-    # Format filenames and folder names for the different operating systems
-    if platform.system() == "Linux":
-        output_file_name = (
-            os.path.basename(os.path.normpath(in_file_name)).split(".")[0] + "_hk_output_L1a.csv"
-        )
-        output_folder_name_list = os.path.dirname(os.path.normpath(in_file_name)).split("/")
-        output_folder_name = (
-            "/".join(output_folder_name_list[:-2]) + "/L1a/hk/" + output_folder_name_list[-1]
-        )
-        save_file_name = output_folder_name + "/" + output_file_name
-    elif platform.system() == "Windows":
-        output_file_name = (
-            os.path.basename(os.path.normpath(in_file_name)).split(".")[0] + "_hk_output_L1a.csv"
-        )
-        output_folder_name_list = os.path.dirname(os.path.normpath(in_file_name)).split("\\")
-        output_folder_name = (
-            "\\".join(output_folder_name_list[:-2]) + "\\L1a\\hk\\" + output_folder_name_list[-1]
-        )
-        save_file_name = output_folder_name + "\\" + output_file_name
-    elif platform.system() == "Darwin":
-        output_file_name = (
-            os.path.basename(os.path.normpath(in_file_name)).split(".")[0] + "_hk_output_L1a.csv"
-        )
-        output_folder_name_list = os.path.dirname(os.path.normpath(in_file_name)).split("/")
-        output_folder_name = (
-            "/".join(output_folder_name_list[:-2]) + "/L1a/hk/" + output_folder_name_list[-1]
-        )
-        save_file_name = output_folder_name + "/" + output_file_name
-    else:
-        raise OSError("Operating system not supported.")
-
-    # Check if the save folder exists, if not then create it
-    if not Path(output_folder_name).exists():
-        Path(output_folder_name).mkdir(parents=True, exist_ok=True)
+    # Get the name of the L1a file and create its folder
+    save_file_name = l1a_save_file_name(in_file_name, data_type="hk")
+    Path(save_file_name).parent.mkdir(parents=True, exist_ok=True)
 
     # Save the dataframe to a csv file
     df.to_csv(save_file_name, index=False)
@@ -1048,6 +781,181 @@ def open_file_b(t_start=None, t_end=None):
     return file_val
 
 
+def _publish_batches(batches, data_type, t_start=None, t_end=None, max_rows=None):
+    """
+    Joins the dataframes decoded by "follow_file_b" into one dataframe, keeps only the last
+    "max_rows" rows if max_rows isn't None, and saves it with its slice in
+    "global_variables.all_file_details". The batches are replaced by the joined dataframe.
+    """
+    df = pd.concat(batches) if len(batches) > 1 else batches[0]
+    if max_rows is not None:
+        df = df.iloc[-max_rows:]
+    batches[:] = [df]
+    global_variables.all_file_details[f"df_all_{data_type}"] = df
+    global_variables.all_file_details[f"df_slice_{data_type}"] = df.loc[t_start:t_end]
+
+
+def follow_file_b(
+    file_val=None,
+    t_start=None,
+    t_end=None,
+    poll_interval=2.0,
+    idle_timeout=None,
+    refresh_interval=10.0,
+    max_rows=None,
+):
+    """
+    Follows a payload (PIT) file which is still being written, for near real time products. The
+    size of the file is checked every "poll_interval" seconds and only the newly appended PIT
+    frames are decoded, the partial frame at the end of the file is kept for the next poll. The
+    new rows are appended to the L1a csv files at every poll, so the decode latency is about the
+    poll interval.
+
+    The new rows are kept in a list, and are joined to the dataframes in
+    "global_variables.all_file_details" at most every "refresh_interval" seconds and when the
+    file is complete, since each join copies all the rows.
+
+    The dataframes are the L1a rows with the Date as the UTC index. The x and y-coordinates of
+    "read_csv_sci" aren't added, since the shift of the voltages is computed from all the data.
+
+    Parameters
+    ----------
+    file_val : str
+        Path to the payload file. If None, the file is selected with a dialog. Default is None.
+    t_start : datetime.datetime
+        Start time of the sliced dataframes. If None, the slices start with the data. Default is
+        None.
+    t_end : datetime.datetime
+        End time of the sliced dataframes. If None, the slices end with the data. Default is None.
+    poll_interval : float
+        Time between two checks of the file size in seconds. Default is 2 seconds.
+    idle_timeout : float
+        The file is considered complete when it hasn't grown for this many seconds. Its last
+        frames are then decoded and the function returns. If None, the file is followed until
+        the function is interrupted. Default is None.
+    refresh_interval : float
+        Time between two updates of the dataframes in "global_variables.all_file_details" in
+        seconds. Default is 10 seconds.
+    max_rows : int
+        Largest number of rows kept in these dataframes, the oldest rows are dropped. If None,
+        all the rows are kept, and each update gets slower as the file grows. Default is None.
+
+    Returns
+    -------
+    file_val : str
+        Path to the payload file.
+    """
+    if file_val is None:
+        file_val = filedialog.askopenfilename(
+            initialdir="C:\\Users\\Lexi-User\\Desktop\\PIT_softwares\\PIT_23_05_05\\Target\\rec_tlm\\not_sent\\",
+            title="Select file",
+            filetypes=(("all files", "*.*"), ("text files", "*.txt")),
+        )
+    if not Path(file_val).is_file():
+        raise FileNotFoundError("The file " + file_val + " does not exist.")
+
+    # The slices are selected on the UTC index of the dataframes
+    if t_start is not None:
+        t_start = pd.to_datetime(t_start, utc=True)
+    if t_end is not None:
+        t_end = pd.to_datetime(t_end, utc=True)
+
+    if "unit_2" in file_val or "unit2" in file_val:
+        lxi_unit = 2
+    else:
+        lxi_unit = 1
+
+    file_name_sci = l1a_save_file_name(file_val, data_type="sci")
+    file_name_hk = l1a_save_file_name(file_val, data_type="hk")
+    Path(file_name_sci).parent.mkdir(parents=True, exist_ok=True)
+    Path(file_name_hk).parent.mkdir(parents=True, exist_ok=True)
+
+    global_variables.all_file_details["file_name_b"] = file_val
+    global_variables.all_file_details["file_name_hk"] = file_name_hk
+    global_variables.all_file_details["file_name_sci"] = file_name_sci
+
+    print(f"Following \x1b[1;32;255m{file_val}\x1b[0m, press Ctrl+C to stop.")
+
+    next_frame = 0
+    batches = {"sci": [], "hk": []}
+    # Data types with rows which aren't in global_variables yet
+    pending = set()
+    previous_row_hk = None
+    file_size = -1
+    idle_time = 0.0
+    last_refresh = None
+    is_final = False
+    try:
+        while not is_final:
+            new_file_size = os.path.getsize(file_val)
+            if new_file_size == file_size:
+                idle_time += poll_interval
+                is_final = idle_timeout is not None and idle_time >= idle_timeout
+                if not is_final:
+                    time.sleep(poll_interval)
+                    continue
+            else:
+                idle_time = 0.0
+                file_size = new_file_size
+
+            # Decode only the frames appended since the last poll
+            sci_data, hk_data, next_frame = ldf.read_new_pit_data(
+                file_val, start_frame=next_frame, final=is_final
+            )
+
+            if len(sci_data["Date"]) > 0:
+                df_sci = sci_data_to_dataframe(sci_data, is_payload=True, number_of_decimals=6)
+                df_sci.to_csv(
+                    file_name_sci,
+                    mode="a" if batches["sci"] else "w",
+                    header=not batches["sci"],
+                    index=False,
+                )
+                df_sci["Date"] = pd.to_datetime(df_sci["Date"], utc=True)
+                batches["sci"].append(df_sci.set_index("Date"))
+                pending.add("sci")
+
+            if len(hk_data["Date"]) > 0:
+                df_hk = hk_data_to_dataframe(
+                    hk_data, lxi_unit=lxi_unit, is_payload=True, previous_row=previous_row_hk
+                )
+                previous_row_hk = df_hk.iloc[-1]
+                df_hk.to_csv(
+                    file_name_hk,
+                    mode="a" if batches["hk"] else "w",
+                    header=not batches["hk"],
+                    index=False,
+                )
+                df_hk = df_hk.reset_index(drop=True)
+                df_hk["Date"] = pd.to_datetime(df_hk["Date"], utc=True)
+                batches["hk"].append(df_hk.set_index("Date"))
+                pending.add("hk")
+
+            # Update the dataframes in global_variables with the rows decoded since the last
+            # update
+            now = time.monotonic()
+            if is_final or last_refresh is None or now - last_refresh >= refresh_interval:
+                last_refresh = now
+                for data_type in pending:
+                    _publish_batches(batches[data_type], data_type, t_start, t_end, max_rows)
+                pending.clear()
+
+            if len(sci_data["Date"]) > 0 or len(hk_data["Date"]) > 0:
+                print(
+                    f"Added {len(sci_data['Date'])} science and {len(hk_data['Date'])} "
+                    f"housekeeping packets, {next_frame * ldf.pit_frame_length} bytes decoded."
+                )
+
+            if not is_final:
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print(f"\nStopped following {file_val}.")
+        for data_type in pending:
+            _publish_batches(batches[data_type], data_type, t_start, t_end, max_rows)
+
+    return file_val
+
+
 def open_file_b_multiple(file_val=None, t_start=None, t_end=None, multiple_files=True):
     # Cut path to the file off
     file_name_b = file_val
@@ -1107,7 +1015,8 @@ def non_lin_correction(
     """
     Function to apply nonlinearity correction to MCP position x/y data. The model to apply the
     nonlinearity correction is a Gaussian Process model trained on the data from the LEXI mask
-    testing. The kernel used is Matern with length scale = 5 and nu = 2.5.
+    testing. The kernel used is Matern with length scale = 5 and nu = 2.5. The correction is
+    interpolated on a grid of the model with "lxi_l1b_funcs.non_lin_correction".
 
     Parameters
     ----------
@@ -1127,21 +1036,9 @@ def non_lin_correction(
         "../data/gp_models/gp_data_3.0_10_0.0_0.8_4_Matern(length_scale=5, nu=2.5).pickle"
     )
 
-    # Get the gp_model from the pickle file
-    with open(gp_model_file_name, "rb") as f:
-        gp_model = pickle.load(f)
-
-    # Close the pickle file
-    f.close()
-
-    xy_coord = np.array([x, y]).T
-    delta_xy, sigma = gp_model.predict(xy_coord, return_std=True)
-
-    corrected_xy = xy_coord - delta_xy
-    x_nln = corrected_xy[:, 0]
-    y_nln = corrected_xy[:, 1]
-
-    return x_nln, y_nln
+    # The model is evaluated once on a grid of positions, and the correction of the photons is
+    # interpolated on the grid
+    return lbf.non_lin_correction(x, y, gp_model_file_name)
 
 
 def volt_to_mcp(x, y):
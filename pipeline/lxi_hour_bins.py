@@ -0,0 +1,177 @@
+import statistics
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+
+
+def plan_hour_bins(grouped_files=None, file_sizes=None, max_shard_size=None):
+    """
+    Turns the hour bins into work items ordered by their estimated cost, the most expensive first.
+    The cost of a bin is the number of bytes of its input files. The bins much larger than the
+    others are split into shards of consecutive files, which are processed separately and merged
+    before the output file is written, so that a few busy hours don't set the length of the run.
+
+    Parameters
+    ----------
+    grouped_files : dict
+        Dictionary keyed by the hour bin, with the list of (file, file_time) of the bin sorted by
+        time.
+    file_sizes : dict
+        Dictionary keyed by the file name, with the size of the file in bytes.
+    max_shard_size : int
+        Largest number of bytes of a shard. A bin larger than this is split into shards. If None,
+        twice the median size of the bins is used. Default is None.
+
+    Returns
+    -------
+    work_items : list of dict
+        One dictionary per shard with the "hour_bin", the index of the "shard", the number of
+        shards of the bin "n_shards", the "files" of the shard and its "cost" in bytes, sorted by
+        decreasing cost.
+    """
+    bin_costs = {
+        hour_bin: sum(file_sizes.get(file, 0) for file, _ in files)
+        for hour_bin, files in grouped_files.items()
+    }
+    if max_shard_size is None:
+        max_shard_size = 2 * statistics.median(bin_costs.values()) if bin_costs else 0
+
+    work_items = []
+    for hour_bin, files in grouped_files.items():
+        # Fill the shards with consecutive files, so that each shard covers a part of the hour
+        shards = [[]]
+        shard_costs = [0]
+        if bin_costs[hour_bin] > max_shard_size > 0:
+            for file, file_time in files:
+                size = file_sizes.get(file, 0)
+                if shards[-1] and shard_costs[-1] + size > max_shard_size:
+                    shards.append([])
+                    shard_costs.append(0)
+                shards[-1].append((file, file_time))
+                shard_costs[-1] += size
+        else:
+            shards = [files]
+            shard_costs = [bin_costs[hour_bin]]
+
+        for shard, (shard_files, shard_cost) in enumerate(zip(shards, shard_costs)):
+            work_items.append(
+                {
+                    "hour_bin": hour_bin,
+                    "shard": shard,
+                    "n_shards": len(shards),
+                    "files": shard_files,
+                    "cost": shard_cost,
+                }
+            )
+
+    return sorted(work_items, key=lambda x: x["cost"], reverse=True)
+
+
+def _remove_files(file_names):
+    """
+    Deletes the shard files of a bin once they aren't needed anymore.
+    """
+    for file_name in file_names:
+        Path(file_name).unlink(missing_ok=True)
+
+
+def run_hour_bins(
+    executor=None,
+    work_items=None,
+    process_group=None,
+    process_shard=None,
+    merge_shards=None,
+    group_args=(),
+    shard_args=(),
+    shard_folder=None,
+):
+    """
+    Submits the work items from "plan_hour_bins" to a pool in their order. A bin with a single
+    shard is processed with "process_group". The shards of a split bin are processed with
+    "process_shard", which saves its result to a temporary file, and once all the shards of the
+    bin are done "merge_shards" joins them and writes the output file.
+
+    The functions are called as process_group(hour_bin, files, *group_args),
+    process_shard(files, shard_file, *shard_args) and
+    merge_shards(hour_bin, shard_files, *group_args).
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+        The pool.
+    work_items : list of dict
+        Output of "plan_hour_bins".
+    process_group, process_shard, merge_shards : callable
+        Functions which process a whole bin, process a shard and merge the shards of a bin.
+    group_args : tuple
+        Extra arguments of "process_group" and "merge_shards". Default is ().
+    shard_args : tuple
+        Extra arguments of "process_shard". Default is ().
+    shard_folder : str
+        Folder in which the temporary folder of the shard files is created. If None, the default
+        temporary folder is used. Default is None.
+
+    Yields
+    ------
+    hour_bin : float
+        Hour bin which has been processed, in the order they finish.
+    error : Exception
+        The exception raised while processing the bin, or None.
+    results : list
+        Return values of the functions which processed the bin: the one of "process_group", or
+        the ones of "process_shard" for each shard followed by the one of "merge_shards".
+    """
+    with tempfile.TemporaryDirectory(dir=shard_folder) as temp_folder:
+        futures = {}
+        split_bins = {}
+        for item in work_items:
+            hour_bin = item["hour_bin"]
+            if item["n_shards"] == 1:
+                future = executor.submit(process_group, hour_bin, item["files"], *group_args)
+            else:
+                split_bin = split_bins.setdefault(
+                    hour_bin,
+                    {
+                        "shard_files": [None] * item["n_shards"],
+                        "remaining": item["n_shards"],
+                        "error": None,
+                        "results": [],
+                    },
+                )
+                shard_name = f"hour_bin_{hour_bin:.0f}_shard_{item['shard']}.pkl"
+                shard_file = Path(temp_folder) / shard_name
+                split_bin["shard_files"][item["shard"]] = shard_file
+                future = executor.submit(process_shard, item["files"], shard_file, *shard_args)
+            futures[future] = item
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = futures.pop(future)
+                hour_bin = item["hour_bin"]
+                error = future.exception()
+                result = future.result() if error is None else None
+                if item["n_shards"] == 1:
+                    yield hour_bin, error, [result]
+                    continue
+                split_bin = split_bins[hour_bin]
+                split_bin["results"].append(result)
+                if item.get("is_merge", False):
+                    _remove_files(split_bin["shard_files"])
+                    yield hour_bin, error, split_bin["results"]
+                    continue
+
+                # A shard is done, merge the bin once all its shards are done
+                split_bin["remaining"] -= 1
+                if split_bin["error"] is None:
+                    split_bin["error"] = error
+                if split_bin["remaining"] > 0:
+                    continue
+                if split_bin["error"] is not None:
+                    _remove_files(split_bin["shard_files"])
+                    yield hour_bin, split_bin["error"], split_bin["results"]
+                    continue
+                merge_future = executor.submit(
+                    merge_shards, hour_bin, split_bin["shard_files"], *group_args
+                )
+                futures[merge_future] = {"hour_bin": hour_bin, "n_shards": 0, "is_merge": True}
@@ -0,0 +1,188 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# File formats in which the L1a files can be saved. The npz format keeps the native data types,
+# and is much smaller and faster to read than the csv files.
+l1a_file_formats = {
+    "csv": ".csv",
+    "npz": ".npz",
+}
+
+# Order in which the formats are preferred when the same L1a file exists in more than one format
+l1a_format_preference = [".npz", ".csv"]
+
+channel_keys = ["Channel1", "Channel2", "Channel3", "Channel4"]
+
+
+def l1a_file_name(save_file_name=None, file_format="csv"):
+    """
+    Changes the extension of the L1a file name to the one of the selected file format.
+
+    Parameters
+    ----------
+    save_file_name : str
+        Name of the output file.
+    file_format : str
+        One of "csv" or "npz". Default is "csv".
+
+    Returns
+    -------
+    save_file_name : str
+        Name of the output file with the extension of the file format.
+    """
+    if file_format not in l1a_file_formats:
+        raise ValueError(
+            f"The file format must be one of {list(l1a_file_formats)}, not {file_format}."
+        )
+    return str(Path(save_file_name).with_suffix(l1a_file_formats[file_format]))
+
+
+def _to_native_dtypes(df):
+    """
+    Converts the columns of a L1a dataframe to the types stored in the npz files: the "Date"
+    as int64 nanoseconds since epoch, the channels as float32 and "IsCommanded" as bool.
+    """
+    data = {}
+    for key in df.columns:
+        if key == "Date":
+            date = pd.to_datetime(df[key])
+            if date.dt.tz is not None:
+                date = date.dt.tz_convert("UTC").dt.tz_localize(None)
+            data[key] = date.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        elif key in channel_keys:
+            data[key] = df[key].to_numpy(dtype=np.float32)
+        elif key == "IsCommanded":
+            data[key] = df[key].to_numpy(dtype=bool)
+        else:
+            data[key] = df[key].to_numpy()
+    return data
+
+
+def save_l1a_file(df=None, save_file_name=None, file_format="csv"):
+    """
+    Saves a L1a science or housekeeping dataframe in the selected file format.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The L1a dataframe.
+    save_file_name : str
+        Name of the output file. The extension is replaced by the one of the file format.
+    file_format : str
+        One of "csv" or "npz". Default is "csv".
+
+    Returns
+    -------
+    save_file_name : str
+        Name of the saved file.
+    """
+    save_file_name = l1a_file_name(save_file_name, file_format=file_format)
+
+    if file_format == "csv":
+        df.to_csv(save_file_name, index=False)
+    elif file_format == "npz":
+        np.savez(save_file_name, **_to_native_dtypes(df))
+
+    return save_file_name
+
+
+def read_l1a_file(file_name=None):
+    """
+    Reads a L1a science or housekeeping file. The file format is found from the extension of the
+    file. For the npz files, "Date" is returned as "datetime64[ns]" in UTC, the channels as
+    float32 and "IsCommanded" as bool. For the csv files, the columns are returned as read by
+    "pandas.read_csv".
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the L1a file.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        The L1a dataframe.
+    """
+    suffix = Path(file_name).suffix
+    if suffix == ".csv":
+        return pd.read_csv(file_name)
+    elif suffix == ".npz":
+        with np.load(file_name) as data:
+            df = pd.DataFrame({key: data[key] for key in data.files})
+    else:
+        raise ValueError(f"The file {file_name} is not a L1a csv or npz file.")
+
+    if "Date" in df.columns:
+        df["Date"] = df["Date"].to_numpy(dtype=np.int64).view("datetime64[ns]")
+
+    return df
+
+
+def select_l1a_files(file_list=None):
+    """
+    Keeps one file for each L1a file found in more than one format. The npz files are
+    preferred over the csv files. The files are matched by name, since the formats of a file can
+    be in different folders. Files with other extensions are dropped.
+
+    Parameters
+    ----------
+    file_list : list of str
+        Names of the L1a files.
+
+    Returns
+    -------
+    file_list : list of str
+        Sorted names of the selected files.
+    """
+    selected_files = {}
+    for file_name in file_list:
+        suffix = Path(file_name).suffix
+        if suffix not in l1a_format_preference:
+            continue
+        stem = Path(file_name).stem
+        if stem not in selected_files or l1a_format_preference.index(
+            suffix
+        ) < l1a_format_preference.index(Path(selected_files[stem]).suffix):
+            selected_files[stem] = file_name
+
+    return sorted(selected_files.values())
+
+
+def l1a_dates_to_utc(date=None):
+    """
+    Converts the "Date" column of L1a dataframes to timezone aware UTC datetimes in a single
+    vectorized step. The dates of the csv files are ISO 8601 strings, with or without a UTC
+    offset, and the dates of the npz files are already "datetime64[ns]" in UTC. Naive dates
+    are taken as UTC.
+
+    Parameters
+    ----------
+    date : pandas.Series
+        The "Date" column.
+
+    Returns
+    -------
+    date : pandas.Series
+        The dates as "datetime64[ns, UTC]".
+    """
+    if not pd.api.types.is_datetime64_any_dtype(date):
+        try:
+            date = pd.to_datetime(date, format="ISO8601", utc=True)
+        except (TypeError, ValueError) as error:
+            raise ValueError(
+                f"The L1a column {date.name!r} of dtype {date.dtype} can't be read as ISO 8601 "
+                f"dates: {error}"
+            ) from error
+    elif date.dt.tz is None:
+        date = date.dt.tz_localize("UTC")
+    else:
+        date = date.dt.tz_convert("UTC")
+
+    if str(date.dt.tz) != "UTC":
+        raise ValueError(
+            f"The L1a column {date.name!r} must be timezone aware in UTC, not of dtype "
+            f"{date.dtype}."
+        )
+    return date
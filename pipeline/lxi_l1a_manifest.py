@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+# Name of the manifest file saved in the level 0 folder. It records which level 0 files have
+# already been converted to L1a files, so that only new or changed files are decoded again.
+manifest_file_name = "l1a_manifest.json"
+
+
+def file_hash(file_name=None, block_size=16 * 1024**2):
+    """
+    Computes the sha256 hash of the content of a file.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the file.
+    block_size : int
+        Number of bytes read at a time. Default is 16 MB.
+
+    Returns
+    -------
+    hash : str
+        The hexadecimal sha256 hash of the file.
+    """
+    sha256 = hashlib.sha256()
+    with open(file_name, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def file_signature(file_name=None, use_hash=False):
+    """
+    Gets the size and the modification time of a file, and optionally the hash of its content.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the file.
+    use_hash : bool
+        If True, the sha256 hash of the file is added. Default is False.
+
+    Returns
+    -------
+    signature : dict
+        Dictionary with the "size" in bytes and the "mtime_ns" of the file, and the "sha256" of the
+        file if use_hash is True.
+    """
+    stat = os.stat(file_name)
+    signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if use_hash:
+        signature["sha256"] = file_hash(file_name)
+    return signature
+
+
+def load_manifest(manifest_path=None):
+    """
+    Reads the manifest of the level 0 files already converted to L1a files.
+
+    Parameters
+    ----------
+    manifest_path : str
+        Name of the manifest file.
+
+    Returns
+    -------
+    manifest : dict
+        Dictionary keyed by the absolute name of the level 0 files. The manifest is empty if the
+        file doesn't exist or can't be read.
+    """
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if not isinstance(manifest, dict):
+        return {}
+    return manifest
+
+
+def save_manifest(manifest=None, manifest_path=None):
+    """
+    Saves the manifest. The manifest is first written to a temporary file which then replaces the
+    old one, so that an interrupted run never leaves a partially written manifest.
+
+    Parameters
+    ----------
+    manifest : dict
+        The manifest.
+    manifest_path : str
+        Name of the manifest file.
+    """
+    Path(manifest_path).parent.mkdir(parents=True, exist_ok=True)
+    temp_path = str(manifest_path) + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+
+def is_file_current(manifest=None, file_name=None, file_format="csv", use_hash=False):
+    """
+    Checks if a level 0 file has already been converted to L1a files which are still on the disk.
+    A file is current when its size and modification time are the ones in the manifest. If
+    use_hash is True, a file with a new modification time but the same content is current too.
+
+    Parameters
+    ----------
+    manifest : dict
+        The manifest.
+    file_name : str
+        Name of the level 0 file.
+    file_format : str
+        Format of the L1a output files. Files saved in another format are not current.
+    use_hash : bool
+        If True, the hash of the file is compared when the modification time has changed.
+        Default is False.
+
+    Returns
+    -------
+    is_current : bool
+        True if the file doesn't need to be decoded again.
+    """
+    entry = manifest.get(str(Path(file_name).resolve()))
+    if entry is None or entry.get("file_format") != file_format:
+        return False
+    # An entry without outputs, from an older or a hand edited manifest, is never current
+    outputs = entry.get("outputs")
+    if not outputs or not all(Path(output).is_file() for output in outputs):
+        return False
+
+    signature = file_signature(file_name)
+    if signature["size"] != entry.get("size"):
+        return False
+    if signature["mtime_ns"] == entry.get("mtime_ns"):
+        return True
+    if use_hash and entry.get("sha256") is not None:
+        if file_hash(file_name) == entry["sha256"]:
+            # Same content, only record the new modification time
+            entry["mtime_ns"] = signature["mtime_ns"]
+            return True
+    return False
+
+
+def update_manifest(
+    manifest=None, file_name=None, outputs=None, file_format="csv", signature=None
+):
+    """
+    Records in the manifest the L1a files produced from a level 0 file.
+
+    Parameters
+    ----------
+    manifest : dict
+        The manifest, updated in place.
+    file_name : str
+        Name of the level 0 file.
+    outputs : list of str
+        Names of the L1a files produced from the level 0 file.
+    file_format : str
+        Format of the L1a output files.
+    signature : dict
+        Signature of the level 0 file from "file_signature", taken before the file was decoded so
+        that a file growing during the decode is decoded again on the next run. If None, the
+        signature is taken now.
+
+    Returns
+    -------
+    manifest : dict
+        The updated manifest.
+    """
+    if signature is None:
+        signature = file_signature(file_name)
+    manifest[str(Path(file_name).resolve())] = {
+        **signature,
+        "file_format": file_format,
+        "outputs": [str(Path(output).resolve()) for output in outputs],
+    }
+    return manifest
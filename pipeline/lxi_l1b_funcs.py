@@ -0,0 +1,353 @@
+import argparse
+import multiprocessing
+import os
+import pickle
+from pathlib import Path
+
+import lxi_asset_cache as lac
+import numpy as np
+
+# Columns computed by "level1b_positions", in the order of the rows of its output. The names of
+# the last two columns are given by the caller.
+l1b_shifted_keys = ["Channel1_shifted", "Channel2_shifted", "Channel3_shifted", "Channel4_shifted"]
+l1b_position_keys = ["x_volt", "y_volt", "x_volt_lin", "y_volt_lin"]
+
+
+def level1b_positions(
+    channels=None,
+    is_commanded=None,
+    lower_threshold=None,
+    M_inv=None,
+    b=None,
+    conversion_factor=90,
+    dtype=None,
+):
+    """
+    Computes the shifted channels, the position in voltage coordinates, the linearity corrected
+    position and the position in MCP coordinates of the photons in one pass over a single
+    preallocated buffer, instead of one pandas Series per step and per channel.
+
+    The values are the same as the ones of the step by step computation:
+    - ChannelN_shifted = ChannelN - lower_threshold, NaN for the commanded packets and where
+      negative,
+    - x_volt = Channel3_shifted / (Channel3_shifted + Channel1_shifted),
+    - y_volt = Channel2_shifted / (Channel2_shifted + Channel4_shifted),
+    - x_volt_lin, y_volt_lin = the linearity correction of x_volt, y_volt with M_inv and b,
+    - x_mcp, y_mcp = x_volt_lin, y_volt_lin times the conversion factor.
+
+    Parameters
+    ----------
+    channels : list of numpy.ndarray
+        Channel1, Channel2, Channel3 and Channel4 of the photons.
+    is_commanded : numpy.ndarray
+        True for the commanded packets.
+    lower_threshold : float
+        Value subtracted from the channels. If None, 1 is used. Default is None.
+    M_inv : numpy.ndarray
+        2x2 matrix of the linearity correction.
+    b : numpy.ndarray
+        Offsets of the linearity correction.
+    conversion_factor : float
+        Conversion factor from voltage to MCP coordinates, in mm. Default is 90.
+    dtype : numpy.dtype
+        Data type of the output. If None, the floating point type of the channels is used, so
+        float32 channels give float32 positions, as with the step by step computation in pandas.
+        Default is None.
+
+    Returns
+    -------
+    positions : numpy.ndarray
+        Array of shape (10, number of photons) with, in each row, the columns of
+        "l1b_shifted_keys", "l1b_position_keys" and the x and y MCP coordinates.
+    """
+    if lower_threshold is None:
+        lower_threshold = 1
+    is_commanded = np.asarray(is_commanded, dtype=bool)
+    if dtype is None:
+        dtype = np.result_type(*channels, 1.0)
+
+    # The constants are used as Python floats, so that they don't change the data type of the
+    # computation, as in pandas
+    lower_threshold = float(lower_threshold)
+    M_inv = [[float(x) for x in row] for row in M_inv]
+    b = [float(x) for x in b]
+
+    positions = np.empty((10, len(is_commanded)), dtype=dtype)
+    shifted = positions[:4]
+    x_volt, y_volt, x_lin, y_lin, x_mcp, y_mcp = positions[4:]
+
+    # Shifted channels, NaN for the commanded packets and the negative values
+    for channel, channel_shifted in zip(channels, shifted):
+        np.subtract(channel, lower_threshold, out=channel_shifted)
+    np.copyto(shifted, np.nan, where=is_commanded | (shifted < 0))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Position in voltage coordinates
+        np.add(shifted[2], shifted[0], out=x_volt)
+        np.divide(shifted[2], x_volt, out=x_volt)
+        np.add(shifted[1], shifted[3], out=y_volt)
+        np.divide(shifted[1], y_volt, out=y_volt)
+
+    # Linearity correction, the MCP rows are used as scratch space
+    np.multiply(x_volt, M_inv[0][0], out=x_lin)
+    np.multiply(y_volt, M_inv[0][1], out=x_mcp)
+    np.add(x_lin, x_mcp, out=x_lin)
+    np.subtract(x_lin, b[0], out=x_lin)
+    np.multiply(x_volt, M_inv[1][0], out=y_lin)
+    np.multiply(y_volt, M_inv[1][1], out=y_mcp)
+    np.add(y_lin, y_mcp, out=y_lin)
+    np.subtract(y_lin, b[1], out=y_lin)
+
+    # Voltage to MCP coordinates
+    np.multiply(x_lin, conversion_factor, out=x_mcp)
+    np.multiply(y_lin, conversion_factor, out=y_mcp)
+
+    return positions
+
+
+def add_level1b_positions(df=None, mcp_keys=("x_mcp", "y_mcp"), **kwargs):
+    """
+    Adds the columns of "level1b_positions" to a dataframe of L1a science data.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Dataframe with the "Channel1" to "Channel4" and "IsCommanded" columns.
+    mcp_keys : tuple of str
+        Names of the x and y MCP coordinates columns. Default is ("x_mcp", "y_mcp").
+    **kwargs
+        Arguments of "level1b_positions".
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        The dataframe with the new columns.
+    """
+    positions = level1b_positions(
+        channels=[df[f"Channel{i}"].to_numpy() for i in range(1, 5)],
+        is_commanded=df["IsCommanded"].to_numpy(),
+        **kwargs,
+    )
+    for key, values in zip(l1b_shifted_keys + l1b_position_keys + list(mcp_keys), positions):
+        df[key] = values
+    return df
+
+
+def correction_grid_file_name(gp_model_file_name=None):
+    """
+    Name of the file of the non-linearity correction grid of a Gaussian Process model, next to
+    the model: "<model name>_grid.npz".
+    """
+    gp_model_file_name = Path(gp_model_file_name)
+    return str(gp_model_file_name.with_name(gp_model_file_name.stem + "_grid.npz"))
+
+
+def make_correction_grid(
+    gp_model_file_name=None,
+    grid_file_name=None,
+    half_width=45.0,
+    step=0.1,
+    n_check=100000,
+    chunk_size=10000,
+):
+    """
+    Evaluates the Gaussian Process model of the non-linearity correction once on a regular grid of
+    MCP positions and saves the correction field, so that the correction of the photons is a
+    bilinear interpolation on the grid instead of a prediction of the model for every photon.
+
+    The largest error of the interpolation is estimated by comparing it with the model at the
+    centers of randomly chosen grid cells, where the bilinear interpolation is the farthest from
+    the grid points, and is saved with the grid.
+
+    Parameters
+    ----------
+    gp_model_file_name : str
+        Name of the pickle file of the model, a scikit-learn GaussianProcessRegressor which
+        predicts the correction (delta x, delta y) from the position (x, y) in mm.
+    grid_file_name : str
+        Name of the grid file. If None, "correction_grid_file_name" is used. Default is None.
+    half_width : float
+        The grid covers -half_width to half_width in x and y, in mm. Default is 45.0.
+    step : float
+        Spacing of the grid, in mm. Default is 0.1.
+    n_check : int
+        Number of cell centers where the interpolation error is estimated. Default is 100000.
+    chunk_size : int
+        Number of positions predicted at once, to limit the memory used by the model. Default is
+        10000.
+
+    Returns
+    -------
+    grid : dict
+        The saved grid, see "load_correction_grid".
+    """
+    if grid_file_name is None:
+        grid_file_name = correction_grid_file_name(gp_model_file_name)
+
+    with open(gp_model_file_name, "rb") as f:
+        gp_model = pickle.load(f)
+
+    def predict(xy):
+        return np.concatenate(
+            [
+                gp_model.predict(xy[i : i + chunk_size])
+                for i in range(0, max(len(xy), 1), chunk_size)
+            ]
+        )
+
+    n_points = int(round(2 * half_width / step)) + 1
+    x = np.linspace(-half_width, half_width, n_points)
+    y = np.linspace(-half_width, half_width, n_points)
+    x_grid, y_grid = np.meshgrid(x, y, indexing="ij")
+    delta_xy = predict(np.column_stack([x_grid.ravel(), y_grid.ravel()]))
+    grid = {
+        "x": x,
+        "y": y,
+        "delta_x": delta_xy[:, 0].reshape(n_points, n_points),
+        "delta_y": delta_xy[:, 1].reshape(n_points, n_points),
+    }
+
+    # Largest interpolation error, at the centers of random cells
+    rng = np.random.default_rng(0)
+    ix = rng.integers(0, n_points - 1, n_check)
+    iy = rng.integers(0, n_points - 1, n_check)
+    check_xy = np.column_stack([(x[ix] + x[ix + 1]) / 2, (y[iy] + y[iy + 1]) / 2])
+    interpolated_x, interpolated_y = grid_non_lin_correction(check_xy[:, 0], check_xy[:, 1], grid)
+    interpolated_delta = check_xy - np.column_stack([interpolated_x, interpolated_y])
+    grid["max_interpolation_error"] = np.abs(interpolated_delta - predict(check_xy)).max(axis=0)
+
+    # Written to a temporary file of the same folder and renamed, so that other processes never
+    # read a partly written grid
+    Path(grid_file_name).parent.mkdir(parents=True, exist_ok=True)
+    temp_file_name = f"{grid_file_name}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file_name, "wb") as file:
+            np.savez(file, **grid)
+        os.replace(temp_file_name, grid_file_name)
+    finally:
+        if Path(temp_file_name).exists():
+            os.remove(temp_file_name)
+    print(
+        f"Saved the non-linearity correction grid to {grid_file_name}, largest interpolation "
+        f"error {grid['max_interpolation_error']} mm"
+    )
+    return grid
+
+
+def load_correction_grid(grid_file_name=None):
+    """
+    Reads a grid saved by "make_correction_grid".
+
+    Parameters
+    ----------
+    grid_file_name : str
+        Name of the grid file.
+
+    Returns
+    -------
+    grid : dict
+        Dictionary with the grid positions "x" and "y" (1D, in mm), the corrections "delta_x"
+        and "delta_y" at the grid points (2D, indexed by x then y) and the
+        "max_interpolation_error" in x and y.
+    """
+    with np.load(grid_file_name) as data:
+        grid = {key: data[key] for key in data.files}
+
+    # The grid is shared by all the callers through the asset cache
+    for values in grid.values():
+        values.flags.writeable = False
+    return grid
+
+
+def grid_non_lin_correction(x=None, y=None, grid=None):
+    """
+    Applies the non-linearity correction with a bilinear interpolation of the correction grid.
+    Outside the grid the correction of the nearest edge is used. The photons with a NaN x or y
+    are NaN in both x and y.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        x position data, in mm.
+    y : numpy.ndarray
+        y position data, in mm.
+    grid : dict
+        Output of "load_correction_grid" or "make_correction_grid".
+
+    Returns
+    -------
+    x_nln : numpy.ndarray
+        x position data after applying nonlinearity correction.
+    y_nln : numpy.ndarray
+        y position data after applying nonlinearity correction.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.isfinite(x) & np.isfinite(y)
+
+    # Index of the cell of each photon and position inside the cell, from 0 to 1
+    cells = []
+    for position, grid_position in [(x, grid["x"]), (y, grid["y"])]:
+        step = grid_position[1] - grid_position[0]
+        fraction = np.where(valid, (position - grid_position[0]) / step, 0)
+        index = np.clip(np.floor(fraction), 0, len(grid_position) - 2).astype(np.intp)
+        cells.append((index, np.clip(fraction - index, 0, 1)))
+    (ix, tx), (iy, ty) = cells
+
+    corrected = []
+    for position, delta in [(x, grid["delta_x"]), (y, grid["delta_y"])]:
+        interpolated = (1 - tx) * ((1 - ty) * delta[ix, iy] + ty * delta[ix, iy + 1]) + tx * (
+            (1 - ty) * delta[ix + 1, iy] + ty * delta[ix + 1, iy + 1]
+        )
+        corrected.append(np.where(valid, position - interpolated, np.nan))
+
+    return corrected[0], corrected[1]
+
+
+def non_lin_correction(x=None, y=None, gp_model_file_name=None):
+    """
+    Applies the non-linearity correction of a Gaussian Process model with its correction grid,
+    read once per process.
+
+    The grid is made with "make_correction_grid" the first time the model is used, only in the
+    main process. The workers of a pool don't make it, since they would all make it at the same
+    time: it has to be made before the pool starts, by the main process or offline with
+    "python lxi_l1b_funcs.py <model file>".
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        x position data, in mm.
+    y : numpy.ndarray
+        y position data, in mm.
+    gp_model_file_name : str
+        Name of the pickle file of the model.
+
+    Returns
+    -------
+    x_nln : numpy.ndarray
+        x position data after applying nonlinearity correction.
+    y_nln : numpy.ndarray
+        y position data after applying nonlinearity correction.
+    """
+    grid_file_name = correction_grid_file_name(gp_model_file_name)
+    if not Path(grid_file_name).exists():
+        if multiprocessing.parent_process() is not None:
+            raise FileNotFoundError(
+                f"The non-linearity correction grid {grid_file_name} doesn't exist. Make it "
+                f"before starting the pool, with lxi_l1b_funcs.make_correction_grid or "
+                f'python lxi_l1b_funcs.py "{gp_model_file_name}"'
+            )
+        make_correction_grid(gp_model_file_name, grid_file_name)
+    grid = lac.load_asset(grid_file_name, load_correction_grid)
+    return grid_non_lin_correction(x, y, grid)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="Make the non-linearity correction grid of Gaussian Process models."
+    )
+    arg_parser.add_argument("gp_model_file_names", nargs="+", help="Pickle files of the models.")
+    args = arg_parser.parse_args()
+    for gp_model_file_name in args.gp_model_file_names:
+        make_correction_grid(gp_model_file_name)
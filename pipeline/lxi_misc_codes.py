@@ -1,6 +1,8 @@
 import logging
 from pathlib import Path
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
@@ -110,26 +112,109 @@ def HVmcpMan_func(vpc, hk_value, lxi_unit):
     return HVmcpMan
 
 
+hk_value_funcs = {
+    "0": PinPullerTemp_func,
+    "1": OpticsTemp_func,
+    "2": LEXIbaseTemp_func,
+    "3": HVsupplyTemp_func,
+    "4": V_Imon_5_2_func,
+    "5": V_Imon_10_func,
+    "6": V_Imon_3_3_func,
+    "7": AnodeVoltMon_func,
+    "8": V_Imon_28_func,
+    "9": ADC_Ground_func,
+    "10": Cmd_count_func,
+    "11": Pinpuller_Armed_func,
+    "12": Unused1_func,
+    "13": Unused2_func,
+    "14": HVmcpAuto_func,
+    "15": HVmcpMan_func,
+}
+
+
 def hk_value_comp(ii=None, vpc=None, hk_value=None, hk_id=None, lxi_unit=None):
-    ops = {
-        "0": PinPullerTemp_func,
-        "1": OpticsTemp_func,
-        "2": LEXIbaseTemp_func,
-        "3": HVsupplyTemp_func,
-        "4": V_Imon_5_2_func,
-        "5": V_Imon_10_func,
-        "6": V_Imon_3_3_func,
-        "7": AnodeVoltMon_func,
-        "8": V_Imon_28_func,
-        "9": ADC_Ground_func,
-        "10": Cmd_count_func,
-        "11": Pinpuller_Armed_func,
-        "12": Unused1_func,
-        "13": Unused2_func,
-        "14": HVmcpAuto_func,
-        "15": HVmcpMan_func,
-    }
-    chosen_func = ops.get(str(hk_id))
+    chosen_func = hk_value_funcs.get(str(hk_id))
     if chosen_func is None:
         raise ValueError(f"No function found for hk_id {hk_id}")
     return chosen_func(vpc, hk_value, lxi_unit)
+
+
+def hk_calibration_table(vpc=None, lxi_unit=None):
+    """
+    Coefficients of the conversion of the "hk_value" for each "hk_id". Every one of the "*_func"
+    formulas above is written as
+
+        ((hk_value * scale + offset) * factor) / divisor
+
+    with the operations done in the same order as in the formula, so that the result is bit for
+    bit the same.
+
+    Parameters
+    ----------
+    vpc : float
+        Volts per count.
+    lxi_unit : int
+        LEXI unit (1 or 2). Any other value is treated as unit 1.
+
+    Returns
+    -------
+    table : numpy.ndarray
+        Array of shape (4, 16) with the scale, offset, factor and divisor for each "hk_id".
+    """
+    scale = np.full(16, vpc)
+    offset = np.zeros(16)
+    factor = np.ones(16)
+    divisor = np.ones(16)
+
+    # Temperatures
+    offset[0:4] = -2.73
+    factor[0:4] = 100
+    # Current corresponding to the HV supply (5.2V)
+    if lxi_unit == 2:
+        offset[4], factor[4], divisor[4] = -1.129, 1e3, 21.456
+    else:
+        factor[4], divisor[4] = 1e3, 18
+    # Current corresponding to the HV supply (3.3V)
+    if lxi_unit == 2:
+        offset[6], factor[6], divisor[6] = -0.029, 1e3, 18
+    else:
+        offset[6], factor[6], divisor[6] = 0.0178, 1e3, 9.131
+    # Current corresponding to the HV supply (28V)
+    offset[8], factor[8], divisor[8] = 0.00747, 1e3, 17.94
+    # Command count, pin puller armed and the unused ones are not converted
+    scale[10:14] = 1
+
+    return np.stack([scale, offset, factor, divisor])
+
+
+def hk_value_comp_array(vpc=None, hk_value=None, hk_id=None, lxi_unit=None):
+    """
+    Converts the "hk_value" of all the housekeeping packets at once. This gives the same values
+    as calling "hk_value_comp" for each packet.
+
+    Parameters
+    ----------
+    vpc : float
+        Volts per count.
+    hk_value : numpy.ndarray
+        Raw "hk_value" of each packet.
+    hk_id : numpy.ndarray
+        "hk_id" of each packet, from 0 to 15.
+    lxi_unit : int
+        LEXI unit (1 or 2).
+
+    Returns
+    -------
+    hk_values : numpy.ndarray
+        Array of shape (len(hk_value), 16). Row "ii" has the converted value of packet "ii" in
+        column "hk_id[ii]" and NaN in all the other columns.
+    """
+    hk_id = np.asarray(hk_id, dtype=np.int64)
+    scale, offset, factor, divisor = hk_calibration_table(vpc=vpc, lxi_unit=lxi_unit)[:, hk_id]
+
+    hk_values = np.full((len(hk_id), 16), np.nan)
+    hk_values[np.arange(len(hk_id)), hk_id] = (
+        (np.asarray(hk_value, dtype=np.float64) * scale + offset) * factor
+    ) / divisor
+
+    return hk_values
@@ -0,0 +1,192 @@
+import datetime
+import hashlib
+import json
+import os
+from pathlib import Path
+
+# Name of the journal file. It's saved in the output folder of the L1b and L1c runs and lists, one
+# JSON line per event, the hour bins which were started and finished with the fingerprint of their
+# input files and the version of their output file.
+journal_file_name = "lexi_run_journal.jsonl"
+
+
+def input_fingerprint(files=None, file_info=None):
+    """
+    Hash of the input files of an hour bin. It changes when a file is added to or removed from the
+    bin, or when one of the files is rewritten.
+
+    Parameters
+    ----------
+    files : list
+        List of (file path, file time) of the bin.
+    file_info : dict
+        Dictionary keyed by the file path, with the "size" and the "mtime_ns" of the file from the
+        file catalog.
+
+    Returns
+    -------
+    fingerprint : str
+        sha256 hash of the names, sizes and modification times of the files.
+    """
+    sha256 = hashlib.sha256()
+    for file in sorted(file for file, _ in files):
+        info = file_info.get(file, {})
+        sha256.update(f"{file}|{info.get('size')}|{info.get('mtime_ns')}\n".encode())
+    return sha256.hexdigest()
+
+
+def load_journal(journal_path=None):
+    """
+    Reads the journal of the previous runs.
+
+    Parameters
+    ----------
+    journal_path : str
+        Name of the journal file.
+
+    Returns
+    -------
+    journal : dict
+        Dictionary keyed by the start time of the hour bin (ISO format), with the last entry of
+        the bin. Empty if the journal doesn't exist yet.
+    """
+    journal = {}
+    if not Path(journal_path).exists():
+        return journal
+
+    with open(journal_path, "r") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line is cut when a run is killed while writing it
+                continue
+            journal[entry["bin_start"]] = entry
+    return journal
+
+
+def append_entries(journal_path=None, entries=None):
+    """
+    Adds entries to the journal. The file is flushed to the disk before returning, so that the
+    entries survive the run being killed.
+
+    Parameters
+    ----------
+    journal_path : str
+        Name of the journal file.
+    entries : list of dict
+        Entries with at least the "bin_start", the "status" ("started" or "done"), the
+        "fingerprint" and the "version" of the bin.
+    """
+    Path(journal_path).parent.mkdir(parents=True, exist_ok=True)
+    time_stamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    # Start on a new line if the last line of the journal was cut by a killed run
+    cut_line = False
+    if Path(journal_path).exists() and os.path.getsize(journal_path) > 0:
+        with open(journal_path, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            cut_line = file.read(1) != b"\n"
+
+    with open(journal_path, "a") as file:
+        if cut_line:
+            file.write("\n")
+        for entry in entries:
+            file.write(json.dumps({**entry, "time": time_stamp}) + "\n")
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def next_version(version=None):
+    """
+    Version following "version": the secondary version is increased, and after 9 the primary
+    version is increased and the secondary version goes back to 0, "0.9" -> "1.0".
+    """
+    primary_version, secondary_version = (int(x) for x in version.split("."))
+    secondary_version += 1
+    if secondary_version > 9:
+        secondary_version = 0
+        primary_version += 1
+    return f"{primary_version}.{secondary_version}"
+
+
+def first_free_version(output_file_name=None, version="0.0"):
+    """
+    First version, starting at "version", whose output file doesn't exist yet.
+
+    Parameters
+    ----------
+    output_file_name : callable
+        Function which gives the output file of the bin for a version.
+    version : str
+        First version to try. Default is "0.0".
+
+    Returns
+    -------
+    version : str
+        Version of the output file.
+    """
+    while Path(output_file_name(version)).exists():
+        version = next_version(version)
+    return version
+
+
+def plan_run(
+    journal=None,
+    bin_starts=None,
+    fingerprints=None,
+    output_file_name=None,
+    first_version="0.0",
+    resume=False,
+):
+    """
+    Chooses the hour bins to process and the version of their output file.
+
+    Without resume, every bin is processed into the first version whose output file doesn't exist
+    yet, as before. With resume:
+    - a bin which was finished with the same input files, and whose output file still exists, is
+      skipped,
+    - a bin which was started, or finished but whose output file is gone, with the same input
+      files, is processed again into the same version, and its output file is overwritten,
+    - a bin whose input files have changed is processed into a new version.
+
+    Parameters
+    ----------
+    journal : dict
+        Output of "load_journal".
+    bin_starts : dict
+        Dictionary keyed by the hour bin, with the start time of the bin.
+    fingerprints : dict
+        Dictionary keyed by the hour bin, with the output of "input_fingerprint".
+    output_file_name : callable
+        Function which gives the output file of a bin for a bin start time and a version.
+    first_version : str
+        Version of the first output file of a bin. Default is "0.0".
+    resume : bool
+        If True, the finished bins are skipped and the interrupted bins reuse their version.
+        Default is False.
+
+    Returns
+    -------
+    versions : dict
+        Dictionary keyed by the hour bin to process, with the version of its output file. An
+        existing output file of that version is overwritten.
+    skipped : list
+        Hour bins which were already finished.
+    """
+    versions = {}
+    skipped = []
+    for hour_bin, bin_start in bin_starts.items():
+        entry = journal.get(bin_start.isoformat()) if resume else None
+        if entry is not None and entry["fingerprint"] == fingerprints[hour_bin]:
+            output_exists = Path(output_file_name(bin_start, entry["version"])).exists()
+            if entry["status"] == "done" and output_exists:
+                skipped.append(hour_bin)
+            else:
+                versions[hour_bin] = entry["version"]
+            continue
+
+        versions[hour_bin] = first_free_version(
+            lambda version: output_file_name(bin_start, version), first_version
+        )
+    return versions, skipped
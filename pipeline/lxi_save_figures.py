@@ -1,8 +1,9 @@
-import glob
 import re
 from pathlib import Path
 
 import global_variables
+import lxi_file_catalog as lfc
+import lxi_l1a_io as lio
 import matplotlib as mpl
 import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
@@ -966,14 +967,21 @@ def read_and_plot_all_files():
     parent_folder = check_folder_structure()
     print(f"Reading files from: \033[1;32m{parent_folder}\033[0m\n")
 
-    file_name_format = "payload_lexi_*_*_hk_output_L1a.csv"
-    csv_files = glob.glob(str(parent_folder / "**" / file_name_format), recursive=True)
+    # Find the L1a files in any of the L1a file formats with the file catalog at the top of the
+    # data folder. Only the new and changed files are added to the catalog.
+    catalog_path = parent_folder.parents[1] / lfc.catalog_file_name
+    lfc.update_catalog(catalog_path, folders=[parent_folder])
+    catalog_files = lfc.query_files(catalog_path, level="L1a", kind="hk")
+    hk_folder = parent_folder.resolve()
+    csv_files = lio.select_l1a_files(
+        [file["path"] for file in catalog_files if Path(file["path"]).is_relative_to(hk_folder)]
+    )
     print(f"Found \033[1;31m{len(csv_files)}\033[0m CSV files in the surface folder.\n")
     # Remove files that has "_hk_hk_" in the name
     exclude_pattern = re.compile(r"_hk_hk_")
     # Also exlude files that have names like these:
     # payload_lexi_1737059168_6115_1737066668_7976_hk_output_L1a.csv
-    exclude_pattern_2 = re.compile(r"payload_lexi_\d+_\d+_\d+_\d+_hk_output_L1a.csv")
+    exclude_pattern_2 = re.compile(r"payload_lexi_\d+_\d+_\d+_\d+_hk_output_L1a\.")
     csv_files = [file for file in csv_files if not exclude_pattern.search(file)]
     csv_files = [file for file in csv_files if not exclude_pattern_2.search(file)]
     # Sort the files by name
@@ -987,7 +995,7 @@ def read_and_plot_all_files():
         return pd.DataFrame()
     for i, file in enumerate(csv_files):
         # print(f"Reading file {i + 1} of {len(csv_files)}: {file}")
-        df = pd.read_csv(file)
+        df = lio.read_l1a_file(file)
         # Ignore first 30 rows
         df = df.iloc[:]
         # Remove the outliers for each column exc
@@ -0,0 +1,345 @@
+from pathlib import Path
+
+import lxi_decode_funcs as ldf
+import numpy as np
+
+# Time of the first packet of the synthetic files (2025-03-16 00:00:00 UTC)
+default_start_time = 1742083200.0
+
+
+def synthetic_packet_times(n_packets, event_rate=1000.0, hk_cadence=1.0, start_time=0.0, rng=None):
+    """
+    Creates the times of a stream of science and housekeeping packets. The science events arrive
+    at random (Poisson) with the given rate, and the housekeeping packets come at a fixed cadence.
+
+    Parameters
+    ----------
+    n_packets : int
+        Number of packets.
+    event_rate : float
+        Mean number of science events per second. Default is 1000.
+    hk_cadence : float
+        Time between two housekeeping packets in seconds. Default is 1.
+    start_time : float
+        Time of the first packet in seconds since epoch. Default is 0.
+    rng : numpy.random.Generator
+        Random number generator. Default is None.
+
+    Returns
+    -------
+    times : numpy.ndarray
+        Time of each packet in seconds since epoch, sorted.
+    is_hk : numpy.ndarray
+        Boolean array, True for the housekeeping packets.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    # Expected fraction of housekeeping packets in the stream
+    hk_rate = 1 / hk_cadence
+    n_hk = int(round(n_packets * hk_rate / (event_rate + hk_rate)))
+    n_sci = n_packets - n_hk
+
+    sci_times = start_time + np.cumsum(rng.exponential(1 / event_rate, n_sci))
+    hk_times = start_time + hk_cadence * np.arange(1, n_hk + 1)
+
+    times = np.concatenate([sci_times, hk_times])
+    is_hk = np.concatenate([np.zeros(n_sci, dtype=bool), np.ones(n_hk, dtype=bool)])
+    order = np.argsort(times, kind="stable")
+
+    return times[order], is_hk[order]
+
+
+def synthetic_lxi_packets(times, is_hk, start_time=0.0, commanded_fraction=0.01, rng=None):
+    """
+    Creates the 16 byte LEXI packets for the given packet times.
+
+    Parameters
+    ----------
+    times : numpy.ndarray
+        Time of each packet in seconds since epoch.
+    is_hk : numpy.ndarray
+        Boolean array, True for the housekeeping packets.
+    start_time : float
+        Time at which the timestamp counter of the instrument is zero. Default is 0.
+    commanded_fraction : float
+        Fraction of the science events which are commanded. Default is 0.01.
+    rng : numpy.random.Generator
+        Random number generator. Default is None.
+
+    Returns
+    -------
+    packets : numpy.ndarray
+        Structured array of dtype "lxi_decode_funcs.gsfc_frame_dtype".
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    n_packets = len(times)
+    packets = np.zeros(n_packets, dtype=ldf.gsfc_frame_dtype)
+    packets["sync_lxi"] = int.from_bytes(ldf.sync_lxi, "big")
+
+    # The timestamp is a millisecond counter of 30 bits
+    timestamp = ((times - start_time) * 1e3).astype(np.int64) & 0x3FFFFFFF
+    is_commanded = ~is_hk & (rng.random(n_packets) < commanded_fraction)
+    packets["timestamp_word"] = (
+        timestamp | (is_hk.astype(np.int64) << 31) | (is_commanded.astype(np.int64) << 30)
+    )
+
+    # Science packets: the four channels are voltages spread around the middle of the range
+    channels = np.clip(rng.normal(32768, 8000, (n_packets, 4)), 0, 65535).astype(np.uint16)
+
+    # Housekeeping packets: the hk_id cycles from 0 to 15 with a 12 bit value, followed by the
+    # event counts since the previous housekeeping packet
+    hk_index = np.flatnonzero(is_hk)
+    hk_id = np.arange(len(hk_index)) % 16
+    hk_value = rng.integers(0, 4096, len(hk_index))
+    n_events = np.diff(np.r_[-1, hk_index]) - 1
+    channels[hk_index, 0] = (hk_id << 12) | hk_value
+    channels[hk_index, 1] = np.minimum(n_events, 65535)
+    channels[hk_index, 2] = rng.integers(0, 4, len(hk_index))
+    channels[hk_index, 3] = rng.integers(0, 4, len(hk_index))
+    packets["channels"] = channels
+
+    return packets
+
+
+def synthetic_pit_frames(
+    packets, times, misaligned_fraction=0.0, max_shift=3, rng=None, displacements=None
+):
+    """
+    Wraps LEXI packets in PIT frames and moves some of the packets out of place, the way the PIT
+    telemetry does. A packet moved backward by "k" bytes starts before the PIT sync word and
+    overwrites the end of the previous packet. A packet moved forward by "k" bytes runs into the
+    next frame and breaks its sync word, so the next packet is lost.
+
+    Parameters
+    ----------
+    packets : numpy.ndarray
+        Structured array of dtype "lxi_decode_funcs.gsfc_frame_dtype".
+    times : numpy.ndarray
+        Time of each packet in seconds since epoch, written in the PIT header.
+    misaligned_fraction : float
+        Fraction of the packets which are moved. Default is 0.
+    max_shift : int
+        Largest displacement in bytes, from 1 to 3. Default is 3.
+    rng : numpy.random.Generator
+        Random number generator. Default is None.
+    displacements : numpy.ndarray
+        Displacement of each packet in bytes, positive forward and negative backward, from
+        -max_shift to max_shift. The moved packets must be at least 3 frames apart and not be
+        the first or the last two frames. If given, the packets are moved by these
+        displacements instead of at random. Default is None.
+
+    Returns
+    -------
+    raw : bytes
+        The PIT frames.
+    is_dropped : numpy.ndarray
+        Boolean array, True for the packets which can't be decoded.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    n_frames = len(packets)
+    frames = np.zeros(n_frames, dtype=ldf.pit_frame_dtype)
+    frames["sync_pit"] = int.from_bytes(ldf.sync_pit, "big")
+    frames["Date"] = times
+    frames["sync_lxi"] = packets["sync_lxi"]
+    frames["timestamp_word"] = packets["timestamp_word"]
+    frames["channels"] = packets["channels"]
+    data = frames.view(np.uint8).reshape(n_frames, ldf.pit_frame_length).copy()
+
+    # Moved packets are at least 3 frames apart and never the first or the last two frames, so
+    # that they don't interact
+    if displacements is None:
+        n_moved = int(n_frames * misaligned_fraction)
+        candidates = np.arange(1, n_frames - 2, 3)
+        moved = np.sort(rng.choice(candidates, size=min(n_moved, len(candidates)), replace=False))
+        shifts = rng.integers(1, max_shift + 1, len(moved))
+        is_forward = rng.random(len(moved)) < 0.5
+    else:
+        moved = np.flatnonzero(displacements)
+        shifts = np.abs(displacements[moved])
+        is_forward = displacements[moved] > 0
+
+    packet_bytes = data[:, ldf.pit_header_length :].copy()
+    for frame, shift, forward in zip(moved, shifts, is_forward):
+        packet = packet_bytes[frame]
+        if forward:
+            data[frame, 12 : 12 + shift] = 0
+            data[frame, 12 + shift :] = packet[: 16 - shift]
+            data[frame + 1, 12 : 12 + shift] = packet[16 - shift :]
+        else:
+            data[frame - 1, 28 - shift :] = packet[:shift]
+            data[frame, 12 : 28 - shift] = packet[shift:]
+            data[frame, 28 - shift :] = 0
+
+    # The packet after a forward move is lost, unless the bytes written over its sync word happen
+    # to be the same
+    is_dropped = np.zeros(n_frames, dtype=bool)
+    after_forward = moved[is_forward] + 1
+    is_dropped[after_forward] = np.any(
+        data[after_forward, 12:16] != np.frombuffer(ldf.sync_lxi, dtype=np.uint8), axis=1
+    )
+
+    return data.tobytes(), is_dropped
+
+
+def write_synthetic_payload_file(
+    file_name=None,
+    file_size=1024**2,
+    event_rate=1000.0,
+    hk_cadence=1.0,
+    commanded_fraction=0.01,
+    misaligned_fraction=0.001,
+    seed=42,
+    start_time=default_start_time,
+    block_frames=1024**2,
+):
+    """
+    Writes a synthetic payload (PIT framed) level 0 file. The file is written in blocks, so files
+    much larger than the memory can be made.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the output file. It should contain "payload" so that it's read as a payload file.
+    file_size : int
+        Approximate size of the file in bytes. Default is 1 MB.
+    event_rate : float
+        Mean number of science events per second. Default is 1000.
+    hk_cadence : float
+        Time between two housekeeping packets in seconds. Default is 1.
+    commanded_fraction : float
+        Fraction of the science events which are commanded. Default is 0.01.
+    misaligned_fraction : float
+        Fraction of the packets moved by 1 to 3 bytes. Default is 0.001.
+    seed : int
+        Seed for the random number generator. Default is 42.
+    start_time : float
+        Time of the first packet in seconds since epoch. Default is 2025-03-16 00:00:00 UTC.
+    block_frames : int
+        Number of frames made at a time. Default is 1048576 (28 MB).
+
+    Returns
+    -------
+    file_info : dict
+        Dictionary with the name of the file, the number of frames, the number of science and
+        housekeeping packets the decoder should find, and the number of packets which can't be
+        decoded. The last frame of a file is never decoded.
+    """
+    rng = np.random.default_rng(seed)
+    n_frames = max(1, file_size // ldf.pit_frame_length)
+    Path(file_name).parent.mkdir(parents=True, exist_ok=True)
+
+    file_info = {"file_name": str(file_name), "frames": n_frames, "sci": 0, "hk": 0, "dropped": 0}
+    block_start_time = start_time
+    with open(file_name, "wb") as file:
+        for start_frame in range(0, n_frames, block_frames):
+            n_block = min(block_frames, n_frames - start_frame)
+            times, is_hk = synthetic_packet_times(
+                n_block,
+                event_rate=event_rate,
+                hk_cadence=hk_cadence,
+                start_time=block_start_time,
+                rng=rng,
+            )
+            packets = synthetic_lxi_packets(
+                times, is_hk, start_time=start_time, commanded_fraction=commanded_fraction, rng=rng
+            )
+            raw, is_dropped = synthetic_pit_frames(
+                packets, times, misaligned_fraction=misaligned_fraction, rng=rng
+            )
+            file.write(raw)
+
+            # The decoder stops one frame before the end of the file
+            if start_frame + n_block == n_frames:
+                is_dropped[-1] = True
+            file_info["sci"] += int(np.count_nonzero(~is_hk & ~is_dropped))
+            file_info["hk"] += int(np.count_nonzero(is_hk & ~is_dropped))
+            file_info["dropped"] += int(np.count_nonzero(is_dropped))
+            block_start_time = times[-1]
+
+    return file_info
+
+
+def write_synthetic_gsfc_file(
+    file_name=None,
+    file_size=1024**2,
+    event_rate=1000.0,
+    hk_cadence=1.0,
+    commanded_fraction=0.01,
+    junk_fraction=0.001,
+    seed=42,
+    block_packets=1024**2,
+):
+    """
+    Writes a synthetic GSFC style level 0 file: bare 16 byte LEXI packets with a few junk bytes
+    between some of them.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the output file. It must not contain "payload".
+    file_size : int
+        Approximate size of the file in bytes. Default is 1 MB.
+    event_rate : float
+        Mean number of science events per second. Default is 1000.
+    hk_cadence : float
+        Time between two housekeeping packets in seconds. Default is 1.
+    commanded_fraction : float
+        Fraction of the science events which are commanded. Default is 0.01.
+    junk_fraction : float
+        Fraction of the packets followed by 1 to 15 junk (zero) bytes. Default is 0.001.
+    seed : int
+        Seed for the random number generator. Default is 42.
+    block_packets : int
+        Number of packets made at a time. Default is 1048576 (16 MB).
+
+    Returns
+    -------
+    file_info : dict
+        Dictionary with the name of the file and the number of science and housekeeping packets
+        the decoder should find. The decoder never reads a packet at the very end of the file.
+    """
+    rng = np.random.default_rng(seed)
+    n_packets = max(1, file_size // ldf.gsfc_packet_length)
+    Path(file_name).parent.mkdir(parents=True, exist_ok=True)
+
+    file_info = {"file_name": str(file_name), "sci": 0, "hk": 0}
+    block_start_time = 0.0
+    with open(file_name, "wb") as file:
+        for start_packet in range(0, n_packets, block_packets):
+            n_block = min(block_packets, n_packets - start_packet)
+            times, is_hk = synthetic_packet_times(
+                n_block,
+                event_rate=event_rate,
+                hk_cadence=hk_cadence,
+                start_time=block_start_time,
+                rng=rng,
+            )
+            packets = synthetic_lxi_packets(
+                times, is_hk, commanded_fraction=commanded_fraction, rng=rng
+            )
+            packet_bytes = packets.view(np.uint8).reshape(n_block, ldf.gsfc_packet_length)
+
+            # Insert the junk bytes after some of the packets
+            junk_length = np.where(
+                rng.random(n_block) < junk_fraction, rng.integers(1, 16, n_block), 0
+            )
+            offsets = np.arange(n_block) * ldf.gsfc_packet_length
+            offsets += np.r_[0, np.cumsum(junk_length)[:-1]]
+            raw = np.zeros(n_block * ldf.gsfc_packet_length + junk_length.sum(), dtype=np.uint8)
+            raw[offsets[:, None] + np.arange(ldf.gsfc_packet_length)] = packet_bytes
+            file.write(raw.tobytes())
+
+            # The decoder stops 16 bytes before the end of the file
+            is_decoded = np.ones(n_block, dtype=bool)
+            if start_packet + n_block == n_packets and junk_length[-1] == 0:
+                is_decoded[-1] = False
+            file_info["sci"] += int(np.count_nonzero(~is_hk & is_decoded))
+            file_info["hk"] += int(np.count_nonzero(is_hk & is_decoded))
+            block_start_time = times[-1]
+
+    return file_info
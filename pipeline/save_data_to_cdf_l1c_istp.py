@@ -4,6 +4,7 @@ import warnings
 from pathlib import Path
 from typing import Optional, Union
 
+import lxi_asset_cache as lac
 import numpy as np
 import pandas as pd
 from spacepy.pycdf import CDF as cdf
@@ -13,12 +14,49 @@ warnings.filterwarnings("ignore")
 
 StrPath = Union[str, Path]
 
+# Path to the read-only skeleton
+skeleton_file_name = "/home/cephadrius/Desktop/git/Lexi-BU/lexi_data_pipeline/spdf_data_documents/l1c/lexi_l1c_0000000000_v0.1.cdf"
+
+
+def read_skeleton(file_name: StrPath) -> dict:
+    """
+    Read the global attributes and the variable attributes of the skeleton CDF file.
+
+    Parameters
+    ----------
+    file_name : str or Path
+        Path to the skeleton CDF file.
+
+    Returns
+    -------
+    dict
+        Dictionary with the global attributes "attrs" and, for each variable, its attributes
+        "variables".
+    """
+    # Load the skeleton in read-only mode
+    skeleton_cdf = cdf(str(file_name))
+    skeleton = {
+        "attrs": {key: skeleton_cdf.attrs[key][...] for key in skeleton_cdf.attrs},
+        "variables": {},
+    }
+    for varname in skeleton_cdf:
+        var_attrs = {}
+        for attr in skeleton_cdf[varname].attrs:
+            try:
+                var_attrs[attr] = skeleton_cdf[varname].attrs[attr][...]
+            except Exception:
+                var_attrs[attr] = skeleton_cdf[varname].attrs[attr]
+        skeleton["variables"][varname] = var_attrs
+    skeleton_cdf.close()
+    return skeleton
+
 
 def generate_lexi_cdf_filename(
     start_time: datetime.datetime,
     logical_source: str = "lexi_l1c",
     version: str = "0.1",
     output_dir: Path = Path("."),
+    overwrite: bool = False,
 ) -> Path:
     """
     Generate an ISTP-compliant LEXI CDF filename.
@@ -33,6 +71,9 @@ def generate_lexi_cdf_filename(
         Version string in the form '0.1'.
     output_dir : Path
         Directory where the file will be saved.
+    overwrite : bool
+        If True, the file of the given version is used even if it already exists. Otherwise the
+        version is increased until the file doesn't exist.
 
     Returns
     -------
@@ -49,7 +90,7 @@ def generate_lexi_cdf_filename(
         filename = f"{logical_source}_{start_str}_{version_str}.cdf"
         file_path = output_dir / filename
 
-        if not file_path.exists():
+        if overwrite or not file_path.exists():
             break
 
         # Update version: bump secondary version (or whatever logic you prefer)
@@ -67,6 +108,7 @@ def save_data_to_cdf(
     output_dir: Optional[StrPath] = None,
     version: str = "0.0",
     logical_source: str = "lexi_l1c",
+    overwrite: bool = False,
 ):
     """
     Save a DataFrame to a CDF file using a skeleton ISTP-compliant CDF file.
@@ -81,6 +123,9 @@ def save_data_to_cdf(
         Semantic version number, e.g., "0.1".
     logical_source : str
         Logical source name (default: "lexi_l1c").
+    overwrite : bool
+        If True, an existing file of the same version is replaced instead of saving the data to
+        the next version (default: False).
 
     Returns
     -------
@@ -102,24 +147,20 @@ def save_data_to_cdf(
         logical_source=logical_source,
         version=version,
         output_dir=output_dir,
+        overwrite=overwrite,
     )
 
-    # Path to the read-only skeleton
-    skeleton_path = Path(
-        "/home/cephadrius/Desktop/git/Lexi-BU/lexi_data_pipeline/spdf_data_documents/l1c/lexi_l1c_0000000000_v0.1.cdf"
-    )
-
-    # Load the skeleton in read-only mode
-    skeleton_cdf = cdf(str(skeleton_path))
+    # Attributes of the read-only skeleton, read once per process
+    skeleton = lac.load_asset(skeleton_file_name, read_skeleton)
 
     # Create new writable CDF file (overwrite if exists)
-    # if cdf_file.exists():
-    #     cdf_file.unlink()
+    if cdf_file.exists():
+        cdf_file.unlink()
     cdf_data = cdf(str(cdf_file), "")
 
     # Copy global attributes from skeleton
-    for key in skeleton_cdf.attrs:
-        cdf_data.attrs[key] = skeleton_cdf.attrs[key][...]
+    for key, value in skeleton["attrs"].items():
+        cdf_data.attrs[key] = value
 
     # Update dynamic global attributes
     cdf_data.attrs.update(
@@ -174,15 +215,11 @@ def save_data_to_cdf(
             # Let data type match the skeleton — no need to force type
             cdf_data[var] = df[var].values
 
-    for varname in skeleton_cdf:
+    for varname, var_attrs in skeleton["variables"].items():
         if varname in cdf_data:
-            for attr in skeleton_cdf[varname].attrs:
-                try:
-                    cdf_data[varname].attrs[attr] = skeleton_cdf[varname].attrs[attr][...]
-                except Exception:
-                    cdf_data[varname].attrs[attr] = skeleton_cdf[varname].attrs[attr]
+            for attr, value in var_attrs.items():
+                cdf_data[varname].attrs[attr] = value
 
-    skeleton_cdf.close()
     cdf_data.close()
 
     # Copy the output CDF to the SPDF directory